@@ -53,7 +53,7 @@ awesometts.config_menu()       # provides access to configuration dialog
 awesometts.editor_button()     # single audio clip generator button
 awesometts.reviewer_hooks()    # on-the-fly playback/shortcuts, context menus
 awesometts.sound_tag_delays()  # delayed playing of stored [sound]s in review
-awesometts.temp_files()        # remove temporary files upon session exit
+awesometts.temp_files()        # remove stale temporary files while idle
 awesometts.window_shortcuts()  # enable/update shortcuts for add-on windows
 awesometts.register_tts_tag()  # register AwesomeTTS "voices" for the anki {{tts}} tag
 awesometts.display_homescreen() # display AwesomeTTS welcome screen
@@ -33,7 +33,9 @@ import aqt
 
 from . import conversion as to, gui, paths, service
 from .bundle import Bundle
+from .cache import Cache
 from .config import Config
+from .janitor import Janitor
 from .player import Player
 from .router import Router
 from .text import Sanitizer
@@ -111,7 +113,9 @@ config = Config(
               table='general',
               normalize=to.normalized_ascii),
     cols=[
+        ('cache_budget', 'integer', 0, int, int),
         ('cache_days', 'integer', 365, int, int),
+        ('concurrency', 'text', {}, to.deserialized_dict, to.compact_json),
         ('ellip_note_newlines', 'integer', False, to.lax_bool, int),
         ('ellip_template_newlines', 'integer', False, to.lax_bool, int),
         ('extras', 'text', {}, to.deserialized_dict, to.compact_json),
@@ -121,9 +125,13 @@ config = Config(
         ('groups', 'text', {}, to.deserialized_dict, to.compact_json),
         ('homescreen_last_preset', 'text', '', str, str),
         ('homescreen_show', 'integer', True, to.lax_bool, int),
+        ('http_pool_size', 'integer', 10, int, int),
+        ('http_retries', 'integer', 2, int, int),
         ('lame_flags', 'text', '--quiet -q 2', str, str),
+        ('latencies', 'text', {}, to.deserialized_dict, to.compact_json),
         ('last_mass_append', 'integer', True, to.lax_bool, int),
         ('last_mass_behavior', 'integer', True, to.lax_bool, int),
+        ('last_mass_concurrency', 'integer', 0, int, int),
         ('last_mass_dest', 'text', 'Back', str, str),
         ('last_mass_source', 'text', 'Front', str, str),
         ('last_options', 'text', {}, to.deserialized_dict, to.compact_json),
@@ -141,9 +149,12 @@ config = Config(
          to.nullable_key, to.nullable_int),
         ('launch_templater', 'integer', Qt.ControlModifier | Qt.Key_T,
          to.nullable_key, to.nullable_int),
+        ('net_workers', 'integer', 0, int, int),
         ('otf_only_revealed_cloze', 'integer', False, to.lax_bool, int),
         ('otf_remove_hints', 'integer', False, to.lax_bool, int),
+        ('pool_workers', 'integer', 0, int, int),
         ('presets', 'text', {}, to.deserialized_dict, to.compact_json),
+        ('rate_limits', 'text', {}, to.deserialized_dict, to.compact_json),
         ('spec_note_count', 'text', '', str, str),
         ('spec_note_count_wrap', 'integer', True, to.lax_bool, int),
         ('spec_note_ellipsize', 'text', '', str, str),
@@ -195,6 +206,17 @@ player = Player(
     logger=logger,
 )
 
+cache = Cache(
+    directory=paths.CACHE,
+    index=paths.CACHE_INDEX,
+    budget=lambda: config['cache_budget'] * 1048576,
+    days=lambda: config['cache_days'],
+    logger=logger,
+)
+cache.migrate()
+
+scratch_dir = join(paths.TEMP, '_awesometts_scratch_' + str(int(time())))
+
 router = Router(
     services=Bundle(
         mappings=[
@@ -242,16 +264,23 @@ router = Router(
         args=(),
         kwargs=dict(temp_dir=paths.TEMP,
                     lame_flags=lambda: config['lame_flags'],
+                    net_pool=lambda: (config['http_pool_size'],
+                                      config['http_retries']),
                     normalize=to.normalized_ascii,
                     logger=logger,
-                    ecosystem=Bundle(web=WEB, agent=AGENT)),
+                    ecosystem=Bundle(web=WEB, agent=AGENT),
+                    probe_path=paths.PROBES),
     ),
-    cache_dir=paths.CACHE,
-    temp_dir=join(paths.TEMP, '_awesometts_scratch_' + str(int(time()))),
+    cache=cache,
+    temp_dir=scratch_dir,
     logger=logger,
     config=config,
 )
 
+janitor = Janitor(idle=router.is_idle, logger=logger)
+
+anki.hooks.addHook('unloadProfile', router.shutdown)
+
 
 STRIP_TEMPLATE_POSTHTML = [
     'whitespace',
@@ -272,6 +301,7 @@ def bundlefail(message, text="Not available by addon.Bundle.downloader.fail"):
     aqt.utils.showCritical(message, aqt.mw)
 
 addon = Bundle(
+    cache=cache,
     config=config,
     downloader=Bundle(
         base=aqt.addons.GetAddons,
@@ -289,7 +319,8 @@ addon = Bundle(
     language=service.languages.Language,
     logger=logger,
     paths=Bundle(cache=paths.CACHE,
-                 is_link=paths.ADDON_IS_LINKED),
+                 is_link=paths.ADDON_IS_LINKED,
+                 journal=paths.JOURNAL),
     player=player,
     router=router,
     strip=Bundle(
@@ -435,6 +466,30 @@ def browser_menus():
             parent=menu,
         )
 
+        resumer = Bundle(instance=None)
+
+        def on_resume():
+            """Resume the journaled job in a (hidden) generator."""
+
+            if not resumer.instance:
+                resumer.instance = gui.BrowserGenerator(
+                    browser=browser,
+                    addon=addon,
+                    alerts=aqt.utils.showWarning,
+                    ask=aqt.utils.getText,
+                    parent=browser,
+                )
+            resumer.instance.resume()
+
+        # n.b. a plain QAction, as it does not need any notes to be selected
+        resume = QtWidgets.QAction("Resume &Interrupted Job...", menu)
+        resume.triggered.connect(on_resume)
+        menu.addSeparator()
+        menu.addAction(resume)
+        menu.aboutToShow.connect(
+            lambda: resume.setEnabled(os.path.isfile(paths.JOURNAL))
+        )
+
     def update_title_wrapper(browser):
         """Enable/disable AwesomeTTS menu items upon selection."""
 
@@ -455,43 +510,15 @@ def browser_menus():
 
 
 def cache_control():
-    """Registers a hook to handle cache control on session exits."""
-
-    def on_unload_profile():
-        """
-        Finds MP3s in the cache directory older than the user's
-        configured cache limit and attempts to remove them.
-        """
-
-        from os import listdir, unlink
-
-        cache = paths.CACHE
-
-        try:
-            filenames = listdir(cache)
-        except:  # allow silent failure, pylint:disable=bare-except
-            return
-        if not filenames:
-            return
-
-        prospects = (join(cache, filename) for filename in filenames)
-
-        if config['cache_days']:
-            from os.path import getmtime
-
-            limit = time() - 86400 * config['cache_days']
-            targets = (prospect for prospect in prospects
-                       if getmtime(prospect) < limit)
-        else:
-            targets = prospects
-
-        for target in targets:
-            try:
-                unlink(target)
-            except:  # skip broken files, pylint:disable=bare-except
-                pass
+    """
+    Registers a task to evict files from the cache that are older than
+    the user's configured cache limit or that put it over its size
+    budget, a slice at a time while idle, and a hook to close the cache
+    index on session exits.
+    """
 
-    anki.hooks.addHook('unloadProfile', on_unload_profile)
+    janitor.add(cache.tidy)
+    anki.hooks.addHook('unloadProfile', cache.close)
 
 
 def cards_button():
@@ -641,6 +668,7 @@ def reviewer_hooks():
                 okay=player.menu_click,
                 fail=lambda exception, text: (),
             ),
+            priority=Router.Priority.INTERACTIVE,
         )
 
     def say_text_group_handler(text, group, parent):
@@ -654,6 +682,7 @@ def reviewer_hooks():
                 okay=player.menu_click,
                 fail=lambda exception, text: (),
             ),
+            priority=Router.Priority.INTERACTIVE,
         )    
 
     def on_context_menu(web_view, menu):
@@ -749,16 +778,17 @@ def sound_tag_delays():
 
 
 def temp_files():
-    """Remove temporary files upon session exit."""
+    """Remove temporary files left behind by earlier sessions."""
 
-    def on_unload_profile():
+    def remove_stale():
         """
-        Finds scratch directories in the temporary path, removes their
-        files, then removes the directories themselves.
+        Finds scratch directories in the temporary path from sessions
+        other than this one, removes their files, then removes the
+        directories themselves.
         """
 
         from os import listdir, unlink, rmdir
-        from os.path import isdir
+        from os.path import getsize, isdir
 
         temp = paths.TEMP
 
@@ -767,22 +797,30 @@ def temp_files():
                        if filename.startswith('_awesometts_scratch')]
         except:  # allow silent failure, pylint:disable=bare-except
             return
-        if not subdirs:
-            return
+
+        files = size = 0
 
         for subdir in subdirs:
-            if isdir(subdir):
+            if subdir != scratch_dir and isdir(subdir):
                 for filename in listdir(subdir):
                     try:
+                        bytes_ = getsize(join(subdir, filename))
                         unlink(join(subdir, filename))
                     except:  # skip busy files, pylint:disable=bare-except
                         pass
+                    else:
+                        files += 1
+                        size += bytes_
                 try:
                     rmdir(subdir)
                 except:  # allow silent failure, pylint:disable=bare-except
                     pass
 
-    anki.hooks.addHook('unloadProfile', on_unload_profile)
+        if files:
+            logger.info("Removed %d stale temporary file(s), %d bytes",
+                        files, size)
+
+    janitor.add(remove_stale, once=True)
 
 
 def window_shortcuts():
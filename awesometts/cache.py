@@ -0,0 +1,770 @@
+# -*- coding: utf-8 -*-
+
+# AwesomeTTS text-to-speech add-on for Anki
+# Copyright (C) 2010-Present  Anki AwesomeTTS Development Team
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Indexing and eviction for the cache of generated audio files
+"""
+
+from hashlib import sha1
+import os
+import os.path
+import re
+import sqlite3
+import threading
+from time import time
+
+__all__ = ['Cache', 'KEY_VERSION']
+
+
+KEY_VERSION = 2  # scheme Router._path_cache uses for naming new files
+
+HIT_BATCH = 256  # cache hits held in memory before being written out
+
+EVICT_BATCH = 500  # entries looked at per query when evicting
+
+TIDY_SLICE = 250  # most files removed by a single call to tidy()
+
+LEGACY_DAYS = 30  # how long entries from older key schemes wait to be used
+
+STATS_SECS = 3600  # how often tidy() logs how much dedup is saving
+
+RE_KEY = re.compile(r'^([a-z\d]+)-([a-f\d]{8})(-[a-f\d]{8}){4}\.mp3$')
+
+
+class Cache(object):
+    """
+    Keeps an SQLite index of the audio files in the cache directory,
+    with each file's service, size in bytes, creation and last access
+    times, and hit count.
+
+    This lets the cache be held to a byte budget by evicting the least
+    recently used files first (and to an age limit, by creation time)
+    without ever having to scan the directory. Files already in the
+    directory from before the index existed are adopted into it once,
+    in the background (see migrate()).
+
+    Files with identical content (e.g. the same text under options that
+    make no audible difference) are stored once, with every key after
+    the first being a hard link to it, so stats() reports both the bytes
+    the cache holds and the bytes it takes up on disk.
+
+    Files are sharded into subdirectories by service and the first two
+    hex digits of their hash (e.g. google/3f/google-3f...mp3), so that
+    no single directory grows large. Files left over from the older flat
+    layout are moved into their shards by migrate() in the background,
+    and until that finishes, exists() falls back to the flat layout.
+
+    Each entry also records the version of the key scheme its filename
+    was made with. While any entries from an older scheme remain, the
+    router can find them by their old name and rekey() them. Those not
+    asked for within LEGACY_DAYS of the current scheme taking over are
+    retired by tidy(), so the fallback does not linger.
+
+    The bytes taken up on disk are kept as a running total, updated as
+    entries are added and removed, so that checking the budget never
+    needs a query over the whole index.
+
+    Methods may be called from any thread.
+    """
+
+    __slots__ = [
+        '_adopted',     # True once files from before the index are in it
+        '_budget',      # callable returning the limit in bytes, 0 for none
+        '_connection',  # SQLite connection to the index, opened lazily
+        '_days',        # callable returning the age limit in days
+        'directory',    # path where the audio files themselves are stored
+        '_hits',        # lookup of keys to [last access, count] not saved yet
+        '_index',       # path to the SQLite index database
+        '_legacy',      # True while entries from older key schemes remain
+        '_lock',        # guards the connection and _hits
+        '_logged',      # time tidy() last logged the cache's stats
+        '_logger',      # logger-like interface with debug(), info(), etc.
+        '_migrated',    # True once no files are left in the flat layout
+        '_shards',      # set of shard directories known to exist
+        '_started',     # time this session started, for a limit of 0 days
+        '_stored',      # running total of bytes on disk, None until counted
+    ]
+
+    def __init__(self, directory, index, budget, days, logger):
+        """
+        Initialize the cache for the given directory of files and path
+        to its index database.
+
+        The budget should be a callable returning the most bytes that
+        the cache may hold (zero or less for no limit), and days should
+        be a callable returning how many days a file may be kept for
+        after it was created (zero meaning files should not be kept
+        past the session they were created in).
+        """
+
+        self._adopted = False
+        self._budget = budget
+        self._connection = None
+        self._days = days
+        self.directory = directory
+        self._hits = {}
+        self._index = index
+        self._legacy = True  # until the index says otherwise
+        self._lock = threading.RLock()
+        self._logged = 0
+        self._logger = logger
+        self._migrated = False
+        self._shards = set()
+        self._started = time()
+        self._stored = None
+
+    def path(self, filename):
+        """
+        Returns the path in its shard for the given cache filename. The
+        shard directory is not created until shard() is called.
+        """
+
+        return self._locate(filename)
+
+    def shard(self, path):
+        """
+        Creates the shard directory for the given cache path if needed,
+        e.g. right before a file is written there.
+        """
+
+        shard = os.path.dirname(path)
+
+        if shard not in self._shards:
+            os.makedirs(shard, exist_ok=True)
+            self._shards.add(shard)
+
+    def exists(self, path, move=True):
+        """
+        Returns True if the given cache path exists. While files are
+        still being migrated, a file found in the flat layout is moved
+        into its shard first, unless move is False.
+        """
+
+        if os.path.exists(path):
+            return True
+        if self._migrated:
+            return False
+
+        flat = os.path.join(self.directory, os.path.basename(path))
+        if not os.path.exists(flat):
+            return False
+        if not move:
+            return True
+
+        try:
+            self.shard(path)
+            os.replace(flat, path)
+        except OSError:
+            return False
+        return True
+
+    def migrate(self):
+        """
+        Starts adopting files from before the index existed and moving
+        any files in the flat layout into their shards on a background
+        thread, unless that has already been done, and returns the
+        thread.
+        """
+
+        thread = threading.Thread(target=self._migrate,
+                                  name='AwesomeTTS cache migration',
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def rekey(self, legacy_path, path, move=True):
+        """
+        If an entry from an older key scheme exists at the path returned
+        by the legacy_path callable, moves it to the given path for the
+        current scheme (unless move is False), returning True if so.
+
+        The index is checked before the disk, so that a miss costs no
+        more than a lookup by key; the disk is only checked without an
+        index entry while files from before the index are being adopted.
+        Once no such entries are left, this returns False without even
+        calling legacy_path.
+        """
+
+        if not self._legacy:
+            return False
+
+        legacy_path = legacy_path()
+        if legacy_path == path:
+            return False
+
+        with self._lock:
+            indexed = self._db().execute(
+                'SELECT 1 FROM entries WHERE key=? AND '
+                '(version IS NULL OR version<?)',
+                (os.path.basename(legacy_path), KEY_VERSION),
+            ).fetchone()
+        if not indexed and self._adopted:
+            return False
+        if not self.exists(legacy_path, move=move):
+            return False
+        if not move:
+            return True
+
+        with self._lock:
+            try:
+                self.shard(path)
+                os.replace(legacy_path, path)
+            except OSError:
+                return False
+
+            key = os.path.basename(path)
+            if self._db().execute('SELECT 1 FROM entries WHERE key=?',
+                                  (key,)).fetchone():
+                self._stored = None  # an entry is replaced; count again
+            with self._db() as connection:
+                renamed = connection.execute(
+                    'UPDATE OR REPLACE entries SET key=?, version=? '
+                    'WHERE key=?',
+                    (key, KEY_VERSION, os.path.basename(legacy_path)),
+                ).rowcount
+            if not renamed:
+                self.add(path, RE_KEY.match(key).group(1))
+
+        return True
+
+    def hit(self, path):
+        """
+        Records that the given cached file has been used. Hits are held
+        in memory and written out in batches, so this is cheap enough to
+        call for every cache hit.
+        """
+
+        with self._lock:
+            key = os.path.basename(path)
+            try:
+                self._hits[key][0] = time()
+                self._hits[key][1] += 1
+            except KeyError:
+                self._hits[key] = [time(), 1]
+
+            if len(self._hits) >= HIT_BATCH:
+                self.flush()
+
+    def add(self, path, svc_id):
+        """
+        Records a file that has just been written out to the cache by
+        the given service. If a file with the same content is already in
+        the cache, the new file is replaced by a hard link to it.
+
+        If the file cannot be read, it is deleted rather than being left
+        in the cache without an entry (where eviction would never find
+        it).
+        """
+
+        try:
+            size = os.path.getsize(path)
+            digest = self._digest(path)
+        except OSError as os_error:
+            self._logger.warn("Unable to add %s to the cache: %s",
+                              path, os_error)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return
+
+        key = os.path.basename(path)
+        now = time()
+
+        with self._lock:
+            replaced = self._db().execute(
+                'SELECT bytes, digest FROM entries WHERE key=?', (key,),
+            ).fetchone()
+            if replaced:
+                self._stored = None  # old content may be gone; count again
+
+            shared = self._share(key, path, digest)
+            if shared is False:
+                digest = None  # a separate copy, so count its bytes alone
+            if self._stored is not None and not shared:
+                self._stored += size
+
+            with self._db() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries '
+                    '(key, svc_id, bytes, created, accessed, hits, digest, '
+                    'version) VALUES (?, ?, ?, ?, ?, 0, ?, ?)',
+                    (key, svc_id, size, now, now, digest, KEY_VERSION),
+                )
+
+    def flush(self):
+        """Writes out any hits that are still being held in memory."""
+
+        with self._lock:
+            if not self._hits:
+                return
+
+            hits, self._hits = self._hits, {}
+            with self._db() as connection:
+                connection.executemany(
+                    'UPDATE entries SET accessed=MAX(accessed, ?), '
+                    'hits=hits+? WHERE key=?',
+                    [(accessed, count, key)
+                     for key, (accessed, count) in hits.items()],
+                )
+
+    def stats(self):
+        """
+        Returns the number of files in the cache, the bytes that they
+        hold, and the bytes that they take up on disk once files with
+        identical content are only counted once.
+        """
+
+        with self._lock:
+            count, size = self._db().execute(
+                'SELECT COUNT(*), TOTAL(bytes) FROM entries'
+            ).fetchone()
+            stored, = self._db().execute(
+                'SELECT TOTAL(bytes) FROM (SELECT MAX(bytes) AS bytes '
+                'FROM entries GROUP BY COALESCE(digest, key))'
+            ).fetchone()
+
+        return count, int(size), int(stored)
+
+    def tidy(self):
+        """
+        Evicts a small slice of files, for running periodically while
+        the add-on is idle, and now and then logs how much sharing
+        identical files is saving.
+        """
+
+        result = self.evict(limit=TIDY_SLICE)
+        self._retire()
+        self._legacy = self._has_legacy()
+
+        if time() - self._logged >= STATS_SECS:  # stats() scans the index
+            self._logged = time()
+            count, size, stored = self.stats()
+            if stored:
+                self._logger.debug("Cache has %d file(s), %d bytes stored "
+                                   "in %d (dedup ratio %.2f)", count, size,
+                                   stored, size / stored)
+
+        return result
+
+    def evict(self, limit=None):
+        """
+        Removes files older than the age limit, then the least recently
+        used files until the cache is within its byte budget, returning
+        the number of files removed and bytes reclaimed on disk.
+
+        If passed, limit caps the number of files removed by this call,
+        so that eviction can be done in small slices.
+        """
+
+        days = self._days()
+        budget = self._budget()
+        files = size = 0
+
+        with self._lock:
+            self.flush()
+
+            cutoff = time() - 86400 * days if days else self._started
+            while limit is None or files < limit:
+                rows = self._db().execute(
+                    'SELECT key, bytes, digest FROM entries '
+                    'WHERE created < ? LIMIT ?',
+                    (cutoff, self._batch(limit, files)),
+                ).fetchall()
+                removed, files, size = self._remove(rows, files, size)
+                if not removed:
+                    break
+
+            # n.b. Removing a file that shares its content reclaims nothing
+            # until its last sibling goes too, so the excess is worked out
+            # again from the running total after each batch rather than
+            # trusted to add up.
+
+            while budget > 0 and (limit is None or files < limit):
+                excess = self._stored_bytes() - budget
+                if excess <= 0:
+                    break
+
+                rows = self._db().execute(
+                    'SELECT key, bytes, digest FROM entries '
+                    'ORDER BY accessed LIMIT ?',
+                    (self._batch(limit, files),),
+                ).fetchall()
+                wanted = []
+                for row in rows:
+                    if excess <= 0:
+                        break
+                    wanted.append(row)
+                    excess -= row[1]
+                removed, files, size = self._remove(wanted, files, size)
+                if not removed:
+                    break
+
+        if files:
+            self._logger.info("Evicted %d file(s), %d bytes, from the cache",
+                              files, size)
+
+        return files, size
+
+    def clear(self):
+        """
+        Removes every file in the cache, returning the number of files
+        that could not be removed (e.g. because they are in use).
+
+        Besides the files in the index, the directory is also walked for
+        any cache files that are not in it (e.g. ones that have not been
+        adopted yet), so that nothing is left behind.
+        """
+
+        with self._lock:
+            self._hits = {}
+            rows = self._db().execute('SELECT key, bytes, digest '
+                                      'FROM entries').fetchall()
+            self._remove(rows, 0, 0)
+
+            kept = set(key for key, in
+                       self._db().execute('SELECT key FROM entries'))
+            failed = len(kept)
+
+            for dirpath, _, filenames in os.walk(self.directory):
+                for filename in filenames:
+                    if filename in kept or not RE_KEY.match(filename):
+                        continue
+                    try:
+                        os.unlink(os.path.join(dirpath, filename))
+                    except FileNotFoundError:
+                        pass
+                    except OSError as os_error:
+                        self._logger.warn("Unable to remove %s: %s",
+                                          filename, os_error)
+                        failed += 1
+
+            return failed
+
+    def close(self):
+        """Writes out held hits and closes the index, e.g. at exit."""
+
+        with self._lock:
+            if self._connection:
+                self.flush()
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
+
+    def _batch(self, limit, files):
+        """Returns how many entries the next eviction query should get."""
+
+        return EVICT_BATCH if limit is None \
+            else min(EVICT_BATCH, limit - files)
+
+    def _remove(self, rows, files, size):
+        """
+        Deletes the files for the given (key, bytes, digest) rows,
+        dropping their entries from the index, and returns the number of
+        entries dropped along with the given running file and byte totals
+        with the deleted files added on. Entries for files that are
+        already gone are dropped too; entries for files that cannot be
+        deleted are kept. Bytes only count as reclaimed once no entries
+        are left sharing the same content.
+        """
+
+        removed = []
+        shared = {}
+        dropped = 0  # bytes no longer counted, whether or not reclaimed
+
+        for key, bytes_, digest in rows:
+            try:
+                try:
+                    os.unlink(self._locate(key))
+                except FileNotFoundError:
+                    if self._migrated:
+                        raise
+                    os.unlink(os.path.join(self.directory, key))
+            except FileNotFoundError:
+                if digest:
+                    shared.setdefault(digest, [bytes_, False])
+                else:
+                    dropped += bytes_
+            except OSError as os_error:
+                self._logger.warn("Unable to evict %s: %s", key, os_error)
+                continue
+            else:
+                files += 1
+                if digest:
+                    shared[digest] = [bytes_, True]
+                else:
+                    size += bytes_
+                    dropped += bytes_
+            removed.append((key,))
+
+        if removed:
+            with self._db() as connection:
+                connection.executemany('DELETE FROM entries WHERE key=?',
+                                       removed)
+
+        for digest, (bytes_, deleted) in shared.items():
+            if not self._db().execute('SELECT 1 FROM entries WHERE digest=? '
+                                      'LIMIT 1', (digest,)).fetchone():
+                dropped += bytes_
+                if deleted:
+                    size += bytes_
+
+        if self._stored is not None:
+            self._stored = max(self._stored - dropped, 0)
+
+        return len(removed), files, size
+
+    @staticmethod
+    def _digest(path):
+        """Returns a hash of the content of the file at the path."""
+
+        digest = sha1()
+        with open(path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _share(self, key, path, digest):
+        """
+        If another entry has the same content, replaces the file at the
+        path with a hard link to that entry's file and returns True, or
+        returns False if its file could not be linked to. Returns None
+        if there is no such entry.
+        """
+
+        row = self._db().execute('SELECT key FROM entries WHERE digest=? '
+                                 'AND key!=? LIMIT 1', (digest, key)) \
+            .fetchone()
+        if not row:
+            return None
+
+        temp = path + '.link'
+        try:
+            os.link(self._locate(row[0]), temp)
+            os.replace(temp, path)
+        except OSError as os_error:
+            self._logger.debug("Unable to share %s with %s: %s",
+                               key, row[0], os_error)
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+            return False
+
+        return True
+
+    def _stored_bytes(self):
+        """
+        Returns the running total of bytes the cache takes up on disk,
+        counting it up from the index the first time it is needed (and
+        again whenever it could no longer be kept up to date).
+        """
+
+        with self._lock:
+            if self._stored is None:
+                self._stored = self.stats()[2]
+            return self._stored
+
+    def _locate(self, key):
+        """Returns the path in its shard for the given cache key."""
+
+        match = RE_KEY.match(key)
+        if not match:
+            raise ValueError("Not a cache filename: %s" % key)
+
+        return os.path.join(self.directory, match.group(1),
+                            match.group(2)[:2], key)
+
+    def _migrate(self):
+        """
+        Adopts files from before the index existed, then moves files in
+        the flat layout into their shards, recording in the index once
+        there are none left.
+        """
+
+        try:
+            self._adopt()
+
+            with self._lock:
+                if self._db().execute('SELECT value FROM meta WHERE name=?',
+                                      ('sharded',)).fetchone():
+                    self._migrated = True
+                    return
+
+            moved = failed = 0
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not RE_KEY.match(entry.name):
+                        continue
+                    try:
+                        path = self.path(entry.name)
+                        self.shard(path)
+                        os.replace(entry.path, path)
+                    except OSError:
+                        failed += 1
+                    else:
+                        moved += 1
+
+            if failed:
+                self._logger.warn("Unable to move %d file(s) into cache "
+                                  "shards; will retry next session", failed)
+                return
+
+            with self._lock, self._db() as connection:
+                connection.execute('INSERT OR REPLACE INTO meta (name, value) '
+                                   'VALUES (?, ?)', ('sharded', str(time())))
+            self._migrated = True
+            self._logger.info("Moved %d file(s) into cache shards", moved)
+
+        except Exception as exception:  # pylint:disable=broad-except
+            self._logger.error("Cache migration failed: %s", exception)
+
+    def _db(self):
+        """
+        Returns the connection to the index, opening it (and creating
+        the tables) if needed.
+        """
+
+        if self._connection:
+            return self._connection
+
+        connection = sqlite3.connect(self._index, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, svc_id TEXT, bytes INTEGER, '
+                'created REAL, accessed REAL, hits INTEGER)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed '
+                               'ON entries (accessed)')
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_created '
+                               'ON entries (created)')
+            connection.execute('CREATE TABLE IF NOT EXISTS meta ('
+                               'name TEXT PRIMARY KEY, value TEXT)')
+
+            existing_cols = [meta[1] for meta in connection.execute(
+                'PRAGMA table_info(entries)')]
+            for col, affinity in [('digest', 'TEXT'), ('version', 'INTEGER')]:
+                if col not in existing_cols:
+                    connection.execute('ALTER TABLE entries ADD COLUMN %s %s'
+                                       % (col, affinity))
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_digest '
+                               'ON entries (digest)')
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_version '
+                               'ON entries (version)')
+            connection.execute('INSERT OR IGNORE INTO meta (name, value) '
+                               'VALUES (?, ?)',
+                               ('keyed_v%d' % KEY_VERSION, str(time())))
+
+        self._connection = connection
+
+        self._legacy = self._has_legacy()
+        return connection
+
+    def _retire(self):
+        """
+        Removes a slice of entries from older key schemes that have not
+        been asked for (and so rekeyed) within LEGACY_DAYS of the current
+        scheme taking over.
+        """
+
+        with self._lock:
+            if not self._legacy or not self._adopted:
+                return
+
+            since = self._db().execute('SELECT value FROM meta WHERE name=?',
+                                       ('keyed_v%d' % KEY_VERSION,)) \
+                .fetchone()
+            if since and time() - float(since[0]) < 86400 * LEGACY_DAYS:
+                return
+
+            rows = self._db().execute(
+                'SELECT key, bytes, digest FROM entries '
+                'WHERE version IS NULL OR version<? LIMIT ?',
+                (KEY_VERSION, TIDY_SLICE),
+            ).fetchall()
+            _, files, size = self._remove(rows, 0, 0)
+
+        if files:
+            self._logger.info("Retired %d file(s), %d bytes, named by an "
+                              "older cache key scheme", files, size)
+
+    def _has_legacy(self):
+        """
+        Returns True if any entries are from an older key scheme, or if
+        files from before the index existed have not been adopted yet.
+        """
+
+        with self._lock:
+            if not self._db().execute('SELECT value FROM meta WHERE name=?',
+                                      ('adopted',)).fetchone():
+                return True
+            return bool(self._db().execute(
+                'SELECT 1 FROM entries WHERE version IS NULL OR version<? '
+                'LIMIT 1', (KEY_VERSION,)
+            ).fetchone())
+
+    def _adopt(self):
+        """
+        Adds entries for the files already in the cache directory, in
+        either layout, using their modification times as both their
+        creation and last access times, unless that has been done.
+
+        This is the one time the directory is scanned, so it runs on the
+        migration thread and only holds the lock to write out what it
+        found, letting lookups and new files carry on in the meantime.
+        """
+
+        with self._lock:
+            if self._db().execute('SELECT value FROM meta WHERE name=?',
+                                  ('adopted',)).fetchone():
+                self._adopted = True
+                return
+
+        rows = []
+
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                match = RE_KEY.match(filename)
+                if not match:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, filename))
+                except OSError:
+                    continue
+                rows.append((filename, match.group(1), stat.st_size,
+                             stat.st_mtime, stat.st_mtime))
+
+        with self._lock, self._db() as connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO entries '
+                '(key, svc_id, bytes, created, accessed, hits) '
+                'VALUES (?, ?, ?, ?, ?, 0)',
+                rows,
+            )
+            connection.execute('INSERT OR REPLACE INTO meta (name, value) '
+                               'VALUES (?, ?)', ('adopted', str(time())))
+            self._adopted = True
+            self._legacy = self._has_legacy()
+            self._stored = None  # count the adopted files in next time
+
+        self._logger.info("Adopted %d existing file(s) into the cache index",
+                          len(rows))
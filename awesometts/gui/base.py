@@ -824,16 +824,19 @@ class ServiceDialog(Dialog):
             ),
             then=text_input.setFocus,
         )
+        priority = self._addon.router.Priority.INTERACTIVE
 
         if svc_id.startswith('group:'):
             config = self._addon.config
             self._addon.router.group(text=text_value,
                                      group=config['groups'][svc_id[6:]],
                                      presets=config['presets'],
-                                     callbacks=callbacks)
+                                     callbacks=callbacks,
+                                     priority=priority)
         else:
             self._addon.router(svc_id=svc_id, text=text_value,
-                               options=values, callbacks=callbacks)
+                               options=values, callbacks=callbacks,
+                               priority=priority)
 
     # Auxiliary ##############################################################
 
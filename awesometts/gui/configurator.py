@@ -19,8 +19,6 @@
 """Configuration dialog"""
 
 from locale import format as locale
-import os
-import os.path
 from sys import platform
 
 from PyQt5 import QtCore, QtWidgets, QtGui
@@ -42,7 +40,7 @@ class Configurator(Dialog):
     """Provides a dialog for configuring the add-on."""
 
     _PROPERTY_KEYS = [
-        'cache_days', 'ellip_note_newlines',
+        'cache_budget', 'cache_days', 'ellip_note_newlines',
         'ellip_template_newlines', 'filenames', 'filenames_human', 'homescreen_show',
         'lame_flags', 'launch_browser_generator', 'launch_browser_stripper',
         'launch_configurator', 'launch_editor_generator', 'launch_templater',
@@ -346,21 +344,23 @@ class Configurator(Dialog):
         sleep.setSuffix(" seconds")
 
         hor = QtWidgets.QHBoxLayout()
-        hor.addWidget(Label("After "))
+        hor.addWidget(Label("Allow "))
         hor.addWidget(threshold)
-        hor.addWidget(Label(" sleep for "))
+        hor.addWidget(Label(" every "))
         hor.addWidget(sleep)
         hor.addStretch()
 
         rtr = self._addon.router
         vert = QtWidgets.QVBoxLayout()
-        vert.addWidget(Note("Tweak how often AwesomeTTS takes a break when "
-                            "mass downloading files from online services."))
+        vert.addWidget(Note("Tweak how quickly AwesomeTTS may download files "
+                            "from each online service. Up to that many may "
+                            "go at once, then downloads are spread evenly "
+                            "over the period."))
         vert.addLayout(hor)
         vert.addWidget(Note("Affects %s." %
                             ', '.join(rtr.by_trait(rtr.Trait.INTERNET))))
 
-        group = QtWidgets.QGroupBox("Download Throttling during Batch Processing")
+        group = QtWidgets.QGroupBox("Download Throttling")
         group.setLayout(vert)
         return group
 
@@ -452,14 +452,28 @@ class Configurator(Dialog):
         hor = QtWidgets.QHBoxLayout()
         hor.addWidget(Label("Delete files older than"))
         hor.addWidget(days)
-        hor.addWidget(Label("at exit (zero clears everything)"))
+        hor.addWidget(Label("(zero keeps files for one session only)"))
         hor.addStretch()
 
+        budget = QtWidgets.QSpinBox()
+        budget.setObjectName('cache_budget')
+        budget.setRange(0, 999999)
+        budget.setSingleStep(50)
+        budget.setSuffix(" MB")
+        budget.setSpecialValueText("unlimited")
+
+        bhor = QtWidgets.QHBoxLayout()
+        bhor.addWidget(Label("Keep at most"))
+        bhor.addWidget(budget)
+        bhor.addWidget(Label("of files, deleting the least recently used"))
+        bhor.addStretch()
+
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(Note("AwesomeTTS caches generated audio files and "
                               "remembers failures during each session to "
                               "speed up repeated playback."))
         layout.addLayout(hor)
+        layout.addLayout(bhor)
 
         abutton = QtWidgets.QPushButton("Delete Files")
         abutton.setObjectName('on_cache')
@@ -532,14 +546,21 @@ class Configurator(Dialog):
                 widget.setModel(value)
 
         widget = self.findChild(QtWidgets.QPushButton, 'on_cache')
-        widget.atts_list = (
-            [filename for filename in os.listdir(self._addon.paths.cache)]
-            if os.path.isdir(self._addon.paths.cache) else []
-        )
-        if widget.atts_list:
+        count, size, stored = self._addon.cache.stats()
+        if count:
             widget.setEnabled(True)
-            widget.setText("Delete Files (%s)" %
-                           locale("%d", len(widget.atts_list), grouping=True))
+            widget.setText("Delete Files (%s, %s MB)" % (
+                locale("%d", count, grouping=True),
+                locale("%.1f", stored / 1048576, grouping=True),
+            ))
+            widget.setToolTip("%s MB of audio stored in %s MB by sharing "
+                              "identical files (%.2fx)" % (
+                                  locale("%.1f", size / 1048576,
+                                         grouping=True),
+                                  locale("%.1f", stored / 1048576,
+                                         grouping=True),
+                                  size / stored if stored else 1,
+                              ))
         else:
             widget.setEnabled(False)
             widget.setText("Delete Files")
@@ -672,17 +693,15 @@ class Configurator(Dialog):
         """Attempts clear known files from cache."""
 
         button.setEnabled(False)
-        count_error = count_success = 0
+        count_before = self._addon.cache.stats()[0]
 
-        for filename in button.atts_list:
-            try:
-                os.unlink(os.path.join(self._addon.paths.cache, filename))
-                count_success += 1
-            except:  # capture all exceptions, pylint:disable=W0702
-                count_error += 1
+        try:
+            count_error = self._addon.cache.clear()
+        except Exception:  # capture all exceptions, pylint:disable=W0703
+            count_error = count_before
 
         if count_error:
-            if count_success:
+            if count_error < count_before:
                 button.setText("partially emptied (%s left)" %
                                locale("%d", count_error, grouping=True))
             else:
@@ -20,6 +20,9 @@
 File generation dialogs
 """
 
+import json
+import os
+import os.path
 from re import compile as re
 from PyQt5 import QtCore, QtWidgets
 
@@ -39,8 +42,15 @@ class BrowserGenerator(ServiceDialog):
 
     HELP_USAGE_SLUG = 'Batch-Generation'
 
+    _FLUSH_BATCH = 250  # number of updated notes to write out together
+
+    _RE_MUSTACHE = re(r'\{?\{\{(.+?)\}\}\}?')
+
     _RE_WHITESPACE = re(r'\s+')
 
+    # human filename variables that do not depend on the note
+    _SHARED_HUMAN_KEYS = {'', 'service', 'text', 'voice'}
+
     __slots__ = [
         '_browser',  # reference to the current Anki browser window
         '_notes',    # list of Note objects selected when window opened
@@ -138,11 +148,24 @@ class BrowserGenerator(ServiceDialog):
             lambda status: self._on_behavior_changed(),
         )
 
+        concurrency = QtWidgets.QSpinBox()
+        concurrency.setObjectName('concurrency')
+        concurrency.setRange(0, 64)
+        concurrency.setSuffix(" notes")
+        concurrency.setSpecialValueText("as many as the service can")
+
+        concurrency_line = QtWidgets.QHBoxLayout()
+        concurrency_line.addWidget(Label("Work on up to "))
+        concurrency_line.addWidget(concurrency)
+        concurrency_line.addWidget(Label(" at a time"))
+        concurrency_line.addStretch()
+
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(append)
         layout.addWidget(overwrite)
         layout.addSpacing(self._SPACING)
         layout.addWidget(behavior)
+        layout.addLayout(concurrency_line)
 
         widget = QtWidgets.QWidget()
         widget.setLayout(layout)
@@ -151,12 +174,18 @@ class BrowserGenerator(ServiceDialog):
 
     def _ui_buttons(self):
         """
-        Adjust title of the OK button.
+        Adjust title of the OK button and add a button for planning.
         """
 
         buttons = super(BrowserGenerator, self)._ui_buttons()
         buttons.findChild(QtWidgets.QAbstractButton, 'okay').setText("&Generate")
 
+        plan = buttons.addButton("&Plan...",
+                                 QtWidgets.QDialogButtonBox.ActionRole)
+        plan.setObjectName('plan')
+        plan.setAutoDefault(False)
+        plan.clicked.connect(self._on_plan)
+
         return buttons
 
     # Events #################################################################
@@ -213,6 +242,9 @@ class BrowserGenerator(ServiceDialog):
         self.findChild(Checkbox, 'behavior') \
             .setChecked(config['last_mass_behavior'])
 
+        self.findChild(QtWidgets.QSpinBox, 'concurrency') \
+            .setValue(config['last_mass_concurrency'])
+
         super(BrowserGenerator, self).show(*args, **kwargs)
 
         source.setFocus()
@@ -226,8 +258,6 @@ class BrowserGenerator(ServiceDialog):
         now = self._get_all()
         source = now['last_mass_source']
         dest = now['last_mass_dest']
-        append = now['last_mass_append']
-        behavior = now['last_mass_behavior']
 
         eligible_notes = [
             note
@@ -247,14 +277,82 @@ class BrowserGenerator(ServiceDialog):
             return
 
         self._disable_inputs()
+        self._accept_start(now, eligible_notes)
+
+    def resume(self):
+        """
+        Picks up the job recorded in the journal by an earlier run that
+        was aborted or did not get to finish (e.g. Anki crashed), using
+        that run's settings and skipping over notes it had already
+        committed, without having to go through the router for them.
+        """
+
+        journal = _Journal(self._addon.paths.journal)
+        state = journal.load()
+        col = self._browser.mw.col
+
+        if not state:
+            self._alerts("There is no interrupted job to resume.",
+                         self._browser)
+            return
+
+        if state['collection'] != col.path:
+            self._alerts("The interrupted job was started from a "
+                         "different profile and cannot be resumed here.",
+                         self._browser)
+            return
+
+        completed = set(state['completed'])
+        notes = []
+        for note_id in state['notes']:
+            if note_id in completed:
+                continue
+            try:
+                notes.append(col.getNote(note_id))
+            except Exception:  # deleted since, pylint:disable=broad-except
+                pass
+
+        if not notes:
+            journal.discard()
+            self._alerts("All the notes from the interrupted job have "
+                         "either been processed or deleted since.",
+                         self._browser)
+            return
+
+        self._addon.logger.info("Resuming job; %d of %d notes remaining",
+                                len(notes), len(state['notes']))
+
+        self._notes = notes
+        self._disable_inputs()
+        self._accept_start(state['all'], notes, state)
+
+    def _accept_start(self, now, eligible_notes, resumed=None):
+        """
+        Sets up the processing state for the given settings and notes,
+        records the job in the journal, and kicks off processing. If
+        resuming, the journal state from the earlier run is passed.
+        """
 
         svc_id = now['last_service']
         options = (None if svc_id.startswith('group:') else
                    now['last_options'][now['last_service']])
+        phrases = self._accept_phrases(now['last_mass_source'],
+                                       eligible_notes)
+
+        # if automatic, keep twice what can run at once handed to the
+        # router, so its scheduler always has the next phrase waiting
+        # for whichever worker frees up first
+        concurrency = now['last_mass_concurrency']
+        if concurrency < 1:
+            try:
+                concurrency = 2 * self._addon.router.get_parallelism(svc_id)
+            except Exception:  # fail later, pylint:disable=broad-except
+                concurrency = 1
 
         self._process = {
             'all': now,
             'aborted': False,
+            'journal': _Journal(self._addon.paths.journal),
             'progress': _Progress(
                 maximum=len(eligible_notes),
                 on_cancel=self._accept_abort,
@@ -267,14 +365,23 @@ class BrowserGenerator(ServiceDialog):
                 'options': options,
             },
             'fields': {
-                'source': source,
-                'dest': dest,
+                'source': now['last_mass_source'],
+                'dest': now['last_mass_dest'],
             },
             'handling': {
-                'append': append,
-                'behavior': behavior,
+                'append': now['last_mass_append'],
+                'behavior': now['last_mass_behavior'],
+            },
+            'queue': phrases,
+            'pipeline': {
+                'concurrency': concurrency,
+                'inflight': 0,     # phrases handed to router, not yet back
+                'launched': 0,     # sequence number for the next phrase
+                'committed': 0,    # sequence number of next phrase to commit
+                'results': {},     # sequence numbers to finished results
+                'handles': {},     # sequence numbers to router handles
+                'finished': False,  # set once _accept_done() is called
             },
-            'queue': eligible_notes,
             'counts': {
                 'total': len(self._notes),
                 'elig': len(eligible_notes),
@@ -282,126 +389,337 @@ class BrowserGenerator(ServiceDialog):
                 'done': 0,  # all notes processed
                 'okay': 0,  # calls which resulted in a successful MP3
                 'fail': 0,  # calls which resulted in an exception
+                'saved': 0,  # calls avoided by sharing a phrase's result
             },
             'failednotes': [],
             'exceptions': {},
-            'throttling': {
-                'calls': {},  # unthrottled download calls made per service
-                'sleep': self._addon.config['throttle_sleep'],
-                'threshold': self._addon.config['throttle_threshold'],
+            'unflushed': [],  # updated notes not yet written to collection
+            'state': {  # what gets written to the journal
+                'collection': self._browser.mw.col.path,
+                'all': now,
+                'notes': [note.id for note in eligible_notes],
+                'completed': [],  # note IDs updated and written out
+                'failed': {},  # note IDs to failure messages
             },
         }
 
+        if resumed:
+            state = self._process['state']
+            state['notes'] = resumed['notes']
+            state['completed'] = resumed['completed']
+
+        self._accept_save()
+
         self._browser.mw.checkpoint("AwesomeTTS Batch Update")
         self._process['progress'].show()
 
         self._accept_next()
 
+    def _accept_phrases(self, source, notes):
+        """
+        Sanitizes the source field of each note and groups together
+        notes that end up with identical text, returning a list of
+        (phrase, notes) tuples in the order each phrase first appears.
+
+        As the service and options are fixed for the run, each phrase
+        then only needs to be sent to the router once. The exception is
+        if human-readable filenames refer to note fields, in which case
+        each note must get its own call so it gets its own filename.
+        """
+
+        config = self._addon.config
+
+        per_note = config['filenames'] == 'human' and any(
+            key.strip().lower() not in self._SHARED_HUMAN_KEYS
+            for key in self._RE_MUSTACHE.findall(
+                config['filenames_human'] or '{{text}}'
+            )
+        )
+
+        phrases = []
+        lookup = {}
+
+        for note in notes:
+            phrase = self._addon.strip.from_note(note[source])
+            key = (phrase, id(note)) if per_note else phrase
+
+            try:
+                lookup[key][1].append(note)
+            except KeyError:
+                lookup[key] = phrase, [note]
+                phrases.append(lookup[key])
+
+        return phrases
+
     def _accept_abort(self):
         """
-        Flags that the user has requested that processing stops.
+        Flags that the user has requested that processing stops, and
+        cancels everything still in-flight, so that queued calls are
+        dropped and running ones interrupted.
         """
 
         self._process['aborted'] = True
 
+        for handle in list(self._process['pipeline']['handles'].values()):
+            if handle:
+                handle.cancel()
+
     def _accept_next(self):
         """
-        Pop the next note off the queue, if not throttled, and process.
+        Fill the pipeline with phrases off the queue, up to the number
+        allowed in-flight. Once the queue is empty (or processing
+        aborted) and nothing is in-flight, wrap up.
+
+        Download throttling is left to the router, which holds back
+        calls for any service that is over its rate limit.
         """
 
         self._accept_update()
 
         proc = self._process
-        throttling = proc['throttling']
+        pipeline = proc['pipeline']
+
+        if pipeline['finished']:
+            return  # a straggling single-shot after _accept_done()
 
         if proc['aborted'] or not proc['queue']:
-            self._accept_done()
+            if not pipeline['inflight']:
+                pipeline['finished'] = True
+                self._accept_done()
             return
 
-        if throttling['calls'] and \
-           max(throttling['calls'].values()) >= throttling['threshold']:
-            # at least one service needs a break
+        while proc['queue'] and \
+                pipeline['inflight'] < pipeline['concurrency']:
+            self._accept_launch(*proc['queue'].pop(0))
 
-            timer = QtCore.QTimer()
-            throttling['timer'] = timer
-            throttling['countdown'] = throttling['sleep']
-
-            timer.timeout.connect(self._accept_throttled)
-            timer.setInterval(1000)
-            timer.start()
-            return
+    def _accept_launch(self, phrase, notes):
+        """
+        Hand the given phrase off to the router on behalf of its notes.
+        Its result is held until all phrases launched before it have
+        been committed, so that notes are always updated in the same
+        order as the queue.
+        """
 
-        note = proc['queue'].pop(0)
-        phrase = note[proc['fields']['source']]
-        phrase = self._addon.strip.from_note(phrase)
-        self._accept_update(phrase)
+        proc = self._process
+        pipeline = proc['pipeline']
 
-        def done():
-            """Count the processed note."""
+        sequence = pipeline['launched']
+        pipeline['launched'] += 1
+        pipeline['inflight'] += 1
 
-            proc['counts']['done'] += 1
+        self._accept_update(phrase)
 
         def okay(path):
-            """Count the success and update the note."""
-
-            filename = self._browser.mw.col.media.addFile(path)
-            dest = proc['fields']['dest']
-            note[dest] = self._accept_next_output(note[dest], filename)
-            proc['counts']['okay'] += 1
-            note.flush()
+            """Hold onto the path for committing."""
 
-        def fail(exception, text="Not available by _accept_next.fail"):
-            """Count the failure and the unique message."""
+            pipeline['results'][sequence] = notes, path, None, phrase
 
-            proc['counts']['fail'] += 1
-            proc['failednotes'].append(text)
+        def fail(exception, text="Not available by _accept_launch.fail"):
+            """Hold onto the failure for committing."""
 
-            message = str(exception)
-            if isinstance(message, str):
-                message = self._RE_WHITESPACE.sub(' ', message).strip()
+            pipeline['results'][sequence] = notes, None, exception, text
 
-            try:
-                proc['exceptions'][message] += 1
-            except KeyError:
-                proc['exceptions'][message] = 1
+        def then():
+            """Commit what we can, then see about launching more."""
 
-        def miss(svc_id, count):
-            """Count the cache miss."""
+            pipeline['handles'].pop(sequence, None)
+            pipeline['inflight'] -= 1
 
             try:
-                throttling['calls'][svc_id] += count
-            except KeyError:
-                throttling['calls'][svc_id] = count
-
-        callbacks = dict(
-            done=done, okay=okay, fail=fail, miss=miss,
-
-            # The call to _accept_next() is done via a single-shot QTimer for
-            # a few reasons: keep the UI responsive, avoid a "maximum
-            # recursion depth exceeded" exception if we hit a string of cached
-            # files, and allow time to respond to a "cancel".
-            then=lambda: QtCore.QTimer.singleShot(0, self._accept_next),
-        )
+                self._accept_commit()
+            finally:
+                # The call to _accept_next() is done via a single-shot
+                # QTimer for a few reasons: keep the UI responsive, avoid
+                # a "maximum recursion depth exceeded" exception if we
+                # hit a string of cached files, and allow time to respond
+                # to a "cancel". It is always scheduled, so that the job
+                # still goes on (or wraps up) if committing went wrong.
+                QtCore.QTimer.singleShot(0, self._accept_next)
+
+        callbacks = dict(okay=okay, fail=fail, then=then)
 
         svc_id = proc['service']['id']
         want_human = (self._addon.config['filenames_human'] or '{{text}}' if
                       self._addon.config['filenames'] == 'human' else False)
+        priority = self._addon.router.Priority.BACKGROUND
+
+        pipeline['handles'][sequence] = None  # then() removes it when done
 
         if svc_id.startswith('group:'):
             config = self._addon.config
-            self._addon.router.group(text=phrase,
-                                     group=config['groups'][svc_id[6:]],
-                                     presets=config['presets'],
-                                     callbacks=callbacks,
-                                     want_human=want_human,
-                                     note=note)
+            handle = self._addon.router.group(
+                text=phrase,
+                group=config['groups'][svc_id[6:]],
+                presets=config['presets'],
+                callbacks=callbacks,
+                want_human=want_human,
+                note=notes[0],
+                priority=priority,
+            )
         else:
-            self._addon.router(svc_id=svc_id,
-                               text=phrase,
-                               options=proc['service']['options'],
-                               callbacks=callbacks,
-                               want_human=want_human,
-                               note=note)
+            handle = self._addon.router(
+                svc_id=svc_id,
+                text=phrase,
+                options=proc['service']['options'],
+                callbacks=callbacks,
+                want_human=want_human,
+                note=notes[0],
+                priority=priority,
+            )
+
+        if sequence in pipeline['handles']:  # i.e. not finished already
+            pipeline['handles'][sequence] = handle
+
+    def _accept_commit(self):
+        """
+        Apply finished results to their notes, in the order the phrases
+        were launched, stopping at the first one still in-flight.
+
+        If a result cannot be applied (e.g. its file was evicted from
+        the cache in the meantime), its notes are counted as failed.
+        """
+
+        proc = self._process
+        pipeline = proc['pipeline']
+        results = pipeline['results']
+
+        while pipeline['committed'] in results:
+            notes, path, exception, text = results.pop(pipeline['committed'])
+            pipeline['committed'] += 1
+
+            if isinstance(exception, self._addon.router.Cancelled):
+                continue  # aborted; left for a resumed job to pick up
+            proc['counts']['done'] += len(notes)
+            proc['counts']['saved'] += len(notes) - 1
+
+            if path:
+                try:
+                    filename = self._accept_media(path)
+                    dest = proc['fields']['dest']
+                    for note in notes:
+                        note[dest] = self._accept_next_output(note[dest],
+                                                              filename)
+                except Exception as error:  # all, pylint:disable=W0703
+                    self._accept_failed(notes, error, text)
+                    continue
+
+                proc['unflushed'] += notes
+                proc['counts']['okay'] += len(notes)
+
+                if len(proc['unflushed']) >= self._FLUSH_BATCH:
+                    self._accept_flush()
+
+            else:
+                self._accept_failed(notes, exception, text)
+
+    def _accept_failed(self, notes, exception, text):
+        """
+        Counts the given notes as failed with the given exception, and
+        records the failure for the report and the journal.
+        """
+
+        proc = self._process
+        proc['counts']['fail'] += len(notes)
+        proc['failednotes'] += [text] * len(notes)
+
+        message = str(exception)
+        if isinstance(message, str):
+            message = self._RE_WHITESPACE.sub(' ', message).strip()
+
+        for note in notes:
+            proc['state']['failed'][str(note.id)] = message
+
+        try:
+            proc['exceptions'][message] += len(notes)
+        except KeyError:
+            proc['exceptions'][message] = len(notes)
+
+    def _accept_media(self, path):
+        """
+        Registers the given file into the collection's media folder,
+        returning the filename to use on the note.
+
+        If nothing by that name exists in the media folder yet, the file
+        is hard-linked in rather than copied, which saves the disk space
+        for large runs and is fine as cache files are never rewritten in
+        place. Either way, the file then goes through Anki's usual
+        add_file(), so that it is entered into the media database (and
+        thus synced). For a linked file, Anki finds the identical file
+        already in place and just registers it. Otherwise (or if the
+        filesystem refuses the link), add_file() copies it in, skipping
+        identical files and renaming conflicting ones.
+        """
+
+        media = self._browser.mw.col.media
+        add_file = getattr(media, 'add_file', None) or media.addFile
+        filename = os.path.basename(path)
+        target = os.path.join(media.dir(), filename)
+
+        if os.path.exists(target):
+            return add_file(path)
+
+        try:
+            os.link(path, target)
+        except (AttributeError, OSError, NotImplementedError):
+            return add_file(path)  # e.g. cross-device or FAT; copy it
+
+        try:
+            return add_file(target)
+        except Exception:
+            os.unlink(target)  # do not leave an unregistered file behind
+            raise
+
+    def _accept_flush(self):
+        """
+        Writes out all notes updated since the last flush. Where the
+        collection supports it, this is one update_notes() call;
+        otherwise, notes are flushed individually.
+
+        The collection is then committed, and only after that are the
+        notes recorded as completed in the journal, so that a resumed
+        job never skips a note whose update was lost in a crash. If
+        writing fails, the notes are counted as failed instead.
+        """
+
+        proc = self._process
+        notes, proc['unflushed'] = proc['unflushed'], []
+        if not notes:
+            return
+
+        col = self._browser.mw.col
+
+        try:
+            if hasattr(col, 'update_notes'):
+                col.update_notes(notes)
+            else:
+                for note in notes:
+                    note.flush()
+
+            if hasattr(col, 'save'):  # newer Anki commits as it goes
+                col.save()
+
+        except Exception as exception:  # all, pylint:disable=W0703
+            source = proc['fields']['source']
+            proc['counts']['okay'] -= len(notes)
+            for note in notes:
+                self._accept_failed([note], exception, note[source])
+            return
+
+        proc['state']['completed'] += [note.id for note in notes]
+        self._accept_save()
+
+    def _accept_save(self):
+        """
+        Writes the current job state out to the journal.
+        """
+
+        proc = self._process
+
+        try:
+            proc['journal'].save(proc['state'])
+        except (EnvironmentError, TypeError, ValueError) as exception:
+            self._addon.logger.warning("Cannot write job journal: %s",
+                                       exception)
 
     def _accept_next_output(self, old_value, filename):
         """
@@ -426,28 +744,6 @@ class BrowserGenerator(ServiceDialog):
             else:
                 return filename
 
-    def _accept_throttled(self):
-        """
-        Called for every "timeout" of the timer during a throttling.
-        """
-
-        proc = self._process
-
-        if proc['aborted']:
-            proc['throttling']['timer'].stop()
-            self._accept_done()
-            return
-
-        proc['throttling']['countdown'] -= 1
-        self._accept_update()
-
-        if proc['throttling']['countdown'] <= 0:
-            proc['throttling']['timer'].stop()
-            del proc['throttling']['countdown']
-            del proc['throttling']['timer']
-            proc['throttling']['calls'] = {}
-            self._accept_next()
-
     def _accept_update(self, detail=None):
         """
         Update the progress bar and message.
@@ -470,16 +766,8 @@ class BrowserGenerator(ServiceDialog):
                       proc['counts']['okay'],
                       proc['counts']['fail'],
 
-                      "sleeping for %d second%s" % (
-                          proc['throttling']['countdown'],
-                          "s"
-                          if proc['throttling']['countdown'] != 1
-                          else ""
-                      )
-                      if (
-                          proc['throttling'] and
-                          'countdown' in proc['throttling']
-                      )
+                      "%d in progress" % proc['pipeline']['inflight']
+                      if proc['pipeline']['inflight']
                       else " "
                   ),
             value=proc['counts']['done'],
@@ -491,9 +779,12 @@ class BrowserGenerator(ServiceDialog):
         Display statistics and close out the dialog.
         """
 
+        self._accept_flush()
         self._browser.model.reset()
 
         proc = self._process
+        if not proc['aborted']:
+            proc['journal'].discard()
         proc['progress'].accept()
 
         messages = [
@@ -560,12 +851,26 @@ class BrowserGenerator(ServiceDialog):
         else:
             messages.append("there were no errors.")
 
+        if proc['counts']['saved']:
+            messages.append("\n\n")
+            messages.append(
+                "%d note%s shared a phrase with an earlier note, so %d "
+                "call%s to the service %s saved." % (
+                    proc['counts']['saved'],
+                    "s" if proc['counts']['saved'] != 1 else "",
+                    proc['counts']['saved'],
+                    "s" if proc['counts']['saved'] != 1 else "",
+                    "were" if proc['counts']['saved'] != 1 else "was",
+                )
+            )
+
         if proc['aborted']:
             messages.append("\n\n")
             messages.append(
                 "You aborted processing. If you want to rollback the changes "
                 "to the notes that were already processed, use the Undo "
-                "AwesomeTTS Batch Update option from the Edit menu."
+                "AwesomeTTS Batch Update option from the Edit menu. To pick "
+                "up where you left off, use Resume Interrupted Job instead."
             )
 
         self._addon.config.update(proc['all'])
@@ -582,6 +887,88 @@ class BrowserGenerator(ServiceDialog):
             lambda: self._alerts("".join(messages), self._browser),
         )
 
+    def _on_plan(self):
+        """
+        Without calling the service, work out how many of the selected
+        notes are already satisfied by the cache, how many will need
+        the service and how much text that is, and roughly how long it
+        should take, and then show that to the user.
+        """
+
+        now = self._get_all()
+        source = now['last_mass_source']
+        dest = now['last_mass_dest']
+        svc_id = now['last_service']
+        options = ({} if svc_id.startswith('group:') else
+                   now['last_options'][svc_id])
+
+        eligible_notes = [
+            note
+            for note in self._notes
+            if source in note and dest in note
+        ]
+        phrases = self._accept_phrases(source, eligible_notes)
+
+        report = self._addon.router.plan(
+            ((svc_id, phrase, options) for phrase, _ in phrases),
+            concurrency=now['last_mass_concurrency'],
+        )
+
+        def duration(seconds):
+            """Returns a rough, human-readable duration."""
+
+            if seconds is None:
+                return "an unknown time (no calls timed yet)"
+            if seconds < 90:
+                return "about %d second%s" % (seconds,
+                                              "s" if seconds != 1 else "")
+            if seconds < 5400:
+                return "about %d minutes" % round(seconds / 60)
+            return "about %.1f hours" % (seconds / 3600)
+
+        messages = [
+            "Of the %d note%s selected, %d can be processed, sharing "
+            "%d distinct phrase%s." % (
+                len(self._notes), "s" if len(self._notes) != 1 else "",
+                len(eligible_notes),
+                len(phrases), "s" if len(phrases) != 1 else "",
+            ),
+            "\n\n%d phrase%s already cached and %d will need the "
+            "service." % (
+                report['hits'], "s are" if report['hits'] != 1 else " is",
+                report['misses'] - report['duplicates'],
+            ),
+        ]
+
+        for stats in report['services'].values():
+            if stats['misses']:
+                messages.append(
+                    "\n\n%s: %d call%s for %d character%s, %d at a time, "
+                    "taking %s." % (
+                        stats['name'],
+                        stats['misses'], "s" if stats['misses'] != 1 else "",
+                        stats['chars'], "s" if stats['chars'] != 1 else "",
+                        stats['concurrency'],
+                        duration(stats['seconds']),
+                    )
+                )
+
+        if report['invalid']:
+            messages.append("\n\n%d phrase%s cannot be processed:" % (
+                report['invalid'], "s" if report['invalid'] != 1 else "",
+            ))
+            messages += [
+                "\n- %s (%d time%s)" % (message, count,
+                                        "s" if count != 1 else "")
+                for message, count in report['problems'].items()
+            ]
+
+        if report['misses'] > report['duplicates']:
+            messages.append("\n\nEstimated time: %s." %
+                            duration(report['seconds']))
+
+        self._alerts("".join(messages), self)
+
     def _get_all(self):
         """
         Adds support for fields and behavior.
@@ -595,6 +982,8 @@ class BrowserGenerator(ServiceDialog):
             [
                 ('last_mass_append', append),
                 ('last_mass_behavior', behavior),
+                ('last_mass_concurrency', self.findChild(
+                    QtWidgets.QSpinBox, 'concurrency').value()),
                 ('last_mass_dest', dest),
                 ('last_mass_source', source),
             ]
@@ -805,6 +1194,7 @@ class EditorGenerator(ServiceDialog):
 
         want_human = (self._addon.config['filenames_human'] or '{{text}}' if
                       self._addon.config['filenames'] == 'human' else False)
+        priority = self._addon.router.Priority.INTERACTIVE
 
         self._disable_inputs()
         if svc_id.startswith('group:'):
@@ -814,7 +1204,8 @@ class EditorGenerator(ServiceDialog):
                                      presets=config['presets'],
                                      callbacks=callbacks,
                                      want_human=want_human,
-                                     note=self._editor.note)
+                                     note=self._editor.note,
+                                     priority=priority)
         else:
             options = now['last_options'][now['last_service']]
             self._addon.router(svc_id=svc_id,
@@ -822,7 +1213,8 @@ class EditorGenerator(ServiceDialog):
                                options=options,
                                callbacks=callbacks,
                                want_human=want_human,
-                               note=self._editor.note)
+                               note=self._editor.note,
+                               priority=priority)
 
 
 class _Progress(Dialog):
@@ -912,3 +1304,58 @@ class _Progress(Dialog):
         self.findChild(QtWidgets.QProgressBar, 'bar').setValue(value)
         if detail:
             self.findChild(Note, 'detail').setText(detail)
+
+
+class _Journal(object):
+    """
+    Keeps the state of a BrowserGenerator job on disk so that it can be
+    resumed if it is aborted or Anki goes down partway through.
+    """
+
+    __slots__ = [
+        '_path',  # where the journal is kept, e.g. in user_files
+    ]
+
+    def __init__(self, path):
+        """
+        Stores the path of the journal.
+        """
+
+        self._path = path
+
+    def load(self):
+        """
+        Returns the recorded job state, or None if there is no journal
+        or it cannot be read.
+        """
+
+        try:
+            with open(self._path) as journal:
+                return json.load(journal)
+        except (EnvironmentError, ValueError):
+            return None
+
+    def save(self, state):
+        """
+        Writes the given job state out, by way of a temporary file so a
+        crash while writing never leaves a truncated journal behind.
+        """
+
+        directory = os.path.dirname(self._path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        temporary = self._path + '.tmp'
+        with open(temporary, 'w') as journal:
+            json.dump(state, journal, separators=(',', ':'))
+        os.replace(temporary, self._path)
+
+    def discard(self):
+        """
+        Removes the journal, e.g. once its job has finished.
+        """
+
+        try:
+            os.unlink(self._path)
+        except EnvironmentError:
+            pass
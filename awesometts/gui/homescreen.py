@@ -41,7 +41,8 @@ def makeLinkHandler(addon):
                 svc_id=preset['service'],
                 text=text,
                 options=preset,
-                callbacks=callbacks
+                callbacks=callbacks,
+                priority=addon.router.Priority.INTERACTIVE,
             )
 
             addon.config['homescreen_last_preset'] = awesometts_preset_name
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# AwesomeTTS text-to-speech add-on for Anki
+# Copyright (C) 2010-Present  Anki AwesomeTTS Development Team
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Housekeeping done in small slices while the add-on is idle
+"""
+
+import threading
+
+from PyQt5 import QtCore
+
+__all__ = ['Janitor']
+
+
+INTERVAL_SECS = 60  # how often to check whether there is time for chores
+
+
+class Janitor(object):
+    """
+    Runs housekeeping tasks (e.g. evicting from the cache or removing
+    scratch directories left behind by earlier sessions) on a background
+    thread, periodically, whenever the add-on is idle.
+
+    Each task should only do a small, bounded amount of work per run, so
+    that nothing is left for the end of the session and closing the
+    profile never has to wait on a large cleanup.
+    """
+
+    __slots__ = [
+        '_idle',    # callable returning True if nothing is being generated
+        '_logger',  # logger-like interface with debug(), info(), etc.
+        '_tasks',   # list of [callable, True if it should only run once]
+        '_thread',  # thread running the current round of tasks, if any
+        '_timer',   # QTimer that checks in every INTERVAL_SECS
+    ]
+
+    def __init__(self, idle, logger):
+        self._idle = idle
+        self._logger = logger
+        self._tasks = []
+        self._thread = None
+        self._timer = None
+
+    def add(self, task, once=False):
+        """
+        Adds a task to be run whenever the add-on is idle or, if once is
+        True, the first time that it is.
+        """
+
+        self._tasks.append((task, once))
+
+        if not self._timer:
+            self._timer = QtCore.QTimer()
+            self._timer.timeout.connect(self._on_timeout)
+            self._timer.start(INTERVAL_SECS * 1000)
+
+    def _on_timeout(self):
+        """Starts a round of tasks, unless busy or one is still going."""
+
+        if self._thread and self._thread.is_alive():
+            return
+        if not self._idle():
+            return
+
+        tasks = self._tasks
+        self._tasks = [(task, once) for task, once in tasks if not once]
+        self._thread = threading.Thread(target=self._run, args=(tasks,),
+                                        name='AwesomeTTS janitor',
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, tasks):
+        """Runs each of the given tasks, logging any that fail."""
+
+        for task, _ in tasks:
+            try:
+                task()
+            except Exception as exception:  # pylint:disable=broad-except
+                self._logger.warn("Housekeeping task failed: %s", exception)
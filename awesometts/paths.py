@@ -27,8 +27,11 @@ __all__ = [
     'ADDON',
     'ADDON_IS_LINKED',
     'CACHE',
+    'CACHE_INDEX',
     'CONFIG',
+    'JOURNAL',
     'LOG',
+    'PROBES',
     'TEMP',
     'ICONS'
 ]
@@ -51,8 +54,14 @@ os.makedirs(CACHE, exist_ok=True)
 
 ROOT = os.path.dirname(ADDON)
 
+CACHE_INDEX = os.path.join(ROOT, 'user_files', 'cache.db')
+
 CONFIG = os.path.join(ROOT, 'user_files', 'config.db')
 
+JOURNAL = os.path.join(ROOT, 'user_files', 'mass_job.json')
+
 LOG = os.path.join(ADDON, 'addon.log')
 
+PROBES = os.path.join(ROOT, 'user_files', 'probes.json')
+
 TEMP = tempfile.gettempdir()
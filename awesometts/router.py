@@ -20,8 +20,10 @@
 Dispatch management of available services
 """
 
+from collections import deque
 import os
 import os.path
+from queue import Empty, Queue
 from random import shuffle
 import re
 from http.client import IncompleteRead
@@ -31,13 +33,28 @@ from urllib.error import URLError
 
 from PyQt5 import QtCore, QtWidgets
 
-from .service import Trait as BaseTrait
+from .cache import KEY_VERSION
+from .service import Cancelled, CancelToken, Trait as BaseTrait
 
 __all__ = ['Router']
 
 
 FAILURE_CACHE_SECS = 3600  # ignore/dump failures from cache after one hour
 
+CONCURRENCY_LOCAL = 2  # default in-flight limit for other local services
+
+CONCURRENCY_NETWORK = 8  # default in-flight limit for online services
+
+POOL_MINIMUM = 4  # fewest worker threads when the pool size is automatic
+
+POOL_NETWORK = 16  # worker threads for online services when automatic
+
+RESERVED_INTERACTIVE = 1  # worker slots that only interactive calls may use
+
+LATENCY_WEIGHT = 0.2  # how much each new call moves a service's average
+
+DISCOVERY_WORKERS = 8  # services initialized at once building the list
+
 RE_MUSTACHE = re.compile(r'\{?\{\{(.+?)\}\}\}?')
 RE_UNSAFE = re.compile(r'[^\w\s()-]', re.UNICODE)
 RE_WHITESPACE = re.compile(r'[\0\s]+', re.UNICODE)
@@ -47,6 +64,19 @@ WINDOWS_RESERVED = ['com1', 'com2', 'com3', 'com4', 'com5', 'com6', 'com7',
                     'lpt5', 'lpt6', 'lpt7', 'lpt8', 'lpt9', 'nul', 'prn']
 
 
+class Priority(object):  # enum class, pylint:disable=R0903
+    """
+    Provides an enum-like namespace of request priorities. Lower values
+    are more urgent; waiting work is always started in this order.
+    """
+
+    INTERACTIVE = 0  # user is waiting on it, e.g. preview or playback
+    NORMAL = 1       # default for callers that do not say otherwise
+    BACKGROUND = 2   # bulk work, e.g. mass generation in the browser
+
+    ALL = (INTERACTIVE, NORMAL, BACKGROUND)
+
+
 def _prefixed(lines, prefix="!!! "):
     """Take incoming `lines` and prefix each line with `prefix`."""
 
@@ -56,6 +86,18 @@ def _prefixed(lines, prefix="!!! "):
     )
 
 
+def _canonical(value):
+    """
+    Returns the given option value as a string for cache keys, writing
+    numbers that are equal the same way (e.g. 1, 1.0, and True as "1").
+    """
+
+    if isinstance(value, (bool, int, float)):
+        return str(int(value)) if float(value).is_integer() \
+            else repr(float(value))
+    return value if isinstance(value, str) else str(value)
+
+
 class Router(object):
     """
     Allows the registration, lookup, and routing of concrete Service
@@ -66,23 +108,25 @@ class Router(object):
     results can be cached, transparently to both sides.
     """
 
+    Cancelled = Cancelled
+    Priority = Priority
     Trait = BaseTrait
 
-    class BusyError(RuntimeError):
-        """Raised for requests for files that are already underway."""
-
     __slots__ = [
-        '_busy',       # list of file paths that are in-progress
-        '_cache_dir',  # path for writing cached media files
+        '_cache',      # instance of Cache, indexing the cached media files
         '_config',     # user configuration (dict-like)
         '_failures',   # lookup of file paths that raised exceptions
+        '_inflight',   # lookup of in-progress paths to token and waiters
+        '_latency',    # lookup of service IDs to average seconds per call
         '_logger',     # logger-like interface with debug(), info(), etc.
+        '_net_pool',   # instance of the _Pool class for online services
         '_pool',       # instance of the _Pool class for managing threads
+        '_scheduler',  # instance of _Scheduler, limiting tasks per service
         '_services',   # bundle with dead services, aliases, avail, lookup
         '_temp_dir',   # path for writing human-readable filenames
     ]
 
-    def __init__(self, services, cache_dir, temp_dir, logger, config):
+    def __init__(self, services, cache, temp_dir, logger, config):
         """
         The services should be a bundle with the following:
 
@@ -94,8 +138,9 @@ class Router(object):
             - kwargs (dict): to be passed to Service constructors
             - config (dict-like): user configuration lookup
 
-        The cache directory should be one where media files get stored
-        for a semi-permanent time.
+        The cache should be a Cache instance whose directory is one
+        where media files get stored for a semi-permanent time, and
+        which is told about every file written there and every hit.
 
         The logger object should have an interface like the one used by
         the standard library logging module, with debug(), info(), and
@@ -118,15 +163,53 @@ class Router(object):
             for svc_id, svc_class in services.mappings
         }
 
-        self._busy = []
-        self._cache_dir = cache_dir
+        self._cache = cache
         self._config = config
         self._failures = {}
+        self._inflight = {}
+        self._latency = None  # loaded from configuration on first use
         self._logger = logger
-        self._pool = _Pool(logger)
+        self._net_pool = _Pool(logger, size=lambda: config['net_workers'],
+                               automatic=lambda: POOL_NETWORK)
+        self._pool = _Pool(logger, size=lambda: config['pool_workers'],
+                           automatic=lambda: max(os.cpu_count() or 1,
+                                                 POOL_MINIMUM))
+        self._scheduler = _Scheduler(self._pool_for, self.get_concurrency,
+                                     self.get_rate_limit, logger)
         self._services = services
         self._temp_dir = temp_dir
 
+    def shutdown(self):
+        """
+        Interrupts in-flight calls, retires the worker threads, and lets
+        loaded services stop their daemons, e.g. when the profile is
+        closed. The router remains usable afterward and will start new
+        workers.
+        """
+
+        for token, _ in self._inflight.values():
+            token.cancel()  # lets running workers finish up sooner
+        self._inflight = {}
+        self._scheduler.shutdown()
+        self._pool.shutdown()
+        self._net_pool.shutdown()
+
+        for service in self._services.lookup.values():
+            if service.get('instance'):
+                try:
+                    service['instance'].shutdown()
+                except Exception as exception:  # all, pylint:disable=W0703
+                    self._logger.warn("Could not shut down %s: %s",
+                                      service['name'], exception)
+
+        if self._latency is not None:
+            self._config['latencies'] = self._latency
+
+    def is_idle(self):
+        """Returns True if no calls are in flight or waiting to run."""
+
+        return not self._inflight
+
     def by_trait(self, trait):
         """
         Returns a list of service names that advertise the given trait.
@@ -174,13 +257,37 @@ class Router(object):
     def get_services(self):
         """
         Returns available services.
+
+        As many service constructors shell out to inspect the system
+        (e.g. listing voices), services are initialized side-by-side on
+        helper threads, except those that must be initialized on the
+        main thread, which are done while the helpers are working.
         """
 
         if not self._services.avail:
             self._logger.debug("Building the list of services...")
 
-            for service in self._services.lookup.values():
-                self._load_service(service)
+            pending = [service
+                       for service in self._services.lookup.values()
+                       if 'instance' not in service]
+            threaded = [service for service in pending
+                        if service['class'].THREADED_INIT]
+
+            if threaded:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(
+                        max_workers=min(len(threaded), DISCOVERY_WORKERS),
+                ) as executor:
+                    futures = [executor.submit(self._load_service, service)
+                               for service in threaded]
+                    for service in pending:
+                        if not service['class'].THREADED_INIT:
+                            self._load_service(service)
+                    for future in futures:
+                        future.result()
+
+            for service in pending:
+                self._load_service(service)  # i.e. any that were left
 
             self._services.avail = sorted([
                 (svc_id, service['name'])
@@ -227,6 +334,94 @@ class Router(object):
         svc_id, service = self._fetch_options_and_extras(svc_id)
         return service['extras']
 
+    def get_concurrency(self, svc_id):
+        """
+        Returns the maximum number of calls that may be in-flight at
+        once for the given (normalized) service ID.
+
+        A per-service override in the 'concurrency' configuration is
+        used if present. Otherwise, local services that only need the
+        CPU (i.e. transcoding, but not Internet-based) may use one call
+        per core, online services (whose calls mostly wait on the
+        network, and whose request rate is held by their token bucket
+        anyway) may use CONCURRENCY_NETWORK, and everything else is held
+        to CONCURRENCY_LOCAL.
+        """
+
+        try:
+            return max(int(self._config['concurrency'][svc_id]), 1)
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        traits = self._services.lookup[svc_id]['traits']
+        if BaseTrait.INTERNET in traits:
+            return CONCURRENCY_NETWORK
+        if BaseTrait.TRANSCODING in traits:
+            return os.cpu_count() or 1
+        return CONCURRENCY_LOCAL
+
+    def get_parallelism(self, svc_id):
+        """
+        Returns how many calls for the given service (or for the first
+        preset of the given group) can actually run at once, i.e. its
+        in-flight limit capped by the workers in the pool that its
+        tasks run on, less those reserved for interactive calls.
+
+        Bulk callers can use this to keep just enough calls handed to
+        the router that every usable worker stays busy (e.g. one eSpeak
+        or LAME process per core for local services) without queueing
+        up their whole workload at once.
+
+        Raises ValueError or EnvironmentError if the service is unknown
+        or unavailable (see _fetch_service) or the group is unusable.
+        """
+
+        if svc_id.startswith('group:'):
+            svc_id = self._group_preset(svc_id[6:])['service']
+        svc_id, _ = self._fetch_service(svc_id)
+
+        return max(min(self.get_concurrency(svc_id),
+                       self._pool_for(svc_id).capacity() -
+                       RESERVED_INTERACTIVE), 1)
+
+    def get_rate_limit(self, svc_id):
+        """
+        Returns how quickly the given (normalized) service ID may make
+        downloads, as a tuple of the sustained rate per second and the
+        number that may be made in a burst before that rate applies, or
+        None if the service is not Internet-based and so not limited.
+
+        A per-service override in the 'rate_limits' configuration, as a
+        dict with 'rate' and 'burst' keys, is used if present. Otherwise
+        the throttle settings apply, i.e. a burst of throttle_threshold
+        downloads, refilled evenly over throttle_sleep seconds.
+        """
+
+        if BaseTrait.INTERNET not in self._services.lookup[svc_id]['traits']:
+            return None
+
+        try:
+            limits = self._config['rate_limits'][svc_id]
+            return (max(float(limits['rate']), 0.001),
+                    max(float(limits['burst']), 1))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        burst = max(self._config['throttle_threshold'], 1)
+        return burst / max(self._config['throttle_sleep'], 1), burst
+
+    def get_latency(self, svc_id):
+        """
+        Returns the average number of seconds that a call to the given
+        (normalized) service ID has taken to run, or None if no calls
+        have been recorded for it yet.
+        """
+
+        if self._latency is None:
+            self._latency = dict(self._config['latencies'])
+
+        return self._latency.get(svc_id)
+
     def get_failure_count(self):
         """
         Returns the number of cached failures, after dumping any expired
@@ -246,7 +441,8 @@ class Router(object):
         self._failures = {}
 
     def group(self, text, group, presets, callbacks,
-              want_human=False, note=None):
+              want_human=False, note=None, async_variable=True,
+              priority=Priority.NORMAL):
         """
         Execute a group playback request using the passed group to be
         looked up using the passed presets.
@@ -258,9 +454,16 @@ class Router(object):
         how the caller wants the filename in the path to be formatted.
         Additionally, note may be passed to provide mustache values for
         the given template string.
+
+        The async_variable and priority parameters are passed onto each
+        bare call.
+
+        Returns a handle whose cancel() method stops trying presets and
+        cancels the one currently being tried.
         """
 
         self._call_assert_callbacks(callbacks)
+        handle = _Handle()
 
         try:
             mode = group['mode']
@@ -286,6 +489,20 @@ class Router(object):
                 callbacks['then']()
 
         else:
+            # group-level state, checked by every preset attempt, so that
+            # the handle works no matter how many attempts have come and
+            # gone (including ones that failed before self() returned)
+            state = dict(attempt=None, cancelled=False)
+
+            def cancel():
+                """Stops trying presets and cancels the current one."""
+                state['cancelled'] = True
+                del presets[:]
+                if state['attempt']:
+                    state['attempt'].cancel()
+
+            handle.bind(cancel)
+
             def on_okay(path):
                 """Executes caller callbacks with path."""
                 if 'done' in callbacks:
@@ -295,8 +512,9 @@ class Router(object):
                     callbacks['then']()
 
             def on_fail(exception, text):
-                """Go to next, unless playback already queued."""
-                if isinstance(exception, self.BusyError):
+                """Go to next preset, unless cancelled."""
+                if isinstance(exception, Cancelled):
+                    del presets[:]
                     if 'done' in callbacks:
                         callbacks['done']()
                     callbacks['fail'](exception, text)
@@ -312,6 +530,15 @@ class Router(object):
             def try_next():
                 """Pop next preset off and try playing text with it."""
 
+                if state['cancelled']:
+                    if 'done' in callbacks:
+                        callbacks['done']()
+                    callbacks['fail'](Cancelled("The request was cancelled."),
+                                      text)
+                    if 'then' in callbacks:
+                        callbacks['then']()
+                    return
+
                 try:
                     preset = presets.pop(0)
                 except IndexError:
@@ -325,14 +552,159 @@ class Router(object):
                         callbacks['then']()
                 else:
                     svc_id = preset.pop('service')
-                    self(svc_id=svc_id, text=text, options=preset,
-                         callbacks=internal_callbacks,
-                         want_human=want_human, note=note)
+                    attempt = state['attempt'] = _Handle()
+                    current = self(svc_id=svc_id, text=text, options=preset,
+                                   callbacks=internal_callbacks,
+                                   want_human=want_human, note=note,
+                                   async_variable=async_variable,
+                                   priority=priority)
+                    attempt.bind(current.cancel)  # stale if already moved on
 
             try_next()
 
+        return handle
+
+    def batch(self, items, callbacks, want_human=False, ordered=False,
+              async_variable=True, priority=Priority.NORMAL):
+        """
+        Execute many playback requests at once, where items is an
+        iterable of (svc_id, text, options, context) tuples. The svc_id
+        may also be 'group:' followed by a group name, in which case the
+        options are ignored and the group and presets are looked up
+        from the configuration. The context can be anything, and is
+        passed back with each item's result (e.g. a note).
+
+        Every item is validated and its cache path resolved up front.
+        Cache hits and invalid items are reported right away, and the
+        misses are then all handed to the scheduler together, which runs
+        them concurrently within each service's limit.
+
+        The callbacks parameter is a dict and contains the following:
+
+            - 'miss' (optional): same as for a regular bare call
+            - 'okay' (required): called with a path and an item context
+            - 'fail' (required): called with an exception, the text,
+               and an item context
+            - 'then' (optional): called once, after every item has been
+               reported to either okay or fail
+
+        Results are reported as each item completes, unless ordered is
+        True, in which case they are held back as needed so that they
+        are reported in the same order as the items.
+
+        The want_human, async_variable, and priority parameters have the
+        same meaning as for a regular bare call. If want_human is used, each
+        context is also passed along as the note for mustache values.
+
+        Returns a dict with the number of items in total and how many
+        were cache hits, misses, group requests, or invalid.
+        """
+
+        assert 'okay' in callbacks and callable(callbacks['okay'])
+        assert 'fail' in callbacks and callable(callbacks['fail'])
+
+        items = list(items)
+        counts = dict(total=len(items), hits=0, misses=0, groups=0,
+                      invalid=0)
+        held = {}  # index-to-report lookup for results not ready to go out
+        state = dict(left=len(items), next=0)
+
+        def report(index, emit):
+            """Emit result now or hold it back, then check if all done."""
+
+            if ordered:
+                held[index] = emit
+                while state['next'] in held:
+                    held.pop(state['next'])()
+                    state['next'] += 1
+            else:
+                emit()
+
+            state['left'] -= 1
+            if not state['left'] and 'then' in callbacks:
+                callbacks['then']()
+
+        def item_callbacks(index, context):
+            """Returns a bare call callbacks dict for the given item."""
+
+            result = dict(
+                okay=lambda path: report(
+                    index, lambda: callbacks['okay'](path, context)
+                ),
+                fail=lambda exception, text: report(
+                    index, lambda: callbacks['fail'](exception, text, context)
+                ),
+            )
+            if 'miss' in callbacks:
+                result['miss'] = callbacks['miss']
+            return result
+
+        deferred = []  # misses and group requests, run after all hits
+
+        for index, (svc_id, text, options, context) in enumerate(items):
+            if svc_id.startswith('group:'):
+                try:
+                    group = self._config['groups'][svc_id[6:]]
+                except KeyError:
+                    counts['invalid'] += 1
+                    item_callbacks(index, context)['fail'](ValueError(
+                        "There is no '%s' group" % svc_id[6:]
+                    ), text)
+                    continue
+
+                counts['groups'] += 1
+                deferred.append(lambda index=index, group=group, text=text,
+                                context=context: self.group(
+                                    text=text,
+                                    group=group,
+                                    presets=self._config['presets'],
+                                    callbacks=item_callbacks(index, context),
+                                    want_human=want_human,
+                                    note=context,
+                                    async_variable=async_variable,
+                                    priority=priority,
+                                ))
+                continue
+
+            try:
+                resolved = self._resolve(svc_id, text, options)
+            except Exception as exception:  # catch all, pylint:disable=W0703
+                counts['invalid'] += 1
+                item_callbacks(index, context)['fail'](exception, text)
+                continue
+
+            dispatch = (lambda index=index, context=context,
+                        resolved=resolved: self._dispatch(
+                            *resolved,
+                            callbacks=item_callbacks(index, context),
+                            want_human=want_human,
+                            note=context,
+                            async_variable=async_variable,
+                            priority=priority,
+                        ))
+
+            if resolved[5]:  # cache hit
+                counts['hits'] += 1
+                dispatch()
+            else:
+                counts['misses'] += 1
+                deferred.append(dispatch)
+
+        self._logger.debug("Batch of %(total)d: %(hits)d hit(s), "
+                           "%(misses)d miss(es), %(groups)d group(s), "
+                           "%(invalid)d invalid", counts)
+
+        for dispatch in deferred:
+            dispatch()
+
+        if not items and 'then' in callbacks:
+            callbacks['then']()
+
+        return counts
+
     def __call__(self, svc_id, text, options, callbacks,
-                 want_human=False, note=None, async_variable=True):
+                 want_human=False, note=None, async_variable=True,
+                 priority=Priority.NORMAL):
         """
         Given the service ID and associated options, pass the text into
         the service for processing.
@@ -358,6 +730,11 @@ class Router(object):
                errors or failed service calls occurs
             - 'then' (optional): called after the okay/fail callback
 
+        If a call that resolves to the same cache path is already
+        underway, this request is attached to it instead of running the
+        service again, and its callbacks are called when that call
+        completes.
+
         Because it is asynchronous in nature, this method does not raise
         exceptions normally; they are passed to callbacks['fail'].
 
@@ -367,11 +744,15 @@ class Router(object):
               the required callbacks
             - an exception could be theoretically be raised if the
               threading subsystem failed
-            - an exception raised in the callbacks themselves must be
-              handled in the actual callback code; e.g. an exception in
-              the 'done' handler will not cause the 'fail' handler to
-              be called, or an exception in the 'fail' handler would
-              not recall the 'fail' handler again
+            - an exception raised in the callbacks themselves is not
+              handled for the caller; e.g. an exception in the 'done'
+              handler will not cause the 'fail' handler to be called,
+              and an exception in the 'fail' handler will not recall
+              the 'fail' handler again. It is passed on (i.e. raised
+              from this method, or to Qt's exception hook for calls
+              that complete later) once 'then' has still been called
+              and, if other requests were attached to the same call,
+              once all of them have been called back as well
 
         If passed, want_human should be a template string that dictates
         how the caller wants the filename in the path to be formatted.
@@ -380,67 +761,156 @@ class Router(object):
 
         For synchronous testing (without the use of main event loop and
         process spawning) async_variable=False can be used.
+
+        The priority is one of the Router.Priority values. Waiting calls
+        are started most urgent first, and INTERACTIVE calls (i.e. ones
+        that the user is actively waiting on) also have worker slots
+        reserved for them. If an INTERACTIVE call joins one that is
+        still waiting at a lower priority, that call is promoted.
+
+        Returns a handle whose cancel() method withdraws this request,
+        calling back 'fail' with a Router.Cancelled exception (unless it
+        has already been called back). If no other request is waiting
+        on the same call, the call itself is dropped if still queued, or
+        interrupted if already running (i.e. its HTTP transfer closed
+        or its subprocess killed, and its temporary files removed).
         """
 
         self._call_assert_callbacks(callbacks)
+        handle = _Handle()
 
         try:
-            self._logger.debug("Call for '%s' w/ %s", svc_id, options)
-
-            svc_id, service, options = self._validate_service(svc_id, options)
-            if not text:
-                raise ValueError("No speakable text is present")
-            limit = 5000 if service['name'] == "Google Cloud Text-to-Speech" else 2000
-            if len(text) > limit:
-                raise ValueError("Text to speak is too long")
-            text = service['instance'].modify(text)
-            if not text:
-                raise ValueError("Text not usable by " + service['class'].NAME)
-            path = self._validate_path(svc_id, text, options)
-            cache_hit = os.path.exists(path)
+            svc_id, service, text, options, path, cache_hit = \
+                self._resolve(svc_id, text, options)
 
-            self._logger.debug(
-                "Parsed call to '%s' w/ %s and \"%s\" at %s (cache %s)",
-                svc_id, options, text, path, "hit" if cache_hit else "miss",
-            )
+        except Exception as exception:  # catch all, pylint:disable=W0703
+            try:
+                if 'done' in callbacks:
+                    callbacks['done']()
+                callbacks['fail'](exception, text)
+            finally:
+                if 'then' in callbacks:
+                    callbacks['then']()
 
-            # If we didn't get a cache hit, we have to call the real service,
-            # so check to see if it has any extras defined, and if so, add
-            # them to the options lookup for the service to use.
-            #
-            # n.b.: Even though the extras do not factor into an audio clip's
-            # cache path, they MIGHT need to factor into the failure cache in
-            # the future... This could be done by generating a special `fpath`
-            # value during this loop, and use that with the `_failures` lookup
-            # instead of the vanilla `path` (but this is a non-issue today,
-            # because iSpeech is the only `extras` service, and it has caching
-            # turned off, being that it is a paid-for key service
-
-            if not cache_hit:
-                for extra in self.get_extras(svc_id):
-                    key = extra['key']
-                    try:
-                        options[key] = self._config['extras'][svc_id][key]
-                        options[key] = options[key].strip()
-                        if not options[key]:
-                            raise KeyError
-                    except KeyError:
-                        if extra['required']:
-                            raise KeyError(
-                                "%s required to access %s" %
-                                (extra['label'].rstrip(':'), svc_id)
-                            )
-                        else:
-                            options[key] = None
+            return handle
 
-        except Exception as exception:  # catch all, pylint:disable=W0703
-            if 'done' in callbacks:
-                callbacks['done']()
-            callbacks['fail'](exception, text)
-            if 'then' in callbacks:
-                callbacks['then']()
+        self._dispatch(svc_id, service, text, options, path, cache_hit,
+                       callbacks, want_human, note, async_variable, priority,
+                       handle)
 
-            return
+        return handle
+
+    def plan(self, items, concurrency=None):
+        """
+        Works out what running the given items would involve, without
+        calling any service, where items is an iterable of (svc_id,
+        text, options) tuples. As with batch(), the svc_id may be a
+        'group:' name, in which case the group's first usable preset
+        is assumed (i.e. what an ordered group would try first).
+
+        If passed, concurrency caps the number of calls that the caller
+        will have in-flight at once, on top of each service's own limit.
+
+        Returns a dict with the following:
+
+            - total, hits, misses, invalid: item counts, where hits are
+              already satisfied by the cache and misses need the service
+            - duplicates: misses that share a cache path with an earlier
+              item, and so will not need their own call
+            - problems: lookup of error messages to number of items
+            - services: lookup of service IDs to a dict with the name,
+              hits, misses, chars (total length of the text that needs
+              synthesizing), latency (average seconds per call, or None
+              if unknown), concurrency (calls that will run at once),
+              and seconds (estimated time for the misses, or None)
+            - seconds: overall estimate, or None if any service with
+              misses has no recorded latency
+        """
+
+        report = dict(total=0, hits=0, misses=0, invalid=0, duplicates=0,
+                      problems={}, services={}, seconds=0)
+        seen = set()
+
+        def problem(exception):
+            """Count the item as invalid with the given problem."""
+
+            message = str(exception) or exception.__class__.__name__
+            report['invalid'] += 1
+            report['problems'][message] = report['problems'].get(message,
+                                                                 0) + 1
+
+        for svc_id, text, options in items:
+            report['total'] += 1
+
+            if svc_id.startswith('group:'):
+                try:
+                    options = self._group_preset(svc_id[6:])
+                except ValueError as exception:
+                    problem(exception)
+                    continue
+
+                svc_id = options.pop('service')
+
+            try:
+                svc_id, service, text, options, path, cache_hit = \
+                    self._resolve(svc_id, text, options, dry=True)
+            except Exception as exception:  # catch all, pylint:disable=W0703
+                problem(exception)
+                continue
+
+            try:
+                stats = report['services'][svc_id]
+            except KeyError:
+                limit = self.get_parallelism(svc_id)
+                stats = report['services'][svc_id] = dict(
+                    name=service['name'], hits=0, misses=0, chars=0,
+                    latency=self.get_latency(svc_id),
+                    concurrency=min(limit, concurrency) if concurrency
+                    else limit,
+                )
+
+            if cache_hit:
+                report['hits'] += 1
+                stats['hits'] += 1
+            elif path in seen:
+                report['misses'] += 1
+                report['duplicates'] += 1
+            else:
+                seen.add(path)
+                report['misses'] += 1
+                stats['misses'] += 1
+                stats['chars'] += len(text)
+
+        for stats in report['services'].values():
+            if not stats['misses']:
+                stats['seconds'] = 0
+            elif stats['latency'] is None:
+                stats['seconds'] = None
+            else:
+                stats['seconds'] = (stats['misses'] * stats['latency'] /
+                                    stats['concurrency'])
+
+            # services each have their own limit, so they run side-by-side
+            if stats['seconds'] is None or report['seconds'] is None:
+                report['seconds'] = None
+            else:
+                report['seconds'] = max(report['seconds'], stats['seconds'])
+
+        self._logger.debug("Plan for %(total)d: %(hits)d hit(s), "
+                           "%(misses)d miss(es), %(invalid)d invalid", report)
+
+        return report
+
+    def _dispatch(self, svc_id, service, text, options, path, cache_hit,
+                  callbacks, want_human, note, async_variable,
+                  priority=Priority.NORMAL, handle=None):
+        """
+        Given a request already resolved by _resolve(), calls back
+        immediately for a cache hit or a remembered failure, attaches
+        to the in-flight call for the same path, or schedules the
+        service to run. If passed, the handle is bound so that it can
+        cancel the request.
+        """
 
         def human(path):
             """Converts path into a human-readable one, if enabled."""
@@ -496,19 +966,32 @@ class Router(object):
             return new_path
 
         if cache_hit:
-            if 'done' in callbacks:
-                callbacks['done']()
-            callbacks['okay'](human(path))
-            if 'then' in callbacks:
-                callbacks['then']()
+            self._cache.hit(path)
+            try:
+                if 'done' in callbacks:
+                    callbacks['done']()
+                callbacks['okay'](human(path))
+            finally:
+                if 'then' in callbacks:
+                    callbacks['then']()
 
         elif (path in self._failures and
               time() - self._failures[path][0] < FAILURE_CACHE_SECS):
-            if 'done' in callbacks:
-                callbacks['done']()
-            callbacks['fail'](self._failures[path][1], text)
-            if 'then' in callbacks:
-                callbacks['then']()
+            try:
+                if 'done' in callbacks:
+                    callbacks['done']()
+                callbacks['fail'](self._failures[path][1], text)
+            finally:
+                if 'then' in callbacks:
+                    callbacks['then']()
+
+        elif path in self._inflight:
+            self._logger.debug("Joining in-flight call for %s", path)
+            waiter = (callbacks, human)
+            self._inflight[path][1].append(waiter)
+            self._scheduler.promote(svc_id, path, priority)
+            if handle:
+                handle.bind(lambda: self._cancel(svc_id, path, waiter, text))
 
         else:
             def on_error(exception):
@@ -516,61 +999,124 @@ class Router(object):
                 For Internet-based services, cache errors. Certain
                 exceptions are not cached, as they are usually network
                 or connectivity errors.
-
-                Afterward, pass exception to the fail handler.
                 """
 
                 if BaseTrait.INTERNET in service['class'].TRAITS and \
+                   not isinstance(exception, Cancelled) and \
                    not isinstance(exception, IncompleteRead) and \
                    not isinstance(exception, SocketError) and \
                    not isinstance(exception, URLError):
                     self._failures[path] = time(), exception
-                callbacks['fail'](exception, text)
-
-            service['instance'].net_reset()
-            self._busy.append(path)
 
-            def completion_callback(exception, text="Not available by Router.__call__.completion_callback"):
-                """Intermediate callback handler for all service calls."""
+            token = CancelToken()
+            waiter = (callbacks, human)
+            self._inflight[path] = (token, [waiter])
+            if handle:
+                handle.bind(lambda: self._cancel(svc_id, path, waiter, text))
 
-                self._busy.remove(path)
-
-                if 'done' in callbacks:
-                    callbacks['done']()
+            def completion_callback(exception):
+                """
+                Intermediate callback handler for all service calls,
+                passing the result onto everyone waiting on this path.
+                """
 
-                if 'miss' in callbacks:
-                    callbacks['miss'](svc_id, service['instance'].net_count())
+                if self._inflight.get(path, (None,))[0] is token:
+                    waiters = self._inflight.pop(path)[1]
+                else:  # cancelled with nobody left waiting on it
+                    waiters = []
+                net_count = timing.get('downloads', 0)
 
-                if exception:
-                    on_error(exception)
-                elif os.path.exists(path):
-                    callbacks['okay'](human(path))
-                else:
-                    on_error(RuntimeError(
+                if not exception and not os.path.exists(path):
+                    exception = RuntimeError(
                         "The %s service did not successfully write out an "
                         "MP3." % service['name']
-                    ))
+                    )
+                if exception:
+                    on_error(exception)
+                elif 'secs' in timing:
+                    self._record_latency(svc_id, timing['secs'])
 
-                if 'then' in callbacks:
-                    callbacks['then']()
+                # one waiter's broken callback must not keep the others
+                # from being called back; the first such exception is
+                # passed on once they all have been
+                errors = []
+
+                for number, (waiter_callbacks, waiter_human) \
+                        in enumerate(waiters):
+                    try:
+                        try:
+                            if 'done' in waiter_callbacks:
+                                waiter_callbacks['done']()
+
+                            if 'miss' in waiter_callbacks:  # 1st downloaded
+                                waiter_callbacks['miss'](
+                                    svc_id, 0 if number else net_count)
+
+                            if exception:
+                                waiter_callbacks['fail'](exception, text)
+                            else:
+                                waiter_callbacks['okay'](waiter_human(path))
+                        finally:
+                            if 'then' in waiter_callbacks:
+                                waiter_callbacks['then']()
+                    except Exception as error:  # pylint:disable=W0703
+                        errors.append(error)
+
+                if errors:
+                    raise errors[0]
+
+            timing = {}
 
             def task():
-                service['instance'].run(text, options, path)
+                instance = service['instance']
+                instance.net_reset()
+                instance.cancel_bind(token)
+                start = time()
+                try:
+                    token.check()  # e.g. cancelled before reaching a worker
+                    self._cache.shard(path)
+                    instance.run(text, options, path)
+                    timing['secs'] = time() - start
+
+                    # indexed (and hashed, to share identical files) here,
+                    # on the worker, rather than in the completion callback
+                    self._cache.add(path, svc_id)
+                except Exception:
+                    if token.cancelled:
+                        instance.cancel_cleanup()
+                    raise
+                finally:
+                    timing['downloads'] = instance.net_count()
+                    instance.cancel_bind(None)
 
             if async_variable:
+                def on_complete(exception):
+                    """Settle the service's downloads, then call back."""
+                    self._scheduler.settle(svc_id, timing.get('downloads', 0))
+                    completion_callback(exception)
+
                 def do_spawn():
-                    """Call if ready to start a thread to run the service."""
-                    self._pool.spawn(
+                    """Call if ready to schedule the service to run."""
+                    if token.cancelled:  # i.e. during the prerun hook
+                        completion_callback(Cancelled("The request was "
+                                                      "cancelled."))
+                        return
+                    self._scheduler.submit(
+                        svc_id=svc_id,
                         task=task,
-                        callback=completion_callback,
+                        callback=on_complete,
+                        priority=priority,
+                        key=path,
                     )
             else:
-                callback_exception = None
-                try:
-                    task()
-                except Exception as exception:
-                    callback_exception = exception
-                completion_callback(callback_exception)
+                def do_spawn():
+                    """Call if ready to run the service synchronously."""
+                    callback_exception = None
+                    try:
+                        task()
+                    except Exception as exception:  # all, pylint:disable=W0703
+                        callback_exception = exception
+                    completion_callback(callback_exception)
 
             if hasattr(service['instance'], 'prerun'):
                 def prerun_ok(result):
@@ -594,6 +1140,168 @@ class Router(object):
             else:
                 do_spawn()
 
+    def _group_preset(self, name):
+        """
+        Returns a copy of the first existing preset (including its
+        'service' key) of the given group, i.e. what an ordered group
+        would try first, raising ValueError if there is none.
+        """
+
+        try:
+            group = self._config['groups'][name]
+        except KeyError:
+            raise ValueError("There is no '%s' group" % name)
+
+        for preset in group.get('presets', []):
+            if preset in self._config['presets']:
+                return dict(self._config['presets'][preset])
+
+        raise ValueError("None of the group presets exist")
+
+    def _cancel(self, svc_id, path, waiter, text):
+        """
+        Withdraws the given waiter from the in-flight call for the path,
+        calling it back as cancelled. If nobody else is waiting on the
+        call, it is dropped from the scheduler if it has not started
+        yet, or interrupted by way of its token if it has.
+        """
+
+        try:
+            token, waiters = self._inflight[path]
+        except KeyError:
+            return  # already finished
+
+        for number, other in enumerate(waiters):
+            if other is waiter:
+                del waiters[number]
+                break
+        else:
+            return  # already called back
+
+        callbacks = waiter[0]
+        if 'done' in callbacks:
+            callbacks['done']()
+        callbacks['fail'](Cancelled("The request was cancelled."), text)
+        if 'then' in callbacks:
+            callbacks['then']()
+
+        if not waiters:
+            del self._inflight[path]
+            if self._scheduler.cancel(svc_id, path):
+                self._logger.debug("Dropped queued call for %s", path)
+            else:
+                self._logger.debug("Interrupting call for %s", path)
+                token.cancel()
+
+    def _resolve(self, svc_id, text, options, dry=False):
+        """
+        Validates a request and works out where its audio belongs,
+        returning the following:
+
+            - 0th: normalized service ID
+            - 1st: service lookup dict
+            - 2nd: text, as modified by the service
+            - 3rd: options, normalized and defaults filled in
+            - 4th: cache path
+            - 5th: True if the cache path already exists
+
+        If the cache path does not exist yet, any extras needed to run
+        the service are also filled into the options.
+
+        Files found under an older layout or key scheme are moved to the
+        cache path, unless dry is True (e.g. when only planning).
+
+        Raises an exception if the request is not valid.
+        """
+
+        self._logger.debug("Call for '%s' w/ %s", svc_id, options)
+
+        svc_id, service, options = self._validate_service(svc_id, options)
+        if not text:
+            raise ValueError("No speakable text is present")
+        limit = 5000 if service['name'] == "Google Cloud Text-to-Speech" else 2000
+        if len(text) > limit:
+            raise ValueError("Text to speak is too long")
+        text = service['instance'].modify(text)
+        if not text:
+            raise ValueError("Text not usable by " + service['class'].NAME)
+        path = self._path_cache(svc_id, text, options)
+        cache_hit = self._cache.exists(path, move=not dry) or \
+            self._cache.rekey(
+                lambda: self._path_cache(svc_id, text, options, version=1),
+                path,
+                move=not dry,
+            )
+
+        self._logger.debug(
+            "Parsed call to '%s' w/ %s and \"%s\" at %s (cache %s)",
+            svc_id, options, text, path, "hit" if cache_hit else "miss",
+        )
+
+        # If we didn't get a cache hit, we have to call the real service,
+        # so check to see if it has any extras defined, and if so, add
+        # them to the options lookup for the service to use.
+        #
+        # n.b.: Even though the extras do not factor into an audio clip's
+        # cache path, they MIGHT need to factor into the failure cache in
+        # the future... This could be done by generating a special `fpath`
+        # value during this loop, and use that with the `_failures` lookup
+        # instead of the vanilla `path` (but this is a non-issue today,
+        # because iSpeech is the only `extras` service, and it has caching
+        # turned off, being that it is a paid-for key service
+
+        if not cache_hit:
+            for extra in self.get_extras(svc_id):
+                key = extra['key']
+                try:
+                    options[key] = self._config['extras'][svc_id][key]
+                    options[key] = options[key].strip()
+                    if not options[key]:
+                        raise KeyError
+                except KeyError:
+                    if extra['required']:
+                        raise KeyError(
+                            "%s required to access %s" %
+                            (extra['label'].rstrip(':'), svc_id)
+                        )
+                    else:
+                        options[key] = None
+
+        return svc_id, service, text, options, path, cache_hit
+
+    def _pool_for(self, svc_id):
+        """
+        Returns the pool that tasks for the given service should run on.
+
+        Online services spend nearly all of their time waiting on the
+        network (often over several round trips, e.g. looking up a word
+        and then downloading its audio), so they get their own, larger
+        pool of workers. That way, they can have many conversations
+        going at once without tying up the workers that local services
+        (which are bound by the CPU) need, and vice versa.
+
+        These are plain threads rather than an event loop: every service
+        talks to the network through blocking calls (requests sessions,
+        and in places subprocesses like mplayer), and Anki does not ship
+        an asynchronous HTTP client, so each conversation needs a thread
+        of its own. As those threads spend their time blocked on sockets
+        with the GIL released, a few dozen of them cost little.
+        """
+
+        if BaseTrait.INTERNET in self._services.lookup[svc_id]['traits']:
+            return self._net_pool
+        return self._pool
+
+    def _record_latency(self, svc_id, secs):
+        """
+        Folds the duration of a successful call into the service's
+        average, weighting recent calls more heavily.
+        """
+
+        previous = self.get_latency(svc_id)
+        self._latency[svc_id] = (secs if previous is None else
+                                 previous + LATENCY_WEIGHT * (secs - previous))
+
     def _call_assert_callbacks(self, callbacks):
         """Checks the callbacks argument for validity."""
 
@@ -605,14 +1313,12 @@ class Router(object):
 
     def _validate_service(self, svc_id, options):
         """
-        Finds the given service ID, normalizes the text, and validates
-        the options, returning the following:
+        Finds the given service ID and validates the options, returning
+        the following:
 
             - 0th: normalized service ID
             - 1st: service lookup dict
-            - 2nd: normalized text
-            - 3rd: options, normalized and defaults filled in
-            - 4th: cache path
+            - 2nd: options, normalized and defaults filled in
         """
 
         svc_id, service = self._fetch_options_and_extras(svc_id)
@@ -701,22 +1407,6 @@ class Router(object):
 
         return problems
 
-    def _validate_path(self, svc_id, text, options):
-        """
-        Given the service ID, its associated options, and the desired
-        text, generate a cache path. If the file is already being
-        processed, raise a BusyError.
-        """
-
-        path = self._path_cache(svc_id, text, options)
-        if path in self._busy:
-            raise self.BusyError(
-                "The '%s' service is already busy processing %s." %
-                (svc_id, path)
-            )
-
-        return path
-
     def _fetch_options_and_extras(self, svc_id):
         """
         Identifies the service by its ID, checks to see if the options
@@ -853,25 +1543,47 @@ class Router(object):
                 service['name'], _prefixed(format_exc()),
             )
 
-    def _path_cache(self, svc_id, text, options):
+    def _path_cache(self, svc_id, text, options, version=KEY_VERSION):
         """
         Returns a consistent cache path given the svc_id, text, and
-        options. This can be used to repeat the same request yet reuse
-        the same path.
+        validated options. This can be used to repeat the same request
+        yet reuse the same path.
+
+        Options are put into a canonical form first, so that requests
+        for the same audio share a path even if the values were passed
+        differently (e.g. a rate of 1 vs. 1.0) or stray keys were left
+        in the options. Passing an older version gives the path that
+        scheme used, so that files from it can be found and moved.
         """
 
-        hash_input = '/'.join([
-            text,
-            svc_id,
-            ';'.join(
-                '='.join([
-                    key,
-                    value if isinstance(value, str) else str(value),
-                ])
-                for key, value
-                in sorted(options.items())
-            )
-        ])
+        if version == 1:
+            hash_input = '/'.join([
+                text,
+                svc_id,
+                ';'.join(
+                    '='.join([
+                        key,
+                        value if isinstance(value, str) else str(value),
+                    ])
+                    for key, value
+                    in sorted(options.items())
+                )
+            ])
+
+        else:
+            svc_options_keys = [svc_option['key'] for svc_option
+                                in self._services.lookup[svc_id]['options']]
+            hash_input = '/'.join([
+                'v%d' % version,
+                text,
+                svc_id,
+                ';'.join(
+                    '='.join([key, _canonical(value)])
+                    for key, value
+                    in sorted(options.items())
+                    if key in svc_options_keys
+                )
+            ])
 
         from hashlib import sha1
 
@@ -881,8 +1593,7 @@ class Router(object):
         ).hexdigest().lower()
 
         assert len(hex_digest) == 40, "unexpected output from hash library"
-        return os.path.join(
-            self._cache_dir,
+        return self._cache.path(
             '.'.join([
                 '-'.join([
                     svc_id, hex_digest[:8], hex_digest[8:16],
@@ -893,68 +1604,440 @@ class Router(object):
         )
 
 
+class _Handle(object):
+    """
+    Returned by Router calls, allowing the caller to cancel a request.
+    """
+
+    __slots__ = [
+        '_cancel',  # callable that cancels the request, if still pending
+    ]
+
+    def __init__(self):
+        """
+        Initializes a handle with nothing to cancel (e.g. for requests
+        that were answered straight away).
+        """
+
+        self._cancel = None
+
+    def bind(self, cancel):
+        """
+        Sets the callable used to cancel the request.
+        """
+
+        self._cancel = cancel
+
+    def cancel(self):
+        """
+        Cancels the request. This is safe to call more than once, or
+        after the request has already been called back.
+        """
+
+        cancel, self._cancel = self._cancel, None
+        if cancel:
+            cancel()
+
+
+class _Scheduler(object):
+    """
+    Sits in front of the pool, limiting how many tasks for any given
+    service may be in-flight at once and how quickly they may download.
+    Tasks beyond those limits wait in per-service, per-priority FIFO
+    queues until an earlier task completes or the service's token
+    bucket refills, while tasks for other services proceed.
+
+    Waiting tasks are always started in priority order, so interactive
+    tasks jump ahead of any queued background work. Interactive tasks
+    may also use RESERVED_INTERACTIVE worker slots (and the same number
+    of extra per-service slots) that other tasks may not, so that they
+    do not have to wait for bulk work that is already running. Worker
+    slots are counted separately for each pool that services use.
+
+    Each Internet-based service's bucket holds up to a burst of tokens
+    and refills at a steady rate. Starting a task takes one token, which
+    is settled against the number of downloads the task actually did
+    once it is complete (so tasks that did not download give their
+    token back). Services without a rate limit have no bucket.
+
+    All methods are expected to be called from the main thread.
+    """
+
+    __slots__ = [
+        '_buckets',  # dict of svc_ids mapping to [tokens, last refilled]
+        '_limit',    # callable returning the in-flight limit for a svc_id
+        '_logger',   # for writing messages about scheduling
+        '_pending',  # dict of svc_ids mapping to deques, one per priority
+        '_pool',     # callable returning the _Pool that runs a svc_id's tasks
+        '_rate',     # callable returning (per second, burst) or None
+        '_running',  # dict of svc_ids mapping to their in-flight count
+        '_total',    # dict of pools mapping to in-flight counts per priority
+        '_waking',   # set of svc_ids with a refill wake-up timer pending
+    ]
+
+    def __init__(self, pool, limit, rate, logger):
+        """
+        Initialize the callables for looking up the pool to hand a
+        service's tasks to, its in-flight limit, and its rate limit, and
+        empty lookups.
+        """
+
+        self._buckets = {}
+        self._limit = limit
+        self._logger = logger
+        self._pending = {}
+        self._pool = pool
+        self._rate = rate
+        self._running = {}
+        self._total = {}
+        self._waking = set()
+
+    def submit(self, svc_id, task, callback, priority=None, key=None):
+        """
+        Queue up the task for the given service at the given priority
+        (defaulting to normal) and start whatever the limits allow. The
+        callback will be called with any exception once it completes.
+
+        If passed, the key can be used to promote the task later on.
+        """
+
+        if priority is None:
+            priority = Priority.NORMAL
+
+        pending = self._pending.setdefault(
+            svc_id,
+            [deque() for _ in Priority.ALL],
+        )
+        pending[priority].append((key, task, callback))
+
+        self._drain()
+
+        if pending[priority]:
+            self._logger.debug("Deferred %s task at priority %d; %d waiting",
+                               svc_id, priority, len(pending[priority]))
+
+    def promote(self, svc_id, key, priority):
+        """
+        If the task with the given key is still waiting at a less urgent
+        priority, moves it to the back of the given priority's queue and
+        starts whatever the limits now allow.
+        """
+
+        try:
+            pending = self._pending[svc_id]
+        except KeyError:
+            return
+
+        for lower in Priority.ALL[priority + 1:]:
+            for entry in pending[lower]:
+                if entry[0] == key:
+                    pending[lower].remove(entry)
+                    pending[priority].append(entry)
+                    self._logger.debug("Promoted %s task to priority %d",
+                                       svc_id, priority)
+                    self._drain()
+                    return
+
+    def cancel(self, svc_id, key):
+        """
+        Drops the waiting task with the given key, returning True if it
+        was found (i.e. it had not been started yet).
+        """
+
+        try:
+            pending = self._pending[svc_id]
+        except KeyError:
+            return False
+
+        for queue in pending:
+            for entry in queue:
+                if entry[0] == key:
+                    queue.remove(entry)
+                    if not any(pending):
+                        del self._pending[svc_id]
+                    return True
+
+        return False
+
+    def settle(self, svc_id, downloads):
+        """
+        Charges the service's bucket for the downloads done by a task
+        that has completed, less the token taken when it was started.
+        """
+
+        bucket = self._refill(svc_id)
+        if bucket:
+            bucket[0] -= downloads - 1
+
+    def shutdown(self):
+        """
+        Drops all waiting tasks and forgets in-flight counts and bucket
+        levels, e.g. for when the pool is also being shut down.
+        """
+
+        self._buckets = {}
+        self._pending = {}
+        self._running = {}
+        self._total = {}
+
+    def _refill(self, svc_id):
+        """
+        Tops up the service's bucket for the time that has passed since
+        it was last refilled, returning it, or None if the service is
+        not rate limited.
+        """
+
+        rate = self._rate(svc_id)
+        if not rate:
+            return None
+
+        per_second, burst = rate
+        now = time()
+
+        try:
+            bucket = self._buckets[svc_id]
+        except KeyError:
+            bucket = self._buckets[svc_id] = [burst, now]
+        else:
+            bucket[0] = min(bucket[0] + (now - bucket[1]) * per_second, burst)
+            bucket[1] = now
+
+        return bucket
+
+    def _throttled(self, svc_id):
+        """
+        Returns False if the service has a token to start a task with.
+        Otherwise, arranges for waiting tasks to be looked at again once
+        a token should be available, and returns True.
+        """
+
+        bucket = self._refill(svc_id)
+        if not bucket or bucket[0] >= 1:
+            return False
+        tokens = bucket[0]
+
+        if svc_id not in self._waking:
+            per_second, _ = self._rate(svc_id)
+            delay = (1 - tokens) / per_second
+            self._logger.debug("Throttling %s for %.1f seconds", svc_id,
+                               delay)
+
+            def wake():
+                """Look at the waiting tasks again."""
+                self._waking.discard(svc_id)
+                self._drain()
+
+            self._waking.add(svc_id)
+            QtCore.QTimer.singleShot(int(delay * 1000) + 1, wake)
+
+        return True
+
+    def _allowed(self, svc_id, priority):
+        """
+        Returns True if a task for the given service and priority may
+        start now, given in-flight counts, reserved slots, and tokens.
+        """
+
+        reserve = 0 if priority == Priority.INTERACTIVE \
+            else RESERVED_INTERACTIVE
+        pool = self._pool(svc_id)
+
+        return (
+            sum(self._total.get(pool, ())) < pool.capacity() - reserve and
+            self._running.get(svc_id, 0) <
+            self._limit(svc_id) + RESERVED_INTERACTIVE - reserve and
+            not self._throttled(svc_id)
+        )
+
+    def _drain(self):
+        """
+        Start as many waiting tasks as the limits currently allow, all
+        interactive tasks first, then normal, then background.
+        """
+
+        for priority in Priority.ALL:
+            for svc_id, pending in list(self._pending.items()):
+                queue = pending[priority]
+                while queue and self._allowed(svc_id, priority):
+                    _, task, callback = queue.popleft()
+                    self._start(svc_id, priority, task, callback)
+
+                if not any(pending):
+                    del self._pending[svc_id]
+
+    def _start(self, svc_id, priority, task, callback):
+        """
+        Hand the task to the pool, counting it against the service's
+        and its priority's limits until it completes and taking a token
+        from its bucket.
+        """
+
+        pool = self._pool(svc_id)
+        total = self._total.setdefault(pool, [0] * len(Priority.ALL))
+
+        self._running[svc_id] = self._running.get(svc_id, 0) + 1
+        total[priority] += 1
+        bucket = self._refill(svc_id)
+        if bucket:
+            bucket[0] -= 1
+
+        def on_complete(exception):
+            """Release the slot, run the callback, then start the next."""
+
+            self._running[svc_id] -= 1
+            total[priority] -= 1
+            try:
+                callback(exception)
+            finally:
+                self._drain()
+
+        pool.spawn(task=task, callback=on_complete)
+
+
 class _Pool(QtWidgets.QWidget):
     """
-    Managers a pool of worker threads to keep the UI responsive.
+    Manages a bounded pool of long-lived worker threads, fed from a FIFO
+    task queue, to keep the UI responsive.
     """
 
     __slots__ = [
-        '_current_id',  # the last/current worker ID in-use
+        '_automatic',   # callable returning the size to use if not set
+        '_callbacks',   # dict of task IDs mapping to callbacks in Router
+        '_current_id',  # the last/current task ID in-use
         '_logger',      # for writing messages about threads
-        '_threads',     # dict of IDs mapping workers and callbacks in Router
+        '_retired',     # workers told to exit, kept until they finish
+        '_size',        # callable returning the number of workers wanted
+        '_tasks',       # FIFO of (task ID, task) tuples, new after shutdown
+        '_workers',     # list of running _Worker threads
     ]
 
-    def __init__(self, logger, *args, **kwargs):
+    def __init__(self, logger, size, automatic, *args, **kwargs):
         """
-        Initialize my internal state (next ID and lookup pools for the
-        callbacks and workers).
+        Initialize my internal state (next ID, task queue, and lookup
+        for the callbacks). Workers are not started until needed.
+
+        The size should be a callable returning the number of workers
+        the pool should keep running; zero or less means the number
+        returned by the automatic callable should be used instead.
         """
 
         super(_Pool, self).__init__(*args, **kwargs)
 
+        self._automatic = automatic
+        self._callbacks = {}
         self._current_id = 0
         self._logger = logger
-        self._threads = {}
+        self._retired = []
+        self._size = size
+        self._tasks = Queue()
+        self._workers = []
 
     def spawn(self, task, callback):
         """
-        Create a worker thread for the given task. When the thread
-        completes, the callback will be called.
+        Queue the given task to be run by the next available worker.
+        When the task completes, the callback will be called on the main
+        thread.
         """
 
         self._current_id += 1
-        thread = self._threads[self._current_id] = {
-            # keeping a reference to worker prevents garbage collection
-            'callback': callback,
-            'done': False,
-            'worker': _Worker(self._current_id, task),
-        }
+        self._callbacks[self._current_id] = callback
+        self._tasks.put((self._current_id, task))
 
-        thread['worker'].tts_thread_done.connect(self._on_worker_signal)
-        thread['worker'].tts_thread_raised.connect(self._on_worker_signal)
-        thread['worker'].finished.connect(self._on_worker_finished)
-        thread['worker'].start()
+        self._resize()
 
         self._logger.debug(
-            "Spawned thread [%d]; pool=%s",
-            self._current_id, self._threads,
+            "Queued task [%d]; %d pending, %d worker%s",
+            self._current_id, len(self._callbacks), len(self._workers),
+            "s" if len(self._workers) != 1 else "",
         )
 
-    def _on_worker_signal(self, thread_id, exception=None, stack_trace=None):
+    def shutdown(self):
+        """
+        Tells every worker to exit once it finishes its current task.
+        Any tasks still queued behind them are dropped, and their
+        callbacks are never called. The pool may be used again later,
+        in which case new workers are started.
+
+        The retiring workers keep the old queue to themselves, and new
+        workers get a fresh one, so that a stop sentinel meant for a
+        worker still busy with its last task can never be picked up by
+        (and stop) a worker started after this.
+        """
+
+        if not self._workers:
+            return
+
+        tasks, self._tasks = self._tasks, Queue()
+        while True:
+            try:
+                tasks.get_nowait()
+            except Empty:
+                break
+        self._callbacks = {}
+
+        for _ in self._workers:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.wait(100)  # idle workers exit immediately
+
+        self._logger.debug("Retired %d worker(s)", len(self._workers))
+
+        # busy workers finish their current task in the background, but
+        # must stay referenced until then to avoid garbage collection
+        self._retired = [worker
+                         for worker in self._retired + self._workers
+                         if not worker.isFinished()]
+        self._workers = []
+
+    def capacity(self):
+        """
+        Returns the number of workers the pool should have, which is
+        always enough to leave room for the reserved interactive slots.
+        """
+
+        size = self._size()
+        if size < 1:
+            size = self._automatic()
+
+        return max(size, RESERVED_INTERACTIVE + 1)
+
+    def _resize(self):
+        """
+        Starts up additional workers if the pool has fewer than wanted.
+        A smaller size takes effect the next time the pool is shut down.
+        """
+
+        size = self.capacity()
+
+        while len(self._workers) < size:
+            worker = _Worker(self._tasks)
+            worker.tts_thread_done.connect(self._on_worker_signal)
+            worker.tts_thread_raised.connect(self._on_worker_signal)
+            worker.start()
+            self._workers.append(worker)  # reference prevents GC
+
+            self._logger.debug("Started worker #%d", len(self._workers))
+
+    def _on_worker_signal(self, task_id, exception=None, stack_trace=None):
         """
-        When the worker signals it's done with its task, execute the
+        When a worker signals it's done with a task, execute the
         callback that was registered for it, passing on any exception.
         """
 
+        try:
+            callback = self._callbacks.pop(task_id)
+        except KeyError:  # pool was shut down while task was running
+            return
+
         if exception:
             message = str(exception)
             if not message:
                 message = "No additional details available"
 
             self._logger.debug(
-                "Exception from thread [%d] (%s); executing callback\n%s",
+                "Exception from task [%d] (%s); executing callback\n%s",
 
-                thread_id, message,
+                task_id, message,
 
                 _prefixed(stack_trace)
                 if isinstance(stack_trace, str)
@@ -963,72 +2046,53 @@ class _Pool(QtWidgets.QWidget):
 
         else:
             self._logger.debug(
-                "Completion from thread [%d]; executing callback",
-                thread_id,
+                "Completion from task [%d]; executing callback",
+                task_id,
             )
 
-        self._threads[thread_id]['callback'](exception)
-        self._threads[thread_id]['done'] = True
-
-    def _on_worker_finished(self):
-        """
-        When the worker is finished, which happens sometime briefly
-        after it's done with its task, delete it from the thread pool if
-        its callback has already executed.
-        """
-
-        thread_ids = [
-            thread_id
-            for thread_id, thread in self._threads.items()
-            if thread['done'] and thread['worker'].isFinished()
-        ]
-
-        if not thread_ids:
-            return
-
-        for thread_id in thread_ids:
-            del self._threads[thread_id]
-
-        self._logger.debug(
-            "Reaped thread%s %s; pool=%s",
-            "s" if len(thread_ids) != 1 else "", thread_ids, self._threads,
-        )
+        callback(exception)
 
 
 class _Worker(QtCore.QThread):
     """
-    Generic worker for running processes in the background.
+    Generic long-lived worker for running tasks in the background.
     """
 
     tts_thread_done = QtCore.pyqtSignal(int, name='awesomeTtsThreadDone')
     tts_thread_raised = QtCore.pyqtSignal(int, Exception, str, name='awesomeTtsThreadRaised')
 
     __slots__ = [
-        '_thread_id',  # my thread ID; used to communicate back to main thread
-        '_task',       # the task I will need to call when run
+        '_tasks',  # my pool's queue to pull (task ID, task) tuples from
     ]
 
-    def __init__(self, thread_id, task):
+    def __init__(self, tasks):
         """
-        Save my worker ID and task.
+        Save a reference to the shared task queue.
         """
 
         super(_Worker, self).__init__()
 
-        self._id = thread_id
-        self._task = task
+        self._tasks = tasks
 
     def run(self):
         """
-        Run my assigned task. If an exception is raised, pass it back to
-        the main thread via the callback.
+        Run tasks from the queue until told to stop with a None. If a
+        task raises an exception, pass it back to the main thread via
+        the signal.
         """
 
-        try:
-            self._task()
-        except Exception as exception:  # catch all, pylint:disable=W0703
-            from traceback import format_exc
-            self.tts_thread_raised.emit(self._id, exception, format_exc())
-            return
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                return
+
+            task_id, task = item
+
+            try:
+                task()
+            except Exception as exception:  # catch all, pylint:disable=W0703
+                from traceback import format_exc
+                self.tts_thread_raised.emit(task_id, exception, format_exc())
+                continue
 
-        self.tts_thread_done.emit(self._id)
+            self.tts_thread_done.emit(task_id)
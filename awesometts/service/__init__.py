@@ -20,7 +20,7 @@
 Service classes for AwesomeTTS
 """
 
-from .common import Trait
+from .common import Cancelled, CancelToken, Trait
 
 from .azure import Azure
 from .baidu import Baidu
@@ -51,6 +51,8 @@ from .forvo import Forvo
 
 __all__ = [
     # common
+    'Cancelled',
+    'CancelToken',
     'Trait',
 
     # services
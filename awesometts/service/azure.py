@@ -23,7 +23,6 @@ https://azure.microsoft.com/en-us/services/cognitive-services/text-to-speech/
 
 import time
 import datetime
-import requests
 from xml.etree import ElementTree
 from .base import Service
 from .languages import Gender
@@ -333,8 +332,11 @@ class Azure(Service):
         headers = {
             'Ocp-Apim-Subscription-Key': subscription_key
         }
-        response = requests.post(fetch_token_url, headers=headers)
-        self.access_token = str(response.text)
+        self.access_token = self.net_stream(
+            fetch_token_url,
+            method='POST',
+            custom_headers=headers,
+        ).decode()
         self.access_token_timestamp = datetime.datetime.now()
         self._logger.debug(f'requested access_token')
 
@@ -393,13 +395,16 @@ class Azure(Service):
 
         self._logger.info(f"xml request: {body}")
 
-        response = requests.post(constructed_url, headers=headers, data=body)
-        if response.status_code == 200:
-            with open(path, 'wb') as audio:
-                audio.write(response.content)
-        else:
-            error_message = f"Status code: {response.status_code} reason: {response.reason} voice: [{voice_name}] language: [{language} " + \
-            f"subscription key: [{subscription_key}]] access token timestamp: [{self.access_token_timestamp}] access token: [{self.access_token}]"
+        try:
+            self.net_download(
+                path,
+                (constructed_url, body),
+                method='POST',
+                custom_headers=headers,
+            )
+        except (IOError, ValueError) as error:
+            error_message = f"{error} voice: [{voice_name}] language: [{language}] " + \
+            f"access token timestamp: [{self.access_token_timestamp}]"
             raise ValueError(error_message)
 
 
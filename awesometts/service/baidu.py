@@ -25,8 +25,6 @@ from .base import Service
 from .common import Trait
 from urllib.parse import quote_plus
 from urllib.parse import urlencode
-from urllib.request import Request
-from urllib.request import urlopen
 import datetime
 import json
 
@@ -149,8 +147,12 @@ class Baidu(Service):
         
         post_data = urlencode(params).encode('utf-8')
         
-        req = Request('http://openapi.baidu.com/oauth/2.0/token', post_data)
-        result = json.loads(urlopen(req, timeout=5).read().decode())
+        response = self.net_session().post(
+            'http://openapi.baidu.com/oauth/2.0/token', data=post_data,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            timeout=5)
+        response.raise_for_status()
+        result = json.loads(response.content.decode())
         
         if 'access_token' in result.keys() and 'scope' in result.keys():
             if not 'audio_tts_post' in result['scope'].split(' '):
@@ -183,8 +185,11 @@ class Baidu(Service):
         }
         
         post_data = urlencode(params).encode('utf-8')
-        req = Request('http://tsn.baidu.com/text2audio', post_data)
-        audio_content = urlopen(req).read()
+        response = self.net_session().post(
+            'http://tsn.baidu.com/text2audio', data=post_data,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response.raise_for_status()
+        audio_content = response.content
         
         if options['encoding'] == 3:
             # Write MP3 audio content direct to file
@@ -24,11 +24,17 @@ TTS services for use with AwesomeTTS.
 """
 
 import abc
+from contextlib import contextmanager
+import io
+import json
 import os
 import shutil
 import sys
 import subprocess
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 __all__ = ['Service']
 
@@ -36,8 +42,34 @@ __all__ = ['Service']
 DEFAULT_UA = 'Mozilla/5.0'
 DEFAULT_TIMEOUT = 15
 
+# used if the framework does not pass a net_pool callable
+DEFAULT_POOL = (10, 2)
+
+# transient upstream failures that are worth another try on a new socket
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# most requests net_stream() will have in flight to one host when fetching
+# multiple targets in parallel, across all services and worker threads
+PARALLEL_PER_HOST = 4
+
 PADDING = b'\0' * 2**11
 
+# largest response we will accept unless a service asks for something else
+MAX_SIZE = 2**26
+
+# size of the reads used when copying a response onto its destination
+CHUNK_SIZE = 2**14
+
+# times a daemon may be (re)started in a session before we give up on it
+DAEMON_STARTS = 3
+
+# seconds a daemon has to become ready after being started
+DAEMON_TIMEOUT = 15
+
+# days that remembered cli_probe() output is trusted, e.g. in case new
+# voices have been installed without the binary itself changing
+PROBE_DAYS = 7
+
 
 class Service(object, metaclass=abc.ABCMeta):
     """
@@ -64,9 +96,11 @@ class Service(object, metaclass=abc.ABCMeta):
         """Raises when a download is too small."""
 
     __slots__ = [
-        '_netops',      # number of network ops required by the last run
+        '_local',       # per-thread state, e.g. network ops, cancel token
         '_lame_flags',  # callable to get flag string for LAME transcoder
         '_logger',      # logging interface with debug(), info(), etc.
+        '_net_pool',    # callable to get HTTP pool size and retry count
+        '_probe_path',  # JSON file for remembering cli_probe() output
         'normalize',    # callable for standardizing string values
         '_temp_dir',    # for temporary scratch space
         'ecosystem',    # get information about web API, user agent
@@ -94,6 +128,11 @@ class Service(object, metaclass=abc.ABCMeta):
     # will be set to True if user is running Windows
     IS_WINDOWS = False
 
+    # whether the service may be initialized off of the main thread (e.g.
+    # alongside others when building the list of services), which is not
+    # the case for services that set up thread-bound resources like COM
+    THREADED_INIT = True
+
     # work-in-progress
     APPROX_MAPPER = {
         '\u00c1': 'A', '\u00c4': 'A', '\u00c5': 'A', '\u00c9': 'E',
@@ -130,7 +169,8 @@ class Service(object, metaclass=abc.ABCMeta):
     # e.g. TRAITS = [Trait.INTERNET, Trait.TRANSCODING]
     TRAITS = None
 
-    def __init__(self, temp_dir, lame_flags, normalize, logger, ecosystem):
+    def __init__(self, temp_dir, lame_flags, normalize, logger, ecosystem,
+                 net_pool=None, probe_path=None):
         """
         Attempt to initialize the service, raising a exception if the
         service cannot be used. If the service needs to make any calls
@@ -152,15 +192,24 @@ class Service(object, metaclass=abc.ABCMeta):
         The logger object should have an interface like the one used by
         the standard library logging module, with debug(), info(), and
         so on, available.
+
+        The net_pool is a callable to retrieve a tuple of the number of
+        kept-alive connections per host and the number of retries to be
+        used for HTTP requests made through net_session().
+
+        The probe_path, if given, is a JSON file where the output of
+        cli_probe() calls is remembered between sessions.
         """
 
         assert self.NAME, "Please specify a NAME for the service"
         assert isinstance(self.TRAITS, list), \
             "Please specify a TRAITS list for the service"
 
-        self._netops = None
+        self._local = threading.local()
         self._lame_flags = lame_flags
         self._logger = logger
+        self._net_pool = net_pool or (lambda: DEFAULT_POOL)
+        self._probe_path = probe_path
         self.normalize = normalize
         self._temp_dir = temp_dir
         self.ecosystem = ecosystem
@@ -224,6 +273,14 @@ class Service(object, metaclass=abc.ABCMeta):
 
         return {}
 
+    def shutdown(self):  # allows overriding, pylint:disable=no-self-use
+        """
+        Called when the user's profile is being closed, so that a
+        service can stop any daemons (see cli_daemon()) or release any
+        other resources it has been holding onto. The service may still
+        be used again afterward (e.g. if another profile is opened).
+        """
+
     def modify(self, text):  # allows overriding, pylint:disable=no-self-use
         """
         Allows a service to modify the phrase before it is hashed for
@@ -267,7 +324,7 @@ class Service(object, metaclass=abc.ABCMeta):
         """
 
         self._cli_exec(
-            subprocess.check_call,
+            False,
             args,
             "for processing",
         )
@@ -280,7 +337,7 @@ class Service(object, metaclass=abc.ABCMeta):
         """
 
         returned = self._cli_exec(
-            subprocess.check_output,
+            True,
             args,
             "to inspect stdout",
         )
@@ -302,7 +359,7 @@ class Service(object, metaclass=abc.ABCMeta):
 
         try:
             returned = self._cli_exec(
-                subprocess.check_output,
+                True,
                 args,
                 "to inspect stdout/stderr",
                 redirect_stderr=True,
@@ -313,6 +370,45 @@ class Service(object, metaclass=abc.ABCMeta):
 
         return self._cli_decode(returned)
 
+    def cli_probe(self, *args, lenient=False):
+        """
+        Like cli_output() (or cli_output_error() if lenient is True),
+        but for calls that inspect the environment while the service is
+        being initialized (e.g. to list the installed voices).
+
+        The binary is looked up on the PATH first, raising OSError with
+        ENOENT if it cannot be found (rather than spawning a process to
+        find that out). The output is then remembered on disk, keyed by
+        the call and the binary's path, modification time, and size, so
+        later sessions need not make the call again until the binary
+        changes or PROBE_DAYS have passed.
+        """
+
+        args = [
+            arg if isinstance(arg, str) else str(arg)
+            for arg in self._flatten(args)
+        ]
+
+        binary = shutil.which(args[0])
+        if not binary:
+            from errno import ENOENT
+            raise OSError(ENOENT, "Unable to find %s" % args[0])
+
+        stat = os.stat(binary)
+        key = json.dumps([binary, stat.st_mtime, stat.st_size, lenient] +
+                         args[1:])
+
+        returned = _PROBES.get(self._probe_path, key)
+        if returned is not None:
+            self._logger.debug("Using remembered output of %s %s",
+                               args[0], args[1:])
+            return list(returned)
+
+        returned = (self.cli_output_error(*args) if lenient
+                    else self.cli_output(*args))
+        _PROBES.put(self._probe_path, key, list(returned))
+        return returned
+
     def _cli_decode(self, returned):
         """
         Given the raw bytestring from the CLI tool, try to decode it and
@@ -417,10 +513,154 @@ class Service(object, metaclass=abc.ABCMeta):
 
         shutil.move(intermediate_path, output_path)  # see note above
 
-    def _cli_exec(self, callee, args, purpose, redirect_stderr=False):
+    def cli_transcode_pipe(self, args, output_path, require=None,
+                           add_padding=False, input_path=None, stream=None):
+        """
+        Like cli_transcode(), but rather than starting from a wave file
+        on disk, runs the given command line call (which must write a
+        wave stream to stdout) and pipes its output straight into the
+        LAME transcoder, so the audio is never written out or read back
+        in uncompressed. If given, the input path is fed to the call as
+        stdin.
+
+        Alternatively, args may be None and stream an iterable of wave
+        chunks (e.g. as they are received from a server), which are then
+        piped into the transcoder in the same way. If the stream raises,
+        the transcoding is abandoned and the exception passed along.
+
+        The size_in requirement is checked against the number of bytes
+        the call wrote to its stdout (or the stream yielded). Services
+        whose binaries cannot write to stdout should keep using
+        cli_transcode().
+        """
+
+        intermediate_path = self.path_temp('mp3')  # see cli_transcode()
+        lame_args = [self.CLI_LAME] + self._lame_flags().split() + \
+            ['-', intermediate_path]
+
+        if stream is None:
+            args = [
+                arg if isinstance(arg, str) else str(arg)
+                for arg in self._flatten(args)
+            ]
+            self._logger.debug(
+                "Piping %s binary with %s into %s",
+                args[0],
+                args[1:] if len(args) > 1 else "no arguments",
+                lame_args,
+            )
+        else:
+            self._logger.debug("Piping stream into %s", lame_args)
+
+        input_stream = open(input_path, 'rb') if input_path else None
+        engine = None
+
+        try:
+            if stream is None:
+                engine = subprocess.Popen(
+                    args,
+                    stdin=input_stream,
+                    stdout=subprocess.PIPE,
+                    startupinfo=self.CLI_SI,
+                )
+                stream = iter(lambda: engine.stdout.read(CHUNK_SIZE), b'')
+
+            try:
+                lame = subprocess.Popen(
+                    lame_args,
+                    stdin=subprocess.PIPE,
+                    startupinfo=self.CLI_SI,
+                )
+
+            except OSError as os_error:
+                if engine:
+                    engine.kill()
+                    engine.wait()
+
+                from errno import ENOENT
+                if os_error.errno == ENOENT:
+                    raise OSError(
+                        ENOENT,
+                        "Unable to find lame to transcode the audio. "
+                        "It might not have been installed.",
+                    )
+                else:
+                    raise
+
+            def abort():
+                """Kills both ends of the pipe."""
+                if engine:
+                    engine.kill()
+                lame.kill()
+
+            size_in = 0
+
+            with self.cancel_watch(abort):
+                try:
+                    for chunk in stream:
+                        size_in += len(chunk)
+                        lame.stdin.write(chunk)
+                except BrokenPipeError:  # lame died; returncode will tell
+                    pass
+                finally:
+                    if engine:
+                        engine.stdout.close()
+                    elif hasattr(stream, 'close'):
+                        stream.close()
+                    try:
+                        lame.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                    if engine:
+                        engine.wait()
+                    lame.wait()
+
+        except Exception:
+            if os.path.exists(intermediate_path):
+                self.path_unlink(intermediate_path)
+            raise
+
+        finally:
+            if input_stream:
+                input_stream.close()
+
+        try:
+            if engine and engine.returncode:
+                raise subprocess.CalledProcessError(engine.returncode, args)
+
+            if require and 'size_in' in require and \
+               size_in < require['size_in']:
+                raise ValueError(
+                    "Input to transcoder was %d-byte stream; wanted %d+ "
+                    "bytes (the service might not have liked your input "
+                    "text)" % (size_in, require['size_in'])
+                )
+
+            if lame.returncode or not os.path.exists(intermediate_path):
+                raise RuntimeError(
+                    "Transcoding the audio stream failed. Are the flags you "
+                    "specified for LAME (%s) okay?" % self._lame_flags()
+                )
+
+        except Exception:
+            if os.path.exists(intermediate_path):
+                self.path_unlink(intermediate_path)
+            raise
+
+        if add_padding:
+            self.util_pad(intermediate_path)
+
+        shutil.move(intermediate_path, output_path)  # see cli_transcode()
+
+    def _cli_exec(self, capture, args, purpose, redirect_stderr=False):
         """
         Handles the underlying system call, logging, and exceptions when
-        a call to one of the cli_xxx() methods is made.
+        a call to one of the cli_xxx() methods is made, returning stdout
+        if capture is True. As with subprocess.check_call() and friends,
+        a non-zero exit raises CalledProcessError.
+
+        If the run is cancelled while the call is underway, the process
+        is killed and Cancelled is raised.
         """
 
         args = [
@@ -435,12 +675,22 @@ class Service(object, metaclass=abc.ABCMeta):
             purpose,
         )
 
-        return callee(
+        process = subprocess.Popen(
             args,
+            stdout=subprocess.PIPE if capture else None,
             stderr=subprocess.STDOUT if redirect_stderr else None,
             startupinfo=self.CLI_SI,
         )
 
+        with self.cancel_watch(process.kill):
+            returned, _ = process.communicate()
+
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, args,
+                                                output=returned)
+
+        return returned
+
     def cli_pipe(self, args, input_path, output_path, input_mode='r',
                  output_mode='wb'):
         """
@@ -459,8 +709,10 @@ class Service(object, metaclass=abc.ABCMeta):
 
         with open(input_path, input_mode) as input_stream, \
                 open(output_path, output_mode) as output_stream:
-            subprocess.Popen(args, stdin=input_stream.fileno(),
-                             stdout=output_stream.fileno()).communicate()
+            process = subprocess.Popen(args, stdin=input_stream.fileno(),
+                                       stdout=output_stream.fileno())
+            with self.cancel_watch(process.kill):
+                process.communicate()
 
     def cli_background(self, *args):
         """
@@ -480,15 +732,60 @@ class Service(object, metaclass=abc.ABCMeta):
         import atexit
         atexit.register(service.terminate)
 
+    def cli_daemon(self, args, ready):
+        """
+        Returns a handle on a long-lived process (e.g. an engine running
+        in a server mode, so that its startup and voice loading costs
+        are not paid on every run) for the given command line call.
+
+        The process is not started until the handle's ensure() method is
+        called, which also restarts it if it has died since (up to
+        DAEMON_STARTS times per session) and calls ready(process) to
+        wait until it can take requests. Callers should hold the
+        handle's lock while they are talking to it, and call its stop()
+        method from shutdown().
+        """
+
+        args = [arg if isinstance(arg, str) else str(arg)
+                for arg in self._flatten(args)]
+
+        return _Daemon(args, ready, self.CLI_SI, self._logger)
+
     def net_headers(self, url):
         """Returns the headers for a URL."""
 
         self._logger.debug("GET %s for headers", url)
-        self._netops += 1
-        return requests.request(
+        response = self.net_session().request(
             method='GET', url=url, headers={'User-Agent': DEFAULT_UA},
-            timeout=DEFAULT_TIMEOUT,
-        ).headers
+            timeout=DEFAULT_TIMEOUT, stream=True,
+        )
+        response.close()
+        return response.headers
+
+    def net_session(self):
+        """
+        Returns a requests.Session for the current thread whose
+        connections are drawn from a pool shared by all services, so
+        that consecutive requests to the same host (e.g. the chunks of
+        a long phrase, or the notes of a mass generation job) reuse an
+        open TCP/TLS connection rather than paying for a handshake each
+        time. Connection errors and transient 5xx/429 statuses are
+        retried according to the user's configuration.
+
+        Services that need to make their own calls (e.g. POSTing JSON to
+        an API) should use this instead of the requests module directly.
+        Every request made through the session counts as a download for
+        the current run, so that the router's rate limiting sees it.
+        """
+
+        session = _CONNECTIONS.session(*self._net_pool())
+        session.count = self._net_counted
+        return session
+
+    def _net_counted(self):
+        """Counts a request made through net_session() for this run."""
+
+        self._netops += 1
 
     def parse_mime_type(self, raw_mime):
         raw_mime = raw_mime.replace('/x-', '/')
@@ -499,19 +796,24 @@ class Service(object, metaclass=abc.ABCMeta):
     def net_stream(self, targets, require=None, method='GET',
                    awesome_ua=False, add_padding=False,
                    custom_quoter=None, custom_headers=None,
-                   allow_redirects=True):
+                   allow_redirects=True, parallel=False):
         """
         Returns the raw payload string from the specified target(s).
         If multiple targets are specified, their resulting payloads are
         glued together.
 
         Each "target" is a bare URL string or a tuple containing an
-        address and a dict for what to tack onto the query string.
+        address and a dict for what to tack onto the query string. For
+        a POST, the dict is sent as the form body instead, or bytes may
+        be given in its place to be sent as the body as-is (e.g. JSON or
+        SSML, with a matching Content-Type in custom_headers).
 
         Finally, a require dict may be passed to enforce a Content-Type
         using key 'mime' and/or a minimum payload size using key 'size'.
-        If using multiple targets, these requirements apply to each
-        response.
+        A maximum payload size may be given using key 'max_size' (which
+        otherwise defaults to MAX_SIZE, guarding against a misbehaving
+        server). If using multiple targets, these requirements apply to
+        each response.
 
         The underlying library here already understands how to search
         the environment for proxy settings (e.g. HTTP_PROXY), so we do
@@ -522,6 +824,31 @@ class Service(object, metaclass=abc.ABCMeta):
         services that sometimes return MP3s that `mplayer` clips early.
 
         To prevent redirects one can set allow_redirects to False.
+
+        If parallel is True and there are multiple targets, they will be
+        fetched concurrently (at most PARALLEL_PER_HOST at a time for any
+        one host), which makes a long phrase split into several chunks
+        cost about one round trip instead of one per chunk. Payloads are
+        still glued together in order, the requirements are still checked
+        for each response, and the first failing target (in order) is the
+        one whose error is raised. Services should only opt into this if
+        their targets are independent of each other.
+        """
+
+        output = io.BytesIO()
+        self._net_transfer(output, targets, require, method, awesome_ua,
+                           add_padding, custom_quoter, custom_headers,
+                           allow_redirects, parallel)
+        return output.getvalue()
+
+    def _net_transfer(self, output, targets, require=None, method='GET',
+                      awesome_ua=False, add_padding=False,
+                      custom_quoter=None, custom_headers=None,
+                      allow_redirects=True, parallel=False):
+        """
+        Writes the payloads from the specified target(s) to the given
+        binary file-like output as they arrive. See net_stream() for
+        information about available options.
         """
 
         assert method in ['GET', 'POST'], "method must be GET or POST"
@@ -530,6 +857,7 @@ class Service(object, metaclass=abc.ABCMeta):
         targets = targets if isinstance(targets, list) else [targets]
         targets = [
             (target, None) if isinstance(target, str)
+            else target if isinstance(target[1], bytes)
             else (
                 target[0],
                 '&'.join(
@@ -551,87 +879,228 @@ class Service(object, metaclass=abc.ABCMeta):
         ]
 
         require = require or {}
+        headers = {'User-Agent': (self.ecosystem.agent
+                                  if awesome_ua else DEFAULT_UA)}
+        if custom_headers:
+            headers.update(custom_headers)
 
-        payloads = []
+        fetches = [
+            (
+                url,
+                params,
+                "web request" if len(targets) == 1
+                else "web request (%d of %d)" % (number, len(targets)),
+            )
+            for number, (url, params) in enumerate(targets, 1)
+        ]
 
-        for number, (url, params) in enumerate(targets, 1):
-            desc = "web request" if len(targets) == 1 \
-                else "web request (%d of %d)" % (number, len(targets))
+        if parallel and len(fetches) > 1:
+            # each chunk is spooled separately (in memory unless it gets
+            # big) since they may finish out of order, then copied over
+            from tempfile import SpooledTemporaryFile
 
-            self._logger.debug("%s %s%s%s for %s", method, url,
-                               "?" if params else "", params or "", desc)
+            def fetch(url, params, desc):
+                """Fetches one chunk into its own spool."""
 
-            headers = {'User-Agent': (self.ecosystem.agent
-                                      if awesome_ua else DEFAULT_UA)}
-            if custom_headers:
-                headers.update(custom_headers)
+                spool = SpooledTemporaryFile(max_size=2**20)
+                try:
+                    self._net_fetch(url, params, desc, method, headers,
+                                    require, allow_redirects, spool)
+                except BaseException:
+                    spool.close()
+                    raise
+                return spool
+
+            spools = self._net_parallel(fetches, fetch)
+            for spool in spools:
+                with spool:
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, output, CHUNK_SIZE)
+
+        else:
+            for url, params, desc in fetches:
+                self._net_fetch(url, params, desc, method, headers, require,
+                                allow_redirects, output)
 
-            self._netops += 1
-            response = requests.request(
-                method=method,
-                url=('?'.join([url, params]) if params and method == 'GET'
-                     else url),
-                headers=headers,
-                data=params.encode() if params and method == 'POST' else None,
-                timeout=DEFAULT_TIMEOUT,
+        if add_padding:
+            output.write(PADDING)
+
+
+    def _net_fetch(self, url, params, desc, method, headers, require,
+                   allow_redirects, output):
+        """
+        Makes a single request on behalf of _net_transfer(), checking it
+        against the requirements and writing its payload to the output.
+
+        The Content-Type and any declared Content-Length are checked
+        before the body is read, and the maximum size is enforced as
+        each chunk comes in, so a bad response fails without being
+        downloaded in full.
+        """
+
+        self.cancel_check()
+
+        self._logger.debug("%s %s%s%s for %s", method, url,
+                           "?" if params else "",
+                           "<%d-byte body>" % len(params)
+                           if isinstance(params, bytes) else params or "",
+                           desc)
+
+        response = self.net_session().request(
+            method=method,
+            url=('?'.join([url, params]) if params and method == 'GET'
+                 else url),
+            headers=headers,
+            data=(params if isinstance(params, bytes) else params.encode())
+            if params and method == 'POST' else None,
+            timeout=DEFAULT_TIMEOUT,
+            stream=True,
+        )
+
+        if not response:
+            raise IOError("No response for %s" % desc)
+
+        if response.status_code != 200:
+            value_error = ValueError(
+                "Got %d status for %s" %
+                (response.status_code, desc)
             )
+            try:
+                value_error.payload = response.content
+                response.close()
+            except Exception:
+                pass
+            raise value_error
 
-            if not response:
-                raise IOError("No response for %s" % desc)
+        got_mime = response.headers['Content-Type']
+        simplified_mime = self.parse_mime_type(got_mime)
 
-            if response.status_code != 200:
-                value_error = ValueError(
-                    "Got %d status for %s" %
-                    (response.status_code, desc)
-                )
-                try:
-                    value_error.payload = response.content
-                    response.close()
-                except Exception:
-                    pass
-                raise value_error
+        if 'mime' in require and require['mime'] != simplified_mime:
 
-            got_mime = response.headers['Content-Type']
-            simplified_mime = self.parse_mime_type(got_mime)
+            value_error = ValueError(
+                f"Request got {got_mime} Content-Type for {desc};"
+                f" wanted {require['mime']}"
+            )
+            value_error.got_mime = got_mime
+            value_error.wanted_mime = require['mime']
+            raise value_error
+
+        if not allow_redirects and response.geturl() != url:
+            raise ValueError("Request has been redirected")
 
-            if 'mime' in require and require['mime'] != simplified_mime:
+        max_size = require.get('max_size', MAX_SIZE)
+        size = 0
 
-                value_error = ValueError(
-                    f"Request got {got_mime} Content-Type for {desc};"
-                    f" wanted {require['mime']}"
+        # read in chunks, so that a cancellation can close the response
+        # out from under us rather than waiting for the whole transfer
+        with self.cancel_watch(response.close):
+            try:
+                declared = int(response.headers.get('Content-Length', 0))
+            except ValueError:
+                declared = 0
+
+            if max_size and declared > max_size:
+                raise ValueError(
+                    "Request has a %d-byte stream for %s; wanted at most "
+                    "%d bytes" % (declared, desc, max_size)
                 )
-                value_error.got_mime = got_mime
-                value_error.wanted_mime = require['mime']
-                raise value_error
 
-            if not allow_redirects and response.geturl() != url:
-                raise ValueError("Request has been redirected")
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    response.close()
+                    raise ValueError(
+                        "Request got more than %d bytes for %s" %
+                        (max_size, desc)
+                    )
+                output.write(chunk)
+        response.close()
+
+        if 'size' in require and size < require['size']:
+            raise self.TinyDownloadError(
+                "Request got %d-byte stream for %s; wanted %d+ bytes" %
+                (size, desc, require['size'])
+            )
 
-            payload = response.content
-            response.close()
+    def _net_parallel(self, fetches, fetch):
+        """
+        Calls fetch(url, params, desc) for each of the given fetches on
+        short-lived helper threads, returning the results in order.
+
+        The helpers share the calling thread's cancel token (so that a
+        cancellation still aborts their transfers) and the network ops
+        they make are added onto the calling thread's count afterward.
+        If any fetch fails, those that have not started are skipped and
+        the error from the earliest failing fetch is raised.
+        """
 
-            if 'size' in require and len(payload) < require['size']:
-                raise self.TinyDownloadError(
-                    "Request got %d-byte stream for %s; wanted %d+ bytes" %
-                    (len(payload), desc, require['size'])
-                )
+        from concurrent.futures import ThreadPoolExecutor
+        from urllib.parse import urlsplit
 
-            payloads.append(payload)
+        token = getattr(self._local, 'token', None)
+        netops = []
 
-        if add_padding:
-            payloads.append(PADDING)
+        def helper(url, params, desc):
+            """Runs one fetch w/ a slot for its host held."""
 
-        return b''.join(payloads)
+            self._local.token = token
+            self._netops = 0
+
+            try:
+                with _host_slot(urlsplit(url).netloc):
+                    return fetch(url, params, desc)
+            finally:
+                netops.append(self._netops)
+                self._local.token = None
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(len(fetches), PARALLEL_PER_HOST *
+                            len(set(urlsplit(url).netloc
+                                    for url, _, _ in fetches))),
+        )
+
+        try:
+            futures = [executor.submit(helper, *args) for args in fetches]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        finally:
+            executor.shutdown(wait=True)
+            self._netops += sum(netops)
 
     def net_download(self, path, *args, **kwargs):
         """
         Downloads a file to the given path from the specified target(s).
         See net_stream() for information about available options.
+
+        Rather than being buffered in memory, the payload is written to
+        a partial file alongside the path as it arrives, and that file
+        is only moved into place once every response has passed its
+        requirements. Thus, the path is either left untouched or holds
+        the complete download, never a truncated or rejected one. Each
+        download gets a uniquely named partial file, so that concurrent
+        downloads to the same path cannot write over each other.
         """
 
-        payload = self.net_stream(*args, **kwargs)
-        with open(path, 'wb') as response_output:
-            response_output.write(payload)
+        from tempfile import mkstemp
+
+        directory, filename = os.path.split(path)
+        handle, partial = mkstemp(prefix='.%s.' % filename, suffix='.part',
+                                  dir=directory)
+
+        try:
+            with os.fdopen(handle, 'wb') as response_output:
+                self._net_transfer(response_output, *args, **kwargs)
+            os.replace(partial, path)
+
+        except BaseException:
+            if os.path.exists(partial):
+                self.path_unlink(partial)
+            raise
 
     def net_dump(self, output_path, url):
         """
@@ -668,10 +1137,75 @@ class Service(object, metaclass=abc.ABCMeta):
         if not os.path.exists(output_path):
             raise RuntimeError("Dumping the audio stream w/ mplayer failed.")
 
+    @property
+    def _netops(self):
+        """
+        Number of network ops required by the current thread's run. As
+        runs for the same service may happen on several worker threads
+        at once, each thread keeps its own count.
+        """
+
+        return getattr(self._local, 'netops', 0)
+
+    @_netops.setter
+    def _netops(self, value):
+        """Sets the number of network ops for the current thread."""
+
+        self._local.netops = value
+
+    def cancel_bind(self, token):
+        """
+        Binds the given CancelToken (or None) to runs on the current
+        thread and starts tracking its temporary files. Intended for use
+        by the router before and after a run.
+        """
+
+        self._local.token = token
+        self._local.temps = []
+
+    def cancel_check(self):
+        """
+        Raises Cancelled if the current thread's run has been cancelled.
+        Services doing lengthy work of their own may call this between
+        steps.
+        """
+
+        token = getattr(self._local, 'token', None)
+        if token:
+            token.check()
+
+    @contextmanager
+    def cancel_watch(self, abort):
+        """
+        Keeps the given abort callable (e.g. to close a connection or
+        kill a process) registered with the current thread's CancelToken
+        for the duration of the block, so that a cancellation interrupts
+        it right away. Cancelled is raised once the block exits if the
+        run was cancelled.
+        """
+
+        token = getattr(self._local, 'token', None)
+        if token:
+            with token.watch(abort):
+                yield
+        else:
+            yield
+
+    def cancel_cleanup(self):
+        """
+        Removes any temporary files handed out by path_temp() during the
+        current thread's run, e.g. after it has been cancelled.
+        """
+
+        temps = getattr(self._local, 'temps', None)
+        if temps:
+            self.path_unlink([path for path in temps if os.path.exists(path)])
+            del temps[:]
+
     def net_count(self):
         """
-        Returns the number of downloads the last run required. Intended
-        for use by the router to query after a run.
+        Returns the number of downloads the last run on this thread
+        required. Intended for use by the router to query after a run.
         """
 
         return self._netops
@@ -696,7 +1230,7 @@ class Service(object, metaclass=abc.ABCMeta):
         from os.path import join
         from random import choice
         from time import time
-        return join(
+        path = join(
             self._temp_dir,
             '%x-%s.%s' % (
                 int(time()),
@@ -705,6 +1239,12 @@ class Service(object, metaclass=abc.ABCMeta):
             ),
         )
 
+        temps = getattr(self._local, 'temps', None)
+        if temps is not None:
+            temps.append(path)
+
+        return path
+
     def path_unlink(self, *args):
         """
         Attempts to remove the given file(s), ignoring any failures. May
@@ -864,6 +1404,283 @@ class Service(object, metaclass=abc.ABCMeta):
                 yield item
 
 
+class _Daemon(object):
+    """
+    Supervises a long-lived process on behalf of a service, starting it
+    on first use and restarting it if it crashes. See cli_daemon().
+    """
+
+    __slots__ = [
+        '_args',     # command line call used to start the process
+        'lock',      # held by whichever thread is talking to the process
+        '_logger',   # for writing messages about the process
+        '_process',  # Popen instance, or None if not started
+        '_ready',    # callable to wait until the process can take requests
+        '_si',       # startup information for the process, if any
+        '_starts',   # number of times the process has been started
+        '_state',    # guards starting and stopping the process
+    ]
+
+    def __init__(self, args, ready, startupinfo, logger):
+        self._args = args
+        self.lock = threading.Lock()
+        self._logger = logger
+        self._process = None
+        self._ready = ready
+        self._si = startupinfo
+        self._starts = 0
+        self._state = threading.Lock()
+
+    def ensure(self):
+        """
+        Starts the process if it is not running, waiting until it is
+        ready. Raises EnvironmentError if it cannot be (re)started.
+        """
+
+        with self._state:
+            if self._process and self._process.poll() is None:
+                return
+
+            if self._process:
+                self._logger.warn("%s daemon exited with %s; restarting",
+                                  self._args[0], self._process.returncode)
+                self._process = None
+
+            if self._starts >= DAEMON_STARTS:
+                raise EnvironmentError("The %s daemon keeps exiting, so it "
+                                       "will not be restarted again." %
+                                       self._args[0])
+            self._starts += 1
+
+            self._logger.debug("Starting %s daemon w/ %s", self._args[0],
+                               self._args[1:])
+            process = subprocess.Popen(
+                self._args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                startupinfo=self._si,
+            )
+
+            try:
+                self._ready(process)
+            except Exception:
+                self._kill(process)
+                raise
+
+            self._process = process
+
+    def stop(self):
+        """Stops the process, if it is running."""
+
+        with self._state:
+            if self._process:
+                self._logger.debug("Stopping %s daemon", self._args[0])
+                self._kill(self._process)
+                self._process = None
+
+    @staticmethod
+    def _kill(process):
+        """Terminates the process, killing it if it will not exit."""
+
+        process.terminate()
+        try:
+            process.wait(2)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class _Probes(object):
+    """
+    Remembers cli_probe() output in a JSON file, loaded the first time
+    it is needed and rewritten (atomically) as new output is added.
+    Entries older than PROBE_DAYS are ignored and dropped.
+    """
+
+    __slots__ = [
+        '_entries',  # dict of paths to their keys mapping to [time, output]
+        '_lock',     # guards _entries and writing files out
+    ]
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, key):
+        """Returns the output for the key, or None if not known."""
+
+        if not path:
+            return None
+
+        from time import time
+
+        with self._lock:
+            entry = self._load(path).get(key)
+
+        if entry and time() - entry[0] < PROBE_DAYS * 86400:
+            return entry[1]
+        return None
+
+    def put(self, path, key, output):
+        """Remembers the output for the key, saving the file."""
+
+        if not path:
+            return
+
+        from time import time
+
+        with self._lock:
+            entries = self._load(path)
+            entries[key] = [time(), output]
+
+            cutoff = time() - PROBE_DAYS * 86400
+            for stale in [key for key, entry in entries.items()
+                          if entry[0] < cutoff]:
+                del entries[stale]
+
+            try:
+                with open(path + '.tmp', 'w') as output_file:
+                    json.dump(entries, output_file)
+                os.replace(path + '.tmp', path)
+            except (IOError, OSError):
+                pass  # we will just have to probe again next session
+
+    def _load(self, path):
+        """Returns the entries for the path, reading it if needed."""
+
+        try:
+            return self._entries[path]
+        except KeyError:
+            pass
+
+        try:
+            with open(path) as input_file:
+                entries = json.load(input_file)
+            if not isinstance(entries, dict):
+                entries = {}
+        except (IOError, OSError, ValueError):
+            entries = {}
+
+        self._entries[path] = entries
+        return entries
+
+
+_PROBES = _Probes()
+
+
+class _Connections(object):
+    """
+    Keeps a single HTTPAdapter, and with it a single urllib3 pool of
+    kept-alive connections per host, for every service. The adapter's
+    pool is safe to share between threads, but a requests.Session
+    (e.g. its cookie jar) is not, so each thread gets its own session
+    mounted onto the shared adapter.
+
+    If the user changes the pool size or retry count, a new adapter is
+    built and threads pick it up on their next request; connections
+    in the old pool are left to finish whatever they are doing.
+    """
+
+    __slots__ = [
+        '_adapter',     # HTTPAdapter shared by all threads' sessions
+        '_key',         # (pool size, retries) that _adapter was built for
+        '_local',       # per-thread session and the key it was mounted at
+        '_lock',        # guards replacing _adapter and _key
+    ]
+
+    def __init__(self):
+        self._adapter = None
+        self._key = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def session(self, pool_size, retries):
+        """
+        Returns the current thread's session, (re)building the shared
+        adapter first if the configuration has changed.
+        """
+
+        key = (max(pool_size, 1), max(retries, 0))
+
+        with self._lock:
+            if self._key != key:
+                self._adapter = HTTPAdapter(
+                    pool_connections=key[0],
+                    pool_maxsize=key[0],
+                    max_retries=self._retry(key[1]),
+                )
+                self._key = key
+            adapter = self._adapter
+
+        session = getattr(self._local, 'session', None)
+        if session is None or self._local.key != key:
+            session = _Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            self._local.key = key
+
+        return session
+
+    @staticmethod
+    def _retry(retries):
+        """
+        Returns the retry policy. POSTs are included because the TTS
+        APIs we talk to have no side effects beyond producing audio.
+        The last response is handed back (rather than raised) once the
+        retries are used up, so that callers can report on its status.
+        """
+
+        methods = frozenset(['GET', 'HEAD', 'POST'])
+        options = dict(total=retries, read=0, backoff_factor=0.25,
+                       status_forcelist=RETRY_STATUSES,
+                       raise_on_status=False)
+
+        try:
+            return Retry(allowed_methods=methods, **options)
+        except TypeError:  # urllib3 older than 1.26
+            return Retry(method_whitelist=methods, **options)
+
+
+_CONNECTIONS = _Connections()
+
+
+class _Session(requests.Session):
+    """
+    A requests.Session that calls back each time it makes a request,
+    e.g. so that the service using it can count its downloads.
+    """
+
+    count = None  # callable set by Service.net_session(), if any
+
+    def request(self, *args, **kwargs):  # pylint:disable=arguments-differ
+        """Counts the request, then makes it as usual."""
+
+        if self.count:
+            self.count()
+        return super(_Session, self).request(*args, **kwargs)
+
+
+_HOST_SLOTS = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+
+def _host_slot(host):
+    """
+    Returns the semaphore limiting parallel net_stream() fetches to the
+    given host, creating it the first time the host is seen.
+    """
+
+    with _HOST_SLOTS_LOCK:
+        try:
+            return _HOST_SLOTS[host]
+        except KeyError:
+            slot = _HOST_SLOTS[host] = threading.BoundedSemaphore(
+                PARALLEL_PER_HOST)
+            return slot
+
+
 # Reinitialize the CLI_LAME, CLI_SI, IS_WINDOWS, and IS_MACOSX constants
 # on the base class, if necessary given the running operating system.
 
@@ -20,10 +20,122 @@
 Common classes for services
 
 Provides an enum-like Trait class for specifying the characteristics of
-a service.
+a service, and the CancelToken used to interrupt a service's run.
 """
 
-__all__ = ['Trait']
+import threading
+
+__all__ = ['Cancelled', 'CancelToken', 'Trait']
+
+
+class Cancelled(RuntimeError):
+    """Raised when a run is interrupted because it was cancelled."""
+
+
+class CancelToken(object):
+    """
+    Lets one thread (e.g. the UI) ask a service run on another thread to
+    stop. The run checks in on the token at safe points and may also
+    register abort callables (e.g. closing an HTTP response, killing a
+    subprocess) to be called the moment cancellation is requested, so
+    that blocking operations are interrupted without delay.
+    """
+
+    __slots__ = [
+        '_aborts',  # callables to interrupt what the run is blocked on
+        '_event',   # threading.Event set once cancellation is requested
+        '_lock',    # guards _aborts between the two threads
+    ]
+
+    def __init__(self):
+        """
+        Initializes an uncancelled token.
+        """
+
+        self._aborts = []
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """True once cancel() has been called."""
+
+        return self._event.is_set()
+
+    def cancel(self):
+        """
+        Flags the token as cancelled and calls any registered aborts.
+        """
+
+        with self._lock:
+            self._event.set()
+            aborts, self._aborts = self._aborts, []
+
+        for abort in aborts:
+            try:
+                abort()
+            except Exception:  # best effort, pylint:disable=broad-except
+                pass
+
+    def check(self):
+        """
+        Raises Cancelled if the token has been cancelled.
+        """
+
+        if self._event.is_set():
+            raise Cancelled("The request was cancelled.")
+
+    def watch(self, abort):
+        """
+        Returns a context manager that keeps the given abort callable
+        registered while the block runs. If the token is (or becomes)
+        cancelled, the abort is called, and Cancelled is raised once
+        the block exits.
+        """
+
+        return _Watch(self, abort)
+
+    def _register(self, abort):
+        """Adds the abort, or calls it if already cancelled."""
+
+        with self._lock:
+            if not self._event.is_set():
+                self._aborts.append(abort)
+                return
+        abort()
+
+    def _unregister(self, abort):
+        """Removes the abort, if it has not already been called."""
+
+        with self._lock:
+            try:
+                self._aborts.remove(abort)
+            except ValueError:
+                pass
+
+
+class _Watch(object):  # context manager, pylint:disable=R0903
+    """
+    Context manager returned by CancelToken.watch().
+    """
+
+    __slots__ = [
+        '_abort',  # callable to interrupt the block
+        '_token',  # the CancelToken being watched
+    ]
+
+    def __init__(self, token, abort):
+        self._abort = abort
+        self._token = token
+
+    def __enter__(self):
+        self._token._register(self._abort)  # pylint:disable=W0212
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._token._unregister(self._abort)  # pylint:disable=W0212
+        self._token.check()
+        return False
 
 
 class Trait(object):  # enum class, pylint:disable=R0903
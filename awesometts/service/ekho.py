@@ -47,7 +47,7 @@ class Ekho(Service):
 
         super(Ekho, self).__init__(*args, **kwargs)
 
-        output = self.cli_output('ekho', '--help')
+        output = self.cli_probe('ekho', '--help')
 
         import re
         re_list = re.compile(r'(language|voice).+available', re.IGNORECASE)
@@ -62,7 +62,7 @@ class ESpeak(Service):
 
         try:
             self._binary = 'espeak'
-            output = {'native': self.cli_output(self._binary, '--voices')}
+            output = {'native': self.cli_probe(self._binary, '--voices')}
 
         except OSError:
             if self.IS_WINDOWS:
@@ -73,14 +73,14 @@ class ESpeak(Service):
                     ),
                     self._binary,
                 )
-                output = {'native': self.cli_output(self._binary, '--voices')}
+                output = {'native': self.cli_probe(self._binary, '--voices')}
 
             else:
                 raise
 
         for alt in ['mbrola', 'variant']:
             try:
-                output[alt] = self.cli_output(self._binary, '--voices=' + alt)
+                output[alt] = self.cli_probe(self._binary, '--voices=' + alt)
             except Exception:  # catch-all, pylint:disable=broad-except
                 output[alt] = []
 
@@ -318,41 +318,54 @@ class ESpeak(Service):
 
     def run(self, text, options, path):
         """
-        Checks for unicode workaround on Windows, writes a temporary
-        wave file, and then transcodes to MP3.
+        Checks for unicode workaround on Windows, then pipes the wave
+        stream from eSpeak's stdout into the MP3 transcoder.
+
+        On Windows, eSpeak's stdout is in text mode, where newline
+        translation would corrupt the wave data, so a temporary wave
+        file is written and transcoded instead.
         """
 
         input_file = self.path_workaround(text)
-        output_wav = self.path_temp('wav')
+        output_wav = self.path_temp('wav') if self.IS_WINDOWS else None
 
         voice = ('+'.join([options['voice'], options['variant']])
                  if options['variant'] and options['variant'] != "normal"
                  else options['voice'])
 
+        args = [
+            self._binary,
+            '-v', voice,
+            '-s', options['speed'],
+            '-g', int(options['gap'] * 100.0),
+            '-p', options['pitch'],
+            '-a', options['volume'],
+        ]
+        source = (['-f', input_file] if input_file
+                  else ['--', text])
+
         try:
-            self.cli_call(
-                [
-                    self._binary,
-                    '-v', voice,
-                    '-s', options['speed'],
-                    '-g', int(options['gap'] * 100.0),
-                    '-p', options['pitch'],
-                    '-a', options['volume'],
-                    '-w', output_wav,
-                ] + (
-                    ['-f', input_file] if input_file
-                    else ['--', text]
+            if output_wav:
+                self.cli_call(args + ['-w', output_wav] + source)
+
+                self.cli_transcode(
+                    output_wav,
+                    path,
+                    require=dict(
+                        size_in=4096,
+                    ),
+                    add_padding=True,
                 )
-            )
 
-            self.cli_transcode(
-                output_wav,
-                path,
-                require=dict(
-                    size_in=4096,
-                ),
-                add_padding=True,
-            )
+            else:
+                self.cli_transcode_pipe(
+                    args + ['--stdout'] + source,
+                    path,
+                    require=dict(
+                        size_in=4096,
+                    ),
+                    add_padding=True,
+                )
 
         finally:
             self.path_unlink(input_file, output_wav)
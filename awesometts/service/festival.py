@@ -20,18 +20,35 @@
 Service implementation for Festival Speech Synthesis System
 """
 
-from .base import Service
-from .common import Trait
+from collections import OrderedDict
+import os
+import secrets
+import socket
+import tempfile
+from threading import Lock
+from time import sleep, time
+
+from .base import DEFAULT_TIMEOUT, Service
+from .common import Cancelled, Trait
 
 __all__ = ['Festival']
 
 
+# most voices that will be kept loaded in their own `festival --server`
+SERVER_VOICES = 2
+
+# marks the end of a wave or Lisp reply in Festival's server protocol
+SERVER_KEY = b'ft_StUfF_key'
+
+
 class Festival(Service):
     """
     Provides a Service-compliant implementation for Festival.
     """
 
     __slots__ = [
+        '_servers',       # OrderedDict of voices to _servers tuples, LRU
+        '_servers_lock',  # guards _servers
         '_version',       # we get this while testing for the festival binary
         '_voice_list',    # list of installed voices as a list of tuples
     ]
@@ -57,10 +74,10 @@ class Festival(Service):
 
         super(Festival, self).__init__(*args, **kwargs)
 
-        self._version = self.cli_output('festival', '--version').pop(0)
-        self.cli_call('text2wave', '--help')
-
-        import os
+        self._servers = OrderedDict()
+        self._servers_lock = Lock()
+        self._version = self.cli_probe('festival', '--version')[0]
+        self.cli_probe('text2wave', '--help', lenient=True)
 
         def listdir(path):
             """try os.listdir() but return [] if exception"""
@@ -131,29 +148,249 @@ class Festival(Service):
 
     def run(self, text, options, path):
         """
-        Write a temporary input text file, calls `text2wave` to write a
-        temporary wave file, and then transcodes that to MP3.
+        Synthesizes using a warm Festival server for the voice if one
+        is free, otherwise (or if the server cannot be used) writes a
+        temporary input text file, then pipes the wave stream from
+        `text2wave` (which writes to stdout if not given a file) into
+        the MP3 transcoder.
         """
 
+        try:
+            if self._run_server(text, options, path):
+                return
+        except Cancelled:
+            raise
+        except Exception as exception:  # fall back, pylint:disable=W0703
+            self._logger.warn("Festival server failed (%s); falling back "
+                              "to text2wave", exception)
+
         input_file = self.path_input(text)
-        output_wav = self.path_temp('wav')
 
         try:
-            self.cli_call(
-                'text2wave',
-                '-o', output_wav,
-                '-eval', '(voice_%s)' % options['voice'],
-                '-scale', options['volume'] / 100.0,
-                input_file,
+            self.cli_transcode_pipe(
+                [
+                    'text2wave',
+                    '-eval', '(voice_%s)' % options['voice'],
+                    '-scale', options['volume'] / 100.0,
+                    input_file,
+                ],
+                path,
+                require=dict(
+                    size_in=4096,
+                ),
             )
 
-            self.cli_transcode(
-                output_wav,
+        finally:
+            self.path_unlink(input_file)
+
+    def shutdown(self):
+        """
+        Stops any Festival servers that have been started.
+        """
+
+        with self._servers_lock:
+            servers, self._servers = self._servers, OrderedDict()
+
+        for server in servers.values():
+            self._server_stop(server)
+
+    def _run_server(self, text, options, path):
+        """
+        Synthesizes the text using a Festival server that has the voice
+        already loaded, returning False without doing anything if that
+        server is busy with another run (so that runs for the same voice
+        can still go on in parallel through `text2wave`) or has just
+        been evicted to make room for another voice.
+
+        Saves Festival from having to start up and load the voice for
+        each phrase, which takes longer than the synthesis itself for
+        the short phrases typical of flashcards.
+        """
+
+        server = self._server(options['voice'])
+        daemon, port, secret, _ = server
+
+        if not daemon.lock.acquire(False):
+            return False
+
+        try:
+            with self._servers_lock:
+                if self._servers.get(options['voice']) is not server:
+                    return False  # evicted since; do not start it again
+
+            daemon.ensure()
+            self.cli_transcode_pipe(
+                None,
                 path,
                 require=dict(
                     size_in=4096,
                 ),
+                stream=self._server_synth(port, secret, text,
+                                          options['volume'] / 100.0),
             )
-
         finally:
-            self.path_unlink(input_file, output_wav)
+            daemon.lock.release()
+
+        return True
+
+    def _server(self, voice):
+        """
+        Returns the daemon, port, password, and settings file for the
+        given voice's server, which will not have been started yet if
+        this is its first use. Only SERVER_VOICES servers are kept,
+        stopping the least recently used one if need be.
+
+        Festival's server will evaluate any Scheme a client sends it,
+        `(system ...)` included, so each server gets its own random
+        password, which clients must send before anything else. So that
+        it cannot be read off the process list, the password is passed
+        in a settings file only we can read, kept for as long as the
+        server is (in case its daemon has to restart it).
+        """
+
+        evicted = None
+
+        with self._servers_lock:
+            try:
+                self._servers.move_to_end(voice)
+                return self._servers[voice]
+            except KeyError:
+                pass
+
+            with socket.socket() as probe:  # have the OS pick a free port
+                probe.bind(('127.0.0.1', 0))
+                port = probe.getsockname()[1]
+
+            def ready(process):
+                """Waits until the server accepts connections."""
+
+                give_up = time() + DEFAULT_TIMEOUT
+                while True:
+                    if process.poll() is not None:
+                        raise EnvironmentError("Festival server exited "
+                                               "during startup")
+                    try:
+                        socket.create_connection(('127.0.0.1', port),
+                                                 timeout=1).close()
+                        return
+                    except OSError:
+                        if time() > give_up:
+                            raise
+                        sleep(0.1)
+
+            secret = secrets.token_hex(16)
+            handle, settings = tempfile.mkstemp(prefix='festival-',
+                                                suffix='.scm',
+                                                dir=self._temp_dir)
+            with os.fdopen(handle, 'w') as settings_file:
+                settings_file.write(
+                    '(set! server_port %d)\n'
+                    '(set! server_access_list '
+                    '(quote ("localhost.*" "127\\.0\\.0\\.1")))\n'
+                    '(set! server_passwd "%s")\n' % (port, secret)
+                )
+
+            server = self._servers[voice] = (
+                self.cli_daemon(
+                    [
+                        'festival',
+                        settings,
+                        '(voice_%s)' % voice,
+                        '--server',
+                    ],
+                    ready,
+                ),
+                port,
+                secret,
+                settings,
+            )
+
+            if len(self._servers) > SERVER_VOICES:
+                _, evicted = self._servers.popitem(last=False)
+
+        if evicted:  # not under _servers_lock, as this may have to wait
+            self._server_stop(evicted)
+
+        return server
+
+    def _server_stop(self, server):
+        """
+        Stops the given server, once any synthesis it is in the middle
+        of is over, and removes its settings file.
+        """
+
+        daemon, _, _, settings = server
+        with daemon.lock:
+            daemon.stop()
+        self.path_unlink(settings)
+
+    def _server_synth(self, port, secret, text, scale):
+        """
+        Asks the Festival server on the given port to synthesize the
+        text, yielding the RIFF wave it sends back in chunks as they
+        arrive, so that they can be piped into the transcoder.
+
+        In Festival's server protocol, each command we send (after the
+        password) is answered with any number of wave ("WV") or Lisp
+        ("LP") results, each of which runs until SERVER_KEY, and then
+        either "OK" or "ER".
+        """
+
+        text = text.replace('\\', '\\\\').replace('"', '\\"')
+        commands = [
+            "(Parameter.set 'Wavefiletype 'riff)",
+            '(utt.send.wave.client (utt.wave.rescale (utt.synth '
+            '(Utterance Text "%s")) %s))' % (text, scale),
+        ]
+
+        with socket.create_connection(('127.0.0.1', port),
+                                      timeout=DEFAULT_TIMEOUT) as connection:
+            def hang_up():
+                """Interrupts the conversation, e.g. if cancelled."""
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+            with self.cancel_watch(hang_up):
+                connection.sendall(('\n'.join([secret] + commands) + '\n')
+                                   .encode('utf-8'))
+
+                buffer = b''
+                waved = False
+                answered = 0
+                held = len(SERVER_KEY) - 1  # might be a split SERVER_KEY
+
+                def receive(buffer):
+                    """Returns the buffer with more data appended."""
+                    chunk = connection.recv(16384)
+                    if not chunk:
+                        raise IOError("Festival server hung up")
+                    return buffer + chunk
+
+                while answered < len(commands):
+                    while len(buffer) < 3:
+                        buffer = receive(buffer)
+                    reply, buffer = buffer[:3], buffer[3:]
+
+                    if reply == b'OK\n':
+                        answered += 1
+                    elif reply == b'ER\n':
+                        raise RuntimeError("Festival server could not "
+                                           "synthesize the text")
+                    elif reply in (b'WV\n', b'LP\n'):
+                        while SERVER_KEY not in buffer:
+                            if reply == b'WV\n' and len(buffer) > held:
+                                yield buffer[:-held]
+                                waved = True
+                                buffer = buffer[-held:]
+                            buffer = receive(buffer)
+                        result, buffer = buffer.split(SERVER_KEY, 1)
+                        if reply == b'WV\n' and result:
+                            yield result
+                            waved = True
+                    else:
+                        raise IOError("Festival server sent %r" % reply)
+
+        if not waved:
+            raise IOError("Festival server did not send a wave")
@@ -22,7 +22,6 @@ https://fpt.ai/tts
 """
 
 from .base import Service
-import requests
 import json
 import time
 
@@ -94,7 +93,7 @@ class FptAi(Service):
 
         api_url = "https://api.fpt.ai/hmi/tts/v5"
         body = text
-        response = requests.post(api_url, headers=headers, data=body.encode('utf-8'))
+        response = self.net_session().post(api_url, headers=headers, data=body.encode('utf-8'))
 
         self._logger.debug(f'executing POST on {api_url} with headers {headers}, text: {text}')
 
@@ -121,7 +120,7 @@ class FptAi(Service):
         wait_time = 0.2
         while audio_available == False and max_tries > 0:
             time.sleep(wait_time)
-            r = requests.get(async_url, allow_redirects=True)
+            r = self.net_session().get(async_url, allow_redirects=True)
             self._logger.debug(f"status code: {r.status_code}")
             if r.status_code == 200:
                 audio_available = True
@@ -321,6 +321,7 @@ class Google(Service):
                 ],
                 require=dict(mime='audio/mpeg', size=1024),
                 custom_headers={'Cookie': self._cookies},
+                parallel=True,
             )
 
         except IOError as io_error:
@@ -22,7 +22,7 @@ Service implementation for Google Cloud Text-to-Speech API
 """
 
 import base64
-import requests
+import json
 
 from hashlib import sha1
 
@@ -381,10 +381,13 @@ class GoogleTTS(Service):
         if options['profile'] != 'default':
             payload["audioConfig"]["effectsProfileId"] = [options['profile']]
 
-        r = requests.post("https://texttospeech.googleapis.com/v1/text:synthesize?key={}".format(options['key']), headers=headers, json=payload)
-        r.raise_for_status()
-
-        data = r.json()
+        headers['Content-Type'] = 'application/json'
+        data = json.loads(self.net_stream(
+            ("https://texttospeech.googleapis.com/v1/text:synthesize?key={}".format(options['key']),
+             json.dumps(payload).encode('utf-8')),
+            method='POST',
+            custom_headers=headers,
+        ))
         encoded = data['audioContent']
         audio_content = base64.b64decode(encoded)
 
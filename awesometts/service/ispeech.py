@@ -146,6 +146,7 @@ class ISpeech(Service):
                 ],
                 require=dict(mime='audio/mpeg', size=256),
                 add_padding=True,
+                parallel=True,
             )
         except ValueError as error:
             try:
@@ -23,8 +23,7 @@ https://apidocs.ncloud.com/en/ai-naver/clova_premium_voice/tts/
 
 import time
 import datetime
-import requests
-import urllib
+import urllib.parse
 from .base import Service
 
 __all__ = ['NaverClovaPremium']
@@ -114,18 +113,16 @@ class NaverClovaPremium(Service):
         data = f"speaker={voice}&speed={speed}&volume={volume}&pitch={pitch}&emotion={emotion}&text={encText}"
         url = "https://naveropenapi.apigw.ntruss.com/voice-premium/v1/tts"
         self._logger.debug(f"url: {url}, data: {data}")
-        request = urllib.request.Request(url)
-        request.add_header("X-NCP-APIGW-API-KEY-ID",client_id)
-        request.add_header("X-NCP-APIGW-API-KEY",client_secret)
-        response = urllib.request.urlopen(request, data=data.encode('utf-8'))
-        rescode = response.getcode()
-        if(rescode==200):
-            self._logger.debug("successful response")
-            response_body = response.read()
-            with open(path, 'wb') as f:
-                f.write(response_body)
-        else:
-            error_message = f"Status code: {rescode}"
-            self._logger.error(error_message)            
-            raise ValueError(error_message)            
+        headers = {
+            'X-NCP-APIGW-API-KEY-ID': client_id,
+            'X-NCP-APIGW-API-KEY': client_secret,
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        self.net_download(
+            path,
+            (url, data.encode('utf-8')),
+            method='POST',
+            custom_headers=headers,
+        )
+        self._logger.debug("successful response")            
 
@@ -303,4 +303,5 @@ class Oddcast(Service):
             ],
             require=dict(mime='audio/mpeg', size=256),
             add_padding=True,
+            parallel=True,
         )
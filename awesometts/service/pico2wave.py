@@ -62,11 +62,12 @@ class Pico2Wave(Service):
             try:
                 self._voice_list = sorted({
                     (line, line)
-                    for line in self.cli_output_error(
+                    for line in self.cli_probe(
                         binary,
                         '--lang', 'x',
                         '--wave', 'x',
                         'x',
+                        lenient=True,
                     )
                     if re_voice.match(line)
                 })
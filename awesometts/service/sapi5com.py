@@ -43,6 +43,8 @@ class SAPI5COM(Service):
 
     TRAITS = [Trait.TRANSCODING]
 
+    THREADED_INIT = False  # COM objects are bound to the creating thread
+
     def __init__(self, *args, **kwargs):
         """
         Attempts to retrieve list of voices from the SAPI.SpVoice API.
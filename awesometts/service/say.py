@@ -68,7 +68,7 @@ class Say(Service):
             for code, name in sorted(
                 (match.group(3), match.group(1))
                 for match in [re_voice.match(line)
-                              for line in self.cli_output('say', '-v', '?')]
+                              for line in self.cli_probe('say', '-v', '?')]
                 if match
             )
         ]
@@ -88,4 +88,5 @@ class SpanishDict(Service):
             ],
             add_padding=True,
             require=dict(mime='audio/mpeg', size=1024),
+            parallel=True,
         )
@@ -147,4 +147,5 @@ class Yandex(Service):
             ],
             require=dict(mime='audio/mpeg', size=1024),
             add_padding=True,
+            parallel=True,
         )
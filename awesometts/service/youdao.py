@@ -94,4 +94,5 @@ class Youdao(Service):
             ],
             require=dict(mime='audio/mpeg', size=256),
             add_padding=True,
+            parallel=True,
         )
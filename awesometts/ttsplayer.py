@@ -26,6 +26,7 @@ class AwesomeTTSPlayer(TTSProcessPlayer):
     def __init__(self, taskman: TaskManager, addon) -> None:
         super(TTSProcessPlayer, self).__init__(taskman)
         self._addon = addon
+        self._request = None  # dict(handle, stopped) for the playback in progress
 
     # this is called the first time Anki tries to play a TTS file
     def get_available_voices(self) -> List[TTSVoice]:
@@ -75,6 +76,10 @@ class AwesomeTTSPlayer(TTSProcessPlayer):
         # this allows us to block until the asynchronous callback is done
         self.done_event = threading.Event()
 
+        # the request is only made once the main thread gets to it, so
+        # stop() flags it here in case it is called before then
+        state = self._request = dict(handle=None, stopped=False)
+
         is_group = self._addon.config['tts_voices'][language]['is_group']
 
         # sanitize text
@@ -89,15 +94,21 @@ class AwesomeTTSPlayer(TTSProcessPlayer):
             self.awesometts_preset = awesometts_preset_name
             preset = self._addon.config['presets'][awesometts_preset_name]
 
-            self._addon.router(
-                svc_id=preset['service'],
-                text=text,
-                options=preset,
-                callbacks=dict(
-                    okay=self.audio_file_ready,
-                    fail=self.failure,
+            # the router is driven from the main thread
+            def request():
+                if state['stopped']:
+                    self.done_event.set()
+                    return
+                state['handle'] = self._addon.router(
+                    svc_id=preset['service'],
+                    text=text,
+                    options=preset,
+                    callbacks=dict(
+                        okay=self.audio_file_ready,
+                        fail=self.failure,
+                    ),
+                    priority=self._addon.router.Priority.INTERACTIVE,
                 )
-            )
 
         else:
             # playback with group
@@ -114,21 +125,33 @@ class AwesomeTTSPlayer(TTSProcessPlayer):
 
             #print(f"** playing back group {self._addon.config['tts_voices'][language]}")
 
-            self._addon.router.group(
-                text=text,
-                group=group,
-                presets=self._addon.config['presets'],
-                callbacks=dict(
-                    okay=self.audio_file_ready,
-                    fail=self.failure,
-                ),
-            )    
+            # the router is driven from the main thread
+            def request():
+                if state['stopped']:
+                    self.done_event.set()
+                    return
+                state['handle'] = self._addon.router.group(
+                    text=text,
+                    group=group,
+                    presets=self._addon.config['presets'],
+                    callbacks=dict(
+                        okay=self.audio_file_ready,
+                        fail=self.failure,
+                    ),
+                    priority=self._addon.router.Priority.INTERACTIVE,
+                )
 
+        mw.taskman.run_on_main(request)
 
         # need to wait until we get either a successful callback, or
         self.done_event.wait(timeout=60)
 
     def failure(self, exception, text):
+        if isinstance(exception, self._addon.router.Cancelled):
+            # stopped by the user, e.g. skipping the card; not an error
+            self.done_event.set()
+            return
+
         # don't do anything, can't popup any dialogs
         # print(f"* failure: {exception}")
         self.playback_error = True
@@ -155,10 +178,16 @@ class AwesomeTTSPlayer(TTSProcessPlayer):
         # then tell player to advance, which will cause the file to be played
         cb()
 
-    # we don't support stopping while the file is being downloaded
-    # (but the user can interrupt playing after it has been downloaded)
+    # this is called on the main thread; cancelling the request drops it if
+    # it is still queued or interrupts the download/synthesis if it is not,
+    # and the resulting failure callback lets _play() return right away. If
+    # the request has not been made yet, it is flagged so it never will be.
     def stop(self):
-        pass
+        state, self._request = self._request, None
+        if state:
+            state['stopped'] = True
+            if state['handle']:
+                state['handle'].cancel()
 
 
 def register_tts_player(addon):
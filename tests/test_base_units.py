@@ -0,0 +1,129 @@
+import logging
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from awesometts.service import Cancelled
+from awesometts.service.base import Service
+
+
+class Offline(Service):
+    """Stands in for a network engine, without making any requests."""
+
+    NAME = "Offline"
+    TRAITS = []
+
+    def desc(self):
+        return "offline test service"
+
+    def options(self):
+        return []
+
+    def run(self, text, options, path):
+        self.net_download(path, ('http://example.com/tts', {'q': text}))
+
+
+def make_service(directory, probe_path=None):
+    return Offline(temp_dir=directory, lame_flags=lambda: '',
+                   normalize=lambda value: value,
+                   logger=logging.getLogger('awesometts.test'),
+                   ecosystem=None, probe_path=probe_path)
+
+
+class TestNetDownload():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'hello.mp3')
+        self.service = make_service(self.directory)
+
+    def teardown_method(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def transfer(self, failure=None):
+        """Writes part of a payload, then raises the given failure."""
+
+        def _net_transfer(output, *args, **kwargs):
+            output.write(b'ID3 partial')
+            if failure:
+                raise failure
+            output.write(b' complete')
+
+        return _net_transfer
+
+    def leftovers(self):
+        return [name for name in os.listdir(self.directory)
+                if name.endswith('.part')]
+
+    def test_complete_download_is_moved_into_place(self, monkeypatch):
+        monkeypatch.setattr(self.service, '_net_transfer', self.transfer())
+        self.service.run('hello', {}, self.path)
+
+        with open(self.path, 'rb') as downloaded:
+            assert downloaded.read() == b'ID3 partial complete'
+        assert self.leftovers() == []
+
+    @pytest.mark.parametrize('failure', [
+        ValueError("Request has failed"),
+        Cancelled("The request was cancelled."),
+    ])
+    def test_failed_download_leaves_nothing_behind(self, monkeypatch,
+                                                   failure):
+        monkeypatch.setattr(self.service, '_net_transfer',
+                            self.transfer(failure))
+        with pytest.raises(type(failure)):
+            self.service.run('hello', {}, self.path)
+
+        assert not os.path.exists(self.path)
+        assert self.leftovers() == []
+
+    def test_failed_download_keeps_an_earlier_file(self, monkeypatch):
+        with open(self.path, 'wb') as output:
+            output.write(b'earlier')
+
+        monkeypatch.setattr(self.service, '_net_transfer',
+                            self.transfer(ValueError("Request has failed")))
+        with pytest.raises(ValueError):
+            self.service.run('hello', {}, self.path)
+
+        with open(self.path, 'rb') as downloaded:
+            assert downloaded.read() == b'earlier'
+        assert self.leftovers() == []
+
+
+class TestCliProbe():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.probe_path = os.path.join(self.directory, 'probes.json')
+        self.calls = []
+
+    def teardown_method(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make(self, monkeypatch):
+        service = make_service(self.directory, self.probe_path)
+
+        def cli_output(*args):
+            self.calls.append(args)
+            return ['voice-a', 'voice-b']
+
+        monkeypatch.setattr(service, 'cli_output', cli_output)
+        return service
+
+    def test_output_is_remembered_between_sessions(self, monkeypatch):
+        binary = os.path.basename(shutil.which('sh'))
+
+        first = self.make(monkeypatch).cli_probe(binary, '--voices')
+        second = self.make(monkeypatch).cli_probe(binary, '--voices')
+
+        assert first == second == ['voice-a', 'voice-b']
+        assert len(self.calls) == 1
+        assert os.path.exists(self.probe_path)
+
+    def test_missing_binary_is_not_spawned(self, monkeypatch):
+        with pytest.raises(OSError):
+            self.make(monkeypatch).cli_probe('no-such-tts-binary', '-h')
+        assert self.calls == []
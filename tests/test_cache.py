@@ -0,0 +1,224 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from awesometts.cache import Cache, KEY_VERSION, LEGACY_DAYS
+
+
+KEY = 'google-%08x-00000000-00000000-00000000-00000000.mp3'
+
+
+class TestCache():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        self.budget = 0
+        self.days = 365
+        self.cache = self.open_cache()
+
+    def teardown_method(self):
+        self.cache.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(self.index), ignore_errors=True)
+
+    def open_cache(self):
+        return Cache(directory=self.directory, index=self.index,
+                     budget=lambda: self.budget, days=lambda: self.days,
+                     logger=logging.getLogger('awesometts.test'))
+
+    def write(self, number, payload=None):
+        path = self.cache.path(KEY % number)
+        self.cache.shard(path)
+        with open(path, 'wb') as output:
+            output.write(payload or b'%d' % number * 1000)
+        return path
+
+    def test_index_survives_reopening(self):
+        self.cache.stats()  # open the index before anything is added
+        for number in range(3):
+            self.cache.add(self.write(number), 'google')
+        assert self.cache.stats()[0] == 3
+
+        self.cache.close()
+        self.cache = self.open_cache()
+        assert self.cache.stats() == (3, 3000, 3000)
+
+    def test_evicts_least_recently_used_over_budget(self):
+        paths = []
+        for number in range(4):
+            paths.append(self.write(number))
+            self.cache.add(paths[-1], 'google')
+            time.sleep(0.01)
+        self.cache.hit(paths[0])  # oldest, but now most recently used
+
+        self.budget = 2000
+        assert self.cache.evict() == (2, 2000)
+        assert [os.path.exists(path) for path in paths] == \
+            [True, False, False, True]
+        assert self.cache.stats()[:2] == (2, 2000)
+
+    def test_evicts_in_bounded_slices(self):
+        for number in range(5):
+            self.cache.add(self.write(number), 'google')
+
+        self.budget = 1
+        assert self.cache.evict(limit=2) == (2, 2000)
+        assert self.cache.stats()[0] == 3
+
+    def test_evicts_by_age(self):
+        old = self.write(1)
+        self.cache.add(old, 'google')
+        self.cache._db().execute('UPDATE entries SET created=0')
+        self.cache.add(self.write(2), 'google')
+
+        assert self.cache.evict() == (1, 1000)
+        assert not os.path.exists(old)
+
+    def test_adopts_existing_files_in_background(self):
+        for number in range(3):
+            with open(os.path.join(self.directory, KEY % number), 'wb') as output:
+                output.write(b'x' * 10)
+
+        self.cache.migrate().join()
+        assert self.cache.stats() == (3, 30, 30)
+
+    def test_shards_by_service_and_hash_prefix(self):
+        path = self.cache.path('yandex-3f000000-00000000-00000000-00000000-00000000.mp3')
+        assert path == os.path.join(self.directory, 'yandex', '3f', os.path.basename(path))
+        assert not os.path.exists(os.path.dirname(path))
+
+        self.cache.shard(path)
+        assert os.path.isdir(os.path.dirname(path))
+
+    def test_finds_flat_files_before_migration(self):
+        flat = os.path.join(self.directory, KEY % 1)
+        with open(flat, 'wb') as output:
+            output.write(b'x')
+
+        path = self.cache.path(KEY % 1)
+        assert self.cache.exists(path)
+        assert os.path.exists(path) and not os.path.exists(flat)
+
+    def test_migrates_flat_files_into_shards(self):
+        for number in range(3):
+            with open(os.path.join(self.directory, KEY % number), 'wb') as output:
+                output.write(b'x')
+        with open(os.path.join(self.directory, 'README'), 'w') as output:
+            output.write('not ours')
+
+        self.cache.migrate().join()
+        assert sorted(os.listdir(self.directory)) == ['README', 'google']
+        for number in range(3):
+            assert os.path.exists(self.cache.path(KEY % number))
+
+        # once migrated, misses no longer look in the flat layout
+        flat = os.path.join(self.directory, KEY % 9)
+        with open(flat, 'wb') as output:
+            output.write(b'x')
+        assert not self.cache.exists(self.cache.path(KEY % 9))
+
+    def test_shares_identical_files(self):
+        paths = [self.write(number, b'same' * 250) for number in range(3)]
+        paths.append(self.write(3, b'different' * 100))
+        for path in paths:
+            self.cache.add(path, 'google')
+
+        inodes = [os.stat(path).st_ino for path in paths]
+        assert inodes[0] == inodes[1] == inodes[2] != inodes[3]
+        assert self.cache.stats() == (4, 3900, 1900)
+
+    def test_shared_bytes_reclaimed_with_last_sibling(self):
+        for number in range(2):
+            self.cache.add(self.write(number, b'same' * 250), 'google')
+            time.sleep(0.01)
+
+        self.budget = 1
+        assert self.cache.evict(limit=1) == (1, 0)
+        assert self.cache.evict(limit=1) == (1, 1000)
+        assert self.cache.stats() == (0, 0, 0)
+
+    def test_running_total_matches_index(self):
+        self.cache.stats()  # open the index, starting the running total
+        for number in range(3):
+            self.cache.add(self.write(number, b'same' * 250), 'google')
+        self.cache.add(self.write(3), 'google')
+        assert self.cache._stored_bytes() == self.cache.stats()[2] == 2000
+
+        os.unlink(self.cache.path(KEY % 3))  # gone behind the index's back
+        self.budget = 1000
+        self.cache.evict()
+        assert self.cache._stored_bytes() == self.cache.stats()[2] <= 1000
+
+    def test_clear_removes_unindexed_files(self):
+        self.cache.add(self.write(0), 'google')
+        unindexed = self.write(1)  # e.g. not adopted yet
+        flat = os.path.join(self.directory, KEY % 2)
+        with open(flat, 'wb') as output:
+            output.write(b'x')
+
+        assert self.cache.clear() == 0
+        assert not os.path.exists(unindexed) and not os.path.exists(flat)
+
+    def test_unreadable_file_is_removed_not_left_untracked(self, monkeypatch):
+        path = self.write(0)
+
+        def unreadable(path):
+            raise PermissionError(path)
+
+        monkeypatch.setattr(Cache, '_digest', staticmethod(unreadable))
+        self.cache.add(path, 'google')
+        assert not os.path.exists(path)
+        assert self.cache.stats()[0] == 0
+
+    def adopt_legacy(self, number):
+        legacy = self.write(number)
+        self.cache.migrate().join()  # adopted entries count as the old scheme
+        return legacy
+
+    def test_rekeys_legacy_entries(self):
+        legacy = self.adopt_legacy(1)
+        path = self.cache.path(KEY % 2)
+
+        assert self.cache.rekey(lambda: legacy, path)
+        assert os.path.exists(path) and not os.path.exists(legacy)
+        assert self.cache._db().execute('SELECT key, version FROM entries') \
+            .fetchall() == [(KEY % 2, KEY_VERSION)]
+
+    def test_rekey_dry_run_leaves_files_alone(self):
+        legacy = self.adopt_legacy(1)
+        path = self.cache.path(KEY % 2)
+
+        assert self.cache.rekey(lambda: legacy, path, move=False)
+        assert os.path.exists(legacy) and not os.path.exists(path)
+
+    def test_rekey_skips_keys_not_in_index(self):
+        self.adopt_legacy(1)
+        stray = self.write(3)  # on disk, but never indexed
+
+        assert not self.cache.rekey(lambda: stray, self.cache.path(KEY % 4))
+        assert os.path.exists(stray)
+
+    def test_legacy_fallback_ends(self):
+        self.cache.add(self.write(1), 'google')
+        self.cache.migrate().join()
+        self.cache.tidy()
+
+        calls = []
+        assert not self.cache.rekey(lambda: calls.append(1), self.cache.path(KEY % 2))
+        assert calls == []
+
+    def test_retires_legacy_entries_after_grace_period(self):
+        legacy = self.adopt_legacy(1)
+        self.cache.tidy()
+        assert os.path.exists(legacy)
+
+        with self.cache._db() as connection:
+            connection.execute('UPDATE meta SET value=? WHERE name=?',
+                               (str(time.time() - 86400 * (LEGACY_DAYS + 1)),
+                                'keyed_v%d' % KEY_VERSION))
+        self.cache.tidy()
+        assert not os.path.exists(legacy)
+        assert not self.cache._legacy
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from awesometts.gui.generator import BrowserGenerator, _Journal
+from awesometts.service import Cancelled
+
+
+class FakeNote(dict):
+    """Stands in for an Anki note, with its fields as dict items."""
+
+    def __init__(self, note_id, **fields):
+        super(FakeNote, self).__init__(**fields)
+        self.id = note_id
+        self.flushed = 0
+
+    def flush(self):
+        self.flushed += 1
+
+
+class FakeCollection(object):
+    """Records the order that notes are written and committed in."""
+
+    def __init__(self, notes=()):
+        self.path = '/profile/collection.anki2'
+        self.events = []
+        self.notes = {note.id: note for note in notes}
+
+    def getNote(self, note_id):
+        return self.notes[note_id]
+
+    def update_notes(self, notes):
+        self.events.append(('update', [note.id for note in notes]))
+
+    def save(self):
+        self.events.append(('save',))
+
+
+class FakeGenerator(object):
+    """Borrows BrowserGenerator's job logic, without any of its widgets."""
+
+    _FLUSH_BATCH = 2
+    _RE_MUSTACHE = BrowserGenerator._RE_MUSTACHE
+    _RE_WHITESPACE = BrowserGenerator._RE_WHITESPACE
+    _SHARED_HUMAN_KEYS = BrowserGenerator._SHARED_HUMAN_KEYS
+
+    resume = BrowserGenerator.resume
+    _accept_commit = BrowserGenerator._accept_commit
+    _accept_failed = BrowserGenerator._accept_failed
+    _accept_flush = BrowserGenerator._accept_flush
+    _accept_phrases = BrowserGenerator._accept_phrases
+    _accept_save = BrowserGenerator._accept_save
+
+    def __init__(self, journal, col, config=None):
+        self._addon = SimpleNamespace(
+            config=config or dict(filenames='hash', filenames_human=''),
+            logger=logging.getLogger('awesometts.test'),
+            paths=SimpleNamespace(journal=journal),
+            router=SimpleNamespace(Cancelled=Cancelled),
+            strip=SimpleNamespace(from_note=lambda value: value.strip()),
+        )
+        self._browser = SimpleNamespace(mw=SimpleNamespace(col=col))
+        self._notes = None
+        self._process = None
+        self.alerts = []
+        self.started = None
+        self.broken = set()
+
+    def _alerts(self, message, parent):
+        self.alerts.append(message)
+
+    def _disable_inputs(self):
+        pass
+
+    def _accept_start(self, now, notes, resumed=None):
+        self.started = now, notes, resumed
+
+    def _accept_media(self, path):
+        if path in self.broken:
+            raise IOError("evicted")
+        return os.path.basename(path)
+
+    def _accept_next_output(self, old_value, filename):
+        return '[sound:%s]' % filename
+
+    def start(self, notes):
+        """Sets up just enough of a job for committing results."""
+
+        journal = _Journal(self._addon.paths.journal)
+        self._process = {
+            'journal': journal,
+            'fields': {'source': 'Front', 'dest': 'Back'},
+            'pipeline': {'committed': 0, 'results': {}},
+            'counts': {'done': 0, 'okay': 0, 'fail': 0, 'saved': 0},
+            'failednotes': [],
+            'exceptions': {},
+            'unflushed': [],
+            'state': {
+                'collection': self._browser.mw.col.path,
+                'all': {'last_service': 'offline'},
+                'notes': [note.id for note in notes],
+                'completed': [],
+                'failed': {},
+            },
+        }
+
+
+class TestJournal():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'user_files', 'job.json')
+
+    def teardown_method(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_round_trip(self):
+        journal = _Journal(self.path)
+        assert journal.load() is None
+
+        state = dict(notes=[1, 2, 3], completed=[1], failed={'2': "nope"})
+        journal.save(state)
+        assert _Journal(self.path).load() == state
+        assert not os.path.exists(self.path + '.tmp')
+
+        journal.discard()
+        assert journal.load() is None
+        journal.discard()  # already gone is fine
+
+    def test_unreadable_journal_loads_as_nothing(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as output:
+            output.write('{"notes": [1, ')
+        assert _Journal(self.path).load() is None
+
+
+class TestGeneratorJob():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = os.path.join(self.directory, 'job.json')
+        self.notes = [FakeNote(number, Front='phrase %d' % (number % 2),
+                               Back='') for number in range(1, 5)]
+        self.col = FakeCollection(self.notes)
+        self.generator = FakeGenerator(self.journal, self.col)
+
+    def teardown_method(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_resume_skips_completed_notes(self):
+        _Journal(self.journal).save(dict(
+            collection=self.col.path, all={'last_service': 'offline'},
+            notes=[1, 2, 3, 4, 99], completed=[1, 3], failed={},
+        ))
+
+        self.generator.resume()
+        now, notes, resumed = self.generator.started
+        assert now == {'last_service': 'offline'}
+        assert [note.id for note in notes] == [2, 4]  # 99 was deleted
+        assert resumed['completed'] == [1, 3]
+
+    def test_resume_refuses_another_profile(self):
+        _Journal(self.journal).save(dict(
+            collection='/elsewhere.anki2', all={}, notes=[1],
+            completed=[], failed={},
+        ))
+
+        self.generator.resume()
+        assert self.generator.started is None
+        assert self.generator.alerts
+
+    def test_identical_phrases_are_requested_once(self):
+        phrases = self.generator._accept_phrases('Front', self.notes)
+        assert [(phrase, [note.id for note in notes])
+                for phrase, notes in phrases] == \
+            [('phrase 1', [1, 3]), ('phrase 0', [2, 4])]
+
+    def test_results_are_committed_in_order(self):
+        self.generator.start(self.notes)
+        pipeline = self.generator._process['pipeline']
+
+        pipeline['results'][1] = [self.notes[1]], '/cache/b.mp3', None, 'b'
+        self.generator._accept_commit()
+        assert self.notes[1]['Back'] == ''  # waiting on the first
+
+        pipeline['results'][0] = [self.notes[0]], '/cache/a.mp3', None, 'a'
+        self.generator._accept_commit()
+        assert self.notes[0]['Back'] == '[sound:a.mp3]'
+        assert self.notes[1]['Back'] == '[sound:b.mp3]'
+        assert pipeline['committed'] == 2
+
+    def test_flush_commits_before_journaling(self):
+        self.generator.start(self.notes)
+        pipeline = self.generator._process['pipeline']
+
+        for number, note in enumerate(self.notes[:2]):
+            pipeline['results'][number] = [note], '/c/%d.mp3' % number, \
+                None, 'text'
+        self.generator._accept_commit()  # fills a batch of two
+
+        assert self.col.events == [('update', [1, 2]), ('save',)]
+        with open(self.journal) as journal:
+            assert json.load(journal)['completed'] == [1, 2]
+
+    def test_failed_commit_counts_as_failure(self):
+        self.generator.start(self.notes)
+        self.generator.broken.add('/cache/gone.mp3')
+        pipeline = self.generator._process['pipeline']
+
+        pipeline['results'][0] = [self.notes[0]], '/cache/gone.mp3', None, \
+            'phrase 1'
+        pipeline['results'][1] = [self.notes[1]], '/cache/b.mp3', None, 'b'
+        self.generator._accept_commit()
+
+        counts = self.generator._process['counts']
+        assert counts['fail'] == 1 and counts['okay'] == 1
+        assert self.generator._process['state']['failed'] == {'1': 'evicted'}
+        assert pipeline['committed'] == 2
+
+    def test_cancelled_results_are_left_for_resuming(self):
+        self.generator.start(self.notes)
+        pipeline = self.generator._process['pipeline']
+
+        pipeline['results'][0] = [self.notes[0]], None, \
+            Cancelled("The request was cancelled."), 'phrase 1'
+        self.generator._accept_commit()
+
+        counts = self.generator._process['counts']
+        assert counts['done'] == counts['fail'] == 0
+        assert self.generator._process['state']['failed'] == {}
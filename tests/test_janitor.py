@@ -0,0 +1,44 @@
+import logging
+
+from awesometts.janitor import Janitor
+
+
+class TestJanitor():
+
+    def setup_method(self):
+        self.idle = False
+        self.ran = []
+        self.janitor = Janitor(idle=lambda: self.idle,
+                               logger=logging.getLogger('awesometts.test'))
+
+    def run_round(self):
+        self.janitor._on_timeout()
+        if self.janitor._thread:
+            self.janitor._thread.join()
+
+    def test_waits_until_idle(self):
+        self.janitor.add(lambda: self.ran.append('tidy'))
+
+        self.run_round()
+        assert self.ran == []
+
+        self.idle = True
+        self.run_round()
+        assert self.ran == ['tidy']
+
+    def test_runs_once_tasks_only_once(self):
+        self.idle = True
+        self.janitor.add(lambda: self.ran.append('tidy'))
+        self.janitor.add(lambda: self.ran.append('scratch'), once=True)
+
+        self.run_round()
+        self.run_round()
+        assert self.ran == ['tidy', 'scratch', 'tidy']
+
+    def test_failing_task_does_not_stop_others(self):
+        self.idle = True
+        self.janitor.add(lambda: 1 / 0)
+        self.janitor.add(lambda: self.ran.append('tidy'))
+
+        self.run_round()
+        assert self.ran == ['tidy']
@@ -0,0 +1,288 @@
+import logging
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from awesometts.bundle import Bundle
+from awesometts.cache import Cache
+from awesometts.router import Priority, Router, _Scheduler, _canonical
+from awesometts.service.base import Service
+
+
+class Offline(Service):
+    """Stands in for a local engine, writing the text out as the audio."""
+
+    NAME = "Offline"
+    TRAITS = []
+
+    runs = []
+
+    def desc(self):
+        return "offline test service"
+
+    def options(self):
+        return [
+            dict(key='voice', label="Voice", values=[('a', "A"), ('b', "B")],
+                 transform=str, default='a'),
+            dict(key='speed', label="Speed", values=(0, 10),
+                 transform=float, default=1),
+        ]
+
+    def run(self, text, options, path):
+        Offline.runs.append(text)
+        with open(path, 'w') as output:
+            output.write(text)
+
+
+class HeldPool(object):
+    """Stands in for a worker pool, holding on to tasks until told."""
+
+    def __init__(self, capacity=4):
+        self.size = capacity
+        self.spawned = []
+
+    def capacity(self):
+        return self.size
+
+    def spawn(self, task, callback):
+        self.spawned.append((task, callback))
+
+
+def make_router(cache, config=None):
+    logger = logging.getLogger('awesometts.test')
+    return Router(
+        services=Bundle(
+            mappings=[('offline', Offline)],
+            dead={},
+            aliases=[],
+            normalize=lambda value: value.lower(),
+            args=(),
+            kwargs=dict(temp_dir=tempfile.gettempdir(),
+                        lame_flags=lambda: '', normalize=lambda value: value,
+                        logger=logger, ecosystem=None),
+        ),
+        cache=cache,
+        temp_dir=tempfile.gettempdir(),
+        logger=logger,
+        config=config or dict(concurrency={}, latencies={}, pool_workers=0,
+                              net_workers=0, rate_limits={},
+                              throttle_sleep=30, throttle_threshold=10),
+    )
+
+
+class TestRouterKeys():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        self.cache = Cache(directory=self.directory, index=self.index,
+                           budget=lambda: 0, days=lambda: 365,
+                           logger=logging.getLogger('awesometts.test'))
+        self.router = make_router(self.cache)
+        Offline.runs = []
+
+    def teardown_method(self):
+        self.cache.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(self.index), ignore_errors=True)
+
+    def path(self, options, text='hello', version=None):
+        svc_id, _, options = self.router._validate_service('offline', options)
+        if version:
+            return self.router._path_cache(svc_id, text, options, version=version)
+        return self.router._path_cache(svc_id, text, options)
+
+    def call(self, text='hello', options=None):
+        results = []
+        self.router('offline', text, options or {},
+                    callbacks=dict(okay=results.append,
+                                   fail=lambda exception, text: results.append(exception)),
+                    async_variable=False)
+        return results
+
+    def test_canonical_numbers(self):
+        assert _canonical(1) == _canonical(1.0) == _canonical(True) == '1'
+        assert _canonical(0.5) == '0.5'
+        assert _canonical('1.0') == '1.0'  # strings are left as they are
+
+    def test_equal_options_share_a_key(self):
+        assert self.path({}) == self.path({'speed': 1}) == \
+            self.path({'speed': '1.0', 'Voice': 'a'}) == \
+            self.path({'speed': 1, 'stale': 'left over'})
+        assert self.path({'speed': 2}) != self.path({})
+
+    def test_key_scheme_is_versioned(self):
+        assert self.path({}, version=1) != self.path({})
+
+    def test_plan_does_not_move_legacy_files(self):
+        legacy = self.path({}, version=1)
+        self.cache.shard(legacy)
+        with open(legacy, 'w') as output:
+            output.write('hello')
+        self.cache.migrate().join()
+
+        report = self.router.plan([('offline', 'hello', {})])
+        assert report['hits'] == 1
+        assert os.path.exists(legacy) and not os.path.exists(self.path({}))
+
+        assert self.call() == [self.path({})]
+        assert not os.path.exists(legacy)
+        assert Offline.runs == []  # served from the rekeyed legacy file
+
+
+class TestRouterCalls():
+
+    def setup_method(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        self.cache = Cache(directory=self.directory, index=self.index,
+                           budget=lambda: 0, days=lambda: 365,
+                           logger=logging.getLogger('awesometts.test'))
+        self.router = make_router(self.cache)
+        self.pool = HeldPool()
+        self.router._scheduler._pool = lambda svc_id: self.pool
+        Offline.runs = []
+
+    def teardown_method(self):
+        self.cache.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(self.index), ignore_errors=True)
+
+    def test_cancel_after_synchronous_fallback(self):
+        results = []
+        handle = self.router.group(
+            'hello',
+            dict(mode='ordered', presets=['broken', 'working']),
+            dict(broken=dict(service='missing'),
+                 working=dict(service='offline')),
+            callbacks=dict(okay=results.append,
+                           fail=lambda exception, text:
+                           results.append(exception)),
+        )
+        assert results == []  # 'broken' failed, 'working' is underway
+        assert len(self.pool.spawned) == 1
+
+        handle.cancel()
+        assert len(results) == 1
+        assert isinstance(results[0], Router.Cancelled)
+
+    def test_broken_callback_does_not_stop_other_waiters(self):
+        results = []
+
+        def broken(path):
+            raise ValueError("broken caller")
+
+        for okay in [broken, results.append]:
+            self.router('offline', 'hello', {},
+                        callbacks=dict(okay=okay,
+                                       fail=lambda exception, text: None,
+                                       then=lambda: results.append('then')))
+        assert len(self.pool.spawned) == 1  # second joined the first
+
+        task, callback = self.pool.spawned[0]
+        task()
+        with pytest.raises(ValueError):  # passed on once all called back
+            callback(None)
+        assert results[0] == 'then'
+        assert results[1].endswith('.mp3') and results[2] == 'then'
+
+    def test_broken_callback_on_cache_hit_still_calls_then(self):
+        self.router('offline', 'hello', {}, async_variable=False,
+                    callbacks=dict(okay=lambda path: None,
+                                   fail=lambda exception, text: None))
+        results = []
+
+        def broken(path):
+            raise ValueError("broken caller")
+
+        with pytest.raises(ValueError):
+            self.router('offline', 'hello', {},
+                        callbacks=dict(okay=broken,
+                                       fail=lambda exception, text: None,
+                                       then=lambda: results.append('then')))
+        assert results == ['then']
+
+
+class TestScheduler():
+
+    def setup_method(self):
+        self.pool = HeldPool(capacity=3)
+        self.limits = {}
+        self.rates = {}
+        self.scheduler = _Scheduler(
+            pool=lambda svc_id: self.pool,
+            limit=lambda svc_id: self.limits.get(svc_id, 10),
+            rate=self.rates.get,
+            logger=logging.getLogger('awesometts.test'),
+        )
+
+    def submit(self, name, priority=Priority.NORMAL, svc_id='svc'):
+        self.scheduler.submit(svc_id, name, lambda exception: None,
+                              priority=priority)
+
+    def started(self):
+        return [task for task, _ in self.pool.spawned]
+
+    def complete(self, name):
+        for task, callback in self.pool.spawned:
+            if task == name:
+                callback(None)
+                return
+        raise AssertionError("%s was never started" % name)
+
+    def test_waiting_tasks_start_most_urgent_first(self):
+        self.submit('normal 1')
+        self.submit('normal 2')
+        self.submit('background', Priority.BACKGROUND)
+        self.submit('normal 3')
+        assert self.started() == ['normal 1', 'normal 2']
+
+        self.complete('normal 1')
+        assert self.started()[-1] == 'normal 3'
+        self.complete('normal 2')
+        assert self.started()[-1] == 'background'
+
+    def test_interactive_tasks_use_the_reserved_slots(self):
+        self.limits['svc'] = 1
+        self.submit('normal 1')
+        self.submit('normal 2')
+        assert self.started() == ['normal 1']  # service limit reached
+
+        self.submit('interactive', Priority.INTERACTIVE)
+        assert self.started() == ['normal 1', 'interactive']
+
+    def test_interactive_tasks_use_the_reserved_workers(self):
+        self.submit('normal 1', svc_id='a')
+        self.submit('normal 2', svc_id='b')
+        self.submit('normal 3', svc_id='c')
+        assert len(self.started()) == 2  # one of three workers reserved
+
+        self.submit('interactive', Priority.INTERACTIVE, svc_id='d')
+        assert self.started()[-1] == 'interactive'
+
+    def test_bucket_limits_bursts(self):
+        self.rates['svc'] = (0.001, 2)
+        self.submit('first')
+        self.submit('second')
+        self.submit('third')
+        assert self.started() == ['first', 'second']
+
+    def test_tasks_without_downloads_give_their_token_back(self):
+        self.rates['svc'] = (0.001, 2)
+        for name in ['first', 'second', 'third']:
+            self.submit(name)
+
+        self.scheduler.settle('svc', 0)
+        self.complete('first')
+        assert self.started()[-1] == 'third'
+
+    def test_services_without_a_rate_are_not_throttled(self):
+        self.pool.size = 50
+        for number in range(10):
+            self.submit(number)
+        assert len(self.started()) == 10
+
+    def test_only_online_services_are_rate_limited(self):
+        assert make_router(None).get_rate_limit('offline') is None
@@ -34,9 +34,9 @@ def get_default_options(addon, svc_id):
     return options
 
 def clear_cache(cache_path):
-    for filename in os.listdir(cache_path):
-        file_path = os.path.join(cache_path, filename)
-        os.unlink(file_path)
+    for dirpath, _, filenames in os.walk(cache_path):
+        for filename in filenames:
+            os.unlink(os.path.join(dirpath, filename))
 
 class TestClass():
 
@@ -67,7 +67,7 @@ class TestClass():
         awesometts.editor_button()     # single audio clip generator button
         awesometts.reviewer_hooks()    # on-the-fly playback/shortcuts, context menus
         awesometts.sound_tag_delays()  # delayed playing of stored [sound]s in review
-        awesometts.temp_files()        # remove temporary files upon session exit
+        awesometts.temp_files()        # remove stale temporary files while idle
         awesometts.window_shortcuts()  # enable/update shortcuts for add-on windows
         # if we didn't hit any exceptions at this point, declare success
         assert True
@@ -378,6 +378,60 @@ class TestClass():
 
         self.run_service_testcases(svc_id, test_cases, extra_option_keys=['clientid', 'clientsecret'])
 
+    def test_batch(self):
+        # python -m pytest tests -rPP -k 'test_batch'
+        svc_id = 'Youdao'
+        options = get_default_options(self.addon, svc_id)
+
+        results = []
+        counts = self.addon.router.batch(
+            items=[
+                (svc_id, 'successful', options, 0),
+                ('nosuchservice', 'successful', {}, 1),
+                (svc_id, 'pronunciation', options, 2),
+                ('group:nosuchgroup', 'successful', None, 3),
+            ],
+            callbacks={
+                'okay': lambda path, context: results.append((context, os.path.exists(path))),
+                'fail': lambda exception, text, context: results.append((context, False)),
+            },
+            ordered=True,
+            async_variable=False
+        )
+
+        assert counts['total'] == 4
+        assert counts['invalid'] == 2
+        # results come back in input order, even though the invalid items were reported first
+        assert results == [(0, True), (1, False), (2, True), (3, False)]
+
+    def test_plan(self):
+        # python -m pytest tests -rPP -k 'test_plan'
+        svc_id = 'Youdao'
+        options = get_default_options(self.addon, svc_id)
+
+        clear_cache(self.addon.paths.cache)
+        items = [
+            (svc_id, 'successful', options),
+            (svc_id, 'successful', options),
+            ('nosuchservice', 'successful', {}),
+        ]
+
+        report = self.addon.router.plan(items)
+        assert report['total'] == 3
+        assert report['hits'] == 0
+        assert report['misses'] == 2
+        assert report['duplicates'] == 1
+        assert report['invalid'] == 1
+
+        # once generated, the same phrase is planned as a cache hit
+        self.addon.router(svc_id=svc_id, text='successful', options=options,
+                          callbacks={'okay': lambda path: None,
+                                     'fail': lambda exception, text: None},
+                          async_variable=False)
+        report = self.addon.router.plan(items)
+        assert report['hits'] == 2
+        assert report['services']['youdao']['latency'] is not None
+
     def test_youdao(self):
         # python -m pytest tests -s -k 'test_youdao'
 